@@ -217,6 +217,17 @@ create_venv(){
 
 }
 
+fetch_calendar_assets() {
+  echo "Fetching calendar assets."
+  (cd "$SRC_PATH" && $VENV_PATH/bin/python -m plugins.calendar.assets) > calendar_assets.log 2>&1 &
+  show_loader "\tDownloading FullCalendar, its locales and fonts. "
+  if ! wait $!; then
+    cat calendar_assets.log
+    echo_error "ERROR: Failed to fetch or verify the calendar assets, see calendar_assets.log."
+    exit 1
+  fi
+}
+
 install_app_service() {
   echo "Installing $APPNAME systemd service."
   if [ -f "$SERVICE_FILE_SOURCE" ]; then
@@ -353,6 +364,7 @@ install_debian_dependencies
 setup_memory_management
 copy_project
 create_venv
+fetch_calendar_assets
 install_executable
 install_config
 # update the config file with additional WS if defined.
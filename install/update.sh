@@ -18,6 +18,7 @@ APPNAME="tempo"
 INSTALL_PATH="/usr/local/$APPNAME"
 BINPATH="/usr/local/bin"
 VENV_PATH="$INSTALL_PATH/venv_$APPNAME"
+SRC_PATH="$SCRIPT_DIR/../src"
 
 APT_REQUIREMENTS_FILE="$SCRIPT_DIR/debian-requirements.txt"
 PIP_REQUIREMENTS_FILE="$SCRIPT_DIR/requirements.txt"
@@ -73,6 +74,15 @@ else
   exit 1
 fi
 
+# Fetch FullCalendar, its locales and fonts the calendar template loads from disk
+echo "Fetching calendar assets..."
+if (cd "$SRC_PATH" && $VENV_PATH/bin/python -m plugins.calendar.assets > /dev/null); then
+  echo_success "Calendar assets fetched."
+else
+  echo_error "ERROR: Failed to fetch or verify the calendar assets, see the errors above."
+  exit 1
+fi
+
 echo "Updating executable in ${BINPATH}/$APPNAME"
 cp $SCRIPT_DIR/tempo $BINPATH/
 sudo chmod +x $BINPATH/$APPNAME
@@ -0,0 +1,141 @@
+"""
+Local stand-in for a CalDAV server, for trying the calendar plugin's CalDAV sync offline.
+
+Serves every .ics file in a directory as a calendar object of one collection and
+answers sync-collection (RFC 6578) and calendar-multiget REPORTs. Files can be
+added, edited and removed while it runs; each sync reports only what changed
+since the token it was sent. Run from the src directory:
+
+    python -m benchmarks.caldav_server /tmp/collection --port 5232
+
+and add http://127.0.0.1:5232/calendar/ as a CalDAV calendar.
+"""
+import os
+import sys
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlparse, unquote
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DAV = "{DAV:}"
+TOKEN_PREFIX = "http://tempo.invalid/sync/"
+
+
+class Collection:
+    """The .ics files of a directory, with a snapshot of their etags per sync token."""
+
+    def __init__(self, directory, path):
+        self.directory = directory
+        self.path = path
+        self.snapshots = []
+        self.lock = threading.Lock()
+
+    def _scan(self):
+        resources = {}
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".ics"):
+                with open(os.path.join(self.directory, name), "rb") as f:
+                    resources[self.path + name] = '"' + hashlib.sha1(f.read()).hexdigest() + '"'
+        return resources
+
+    def current(self):
+        """Returns (token, {href: etag}), taking a new snapshot when the directory changed."""
+        with self.lock:
+            resources = self._scan()
+            if not self.snapshots or self.snapshots[-1] != resources:
+                self.snapshots.append(resources)
+            return len(self.snapshots), resources
+
+    def snapshot(self, token):
+        """Returns the snapshot a token was issued for, or None for an unknown token."""
+        if not token.startswith(TOKEN_PREFIX):
+            return None
+        number = token[len(TOKEN_PREFIX):]
+        if not number.isdigit() or not 1 <= int(number) <= len(self.snapshots):
+            return None
+        return self.snapshots[int(number) - 1]
+
+    def read(self, href):
+        with open(os.path.join(self.directory, href[len(self.path):]), encoding="utf-8") as f:
+            return f.read()
+
+
+class Handler(BaseHTTPRequestHandler):
+    collection = None
+    calendar_data = True
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"{self.command} {self.path} {args[1] if len(args) > 1 else ''}\n")
+
+    def _send(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _resource(self, href, etag, with_data=True):
+        data = ""
+        if with_data:
+            data = f"<c:calendar-data>{escape(self.collection.read(href))}</c:calendar-data>"
+        return (f"<d:response><d:href>{escape(href)}</d:href><d:propstat><d:prop>"
+                f"<d:getetag>{escape(etag)}</d:getetag>{data}</d:prop>"
+                f"<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>")
+
+    def do_REPORT(self):
+        if unquote(urlparse(self.path).path) != self.collection.path:
+            return self._send(404, "")
+        request = ElementTree.fromstring(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        token, resources = self.collection.current()
+        responses = []
+
+        if request.tag == f"{DAV}sync-collection":
+            sent = (request.findtext(f"{DAV}sync-token") or "").strip()
+            previous = {} if not sent else self.collection.snapshot(sent)
+            if previous is None:
+                return self._send(403, '<d:error xmlns:d="DAV:"><d:valid-sync-token/></d:error>')
+            for href, etag in resources.items():
+                if previous.get(href) != etag:
+                    responses.append(self._resource(href, etag, self.calendar_data))
+            for href in previous:
+                if href not in resources:
+                    responses.append(f"<d:response><d:href>{escape(href)}</d:href>"
+                                     f"<d:status>HTTP/1.1 404 Not Found</d:status></d:response>")
+            token_xml = f"<d:sync-token>{TOKEN_PREFIX}{token}</d:sync-token>"
+        else:
+            # calendar-multiget
+            for href in request.iter(f"{DAV}href"):
+                href = unquote(href.text.strip())
+                if href in resources:
+                    responses.append(self._resource(href, resources[href]))
+            token_xml = ""
+
+        self._send(207, '<?xml version="1.0" encoding="utf-8"?>'
+                        '<d:multistatus xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">'
+                        + "".join(responses) + token_xml + "</d:multistatus>")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a directory of .ics files as a CalDAV collection")
+    parser.add_argument("directory", help="Directory of .ics files, one calendar object each")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5232)
+    parser.add_argument("--path", default="/calendar/", help="Path of the collection")
+    parser.add_argument("--no-calendar-data", action="store_true",
+                        help="Leave calendar data out of sync reports, so clients have to multiget")
+    args = parser.parse_args()
+
+    os.makedirs(args.directory, exist_ok=True)
+    Handler.collection = Collection(args.directory, args.path)
+    Handler.calendar_data = not args.no_calendar_data
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Serving {args.directory} at http://{args.host}:{args.port}{args.path}", file=sys.stderr)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
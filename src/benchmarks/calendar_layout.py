@@ -0,0 +1,137 @@
+"""
+Benchmark of calendar renders on busy weeks, with the event layout done by FullCalendar or in Python.
+
+Renders the week and month views of a week packed with overlapping events with the
+"chromium" engine (FullCalendar lays the events out in the browser), the "static"
+engine (the native renderer lays them out in Python and Chromium only paints the
+SVG) and the "native" engine (no browser at all). Python time (template or layout)
+and browser time are reported apart; the first render of each engine starts the
+browser and is reported apart from the steady state ones. Run from the src directory:
+
+    python -m benchmarks.calendar_layout --events-per-day 5 10 20 --output layout.json
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+from datetime import datetime, timedelta
+import pytz
+
+ENGINES = ["chromium", "static", "native"]
+VIEWS = ["timeGridWeek", "dayGridMonth"]
+COLORS = ["#2e7d32", "#c62828", "#1565c0", "#6a1b9a", "#ef6c00", "#00695c"]
+
+
+def busy_week(reference, tz, events_per_day, seed=0):
+    """Timed events of random length and start in working hours on each day around reference, most overlapping."""
+    rng = random.Random(seed)
+    monday = tz.localize(datetime(reference.year, reference.month, reference.day)) \
+        - timedelta(days=reference.weekday())
+    events = []
+    for day in range(-7, 14):
+        for i in range(events_per_day):
+            start = monday + timedelta(days=day, hours=8, minutes=15 * rng.randrange(40))
+            end = start + timedelta(minutes=15 * rng.randrange(2, 12))
+            events.append({"title": f"Event {day * events_per_day + i}", "start": start.isoformat(),
+                           "end": end.isoformat(), "backgroundColor": rng.choice(COLORS),
+                           "textColor": "#ffffff", "allDay": False})
+        events.append({"title": f"All day {day}", "start": (monday + timedelta(days=day)).date().isoformat(),
+                       "backgroundColor": rng.choice(COLORS), "textColor": "#ffffff", "allDay": True})
+    return events
+
+
+def measure(calendar, service, engine, view, events, settings, dimensions, timezone, timeout_ms):
+    """Renders view once with engine, returning (python seconds, browser seconds, whether it produced an image)."""
+    from benchmarks.calendar_render_diff import REFERENCE_DATE
+    from plugins.calendar.constants import FONT_SIZES
+    from plugins.calendar.native_renderer import NativeCalendarRenderer
+
+    tz = pytz.timezone(timezone)
+    current_dt = tz.localize(REFERENCE_DATE)
+    render_view = "timeGrid" if view == "timeGridWeek" else view
+    started = time.perf_counter()
+    if engine == "chromium":
+        params = calendar.get_template_params(render_view, events, current_dt, timezone, "12h", settings, True)
+        html, _ = calendar.render_html(dimensions, "calendar.html", "calendar.css", params)
+    else:
+        renderer = NativeCalendarRenderer(dimensions, settings, "12h", FONT_SIZES.get("normal"))
+        if engine == "native":
+            image = renderer.render(render_view, events, current_dt, tz)
+            return time.perf_counter() - started, 0.0, image is not None
+        svg = renderer.render_svg(render_view, events, current_dt, tz)
+        html, _ = calendar.render_html(dimensions, "calendar_static.html", template_params={"svg": svg})
+    python_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    image = service.render_html(html, dimensions, timeout_ms)
+    return python_seconds, time.perf_counter() - started, image is not None
+
+
+def run(engines, views, events_per_day, repeat, dimensions, timezone, timeout_ms):
+    from plugins.calendar.calendar import Calendar
+    from utils.render_service import RenderService
+    from benchmarks.calendar_render_diff import DEFAULT_SETTINGS, REFERENCE_DATE
+
+    calendar = Calendar({"id": "calendar"})
+    tz = pytz.timezone(timezone)
+    results = []
+    try:
+        for count in events_per_day:
+            events = busy_week(REFERENCE_DATE, tz, count)
+            for engine in engines:
+                service = RenderService()
+                try:
+                    for view in views:
+                        settings = dict(DEFAULT_SETTINGS, viewMode=view)
+                        runs = [measure(calendar, service, engine, view, events, settings, dimensions, timezone,
+                                        timeout_ms) for _ in range(repeat)]
+                        steady = runs[1:] or runs
+                        result = {
+                            "engine": engine,
+                            "view": view,
+                            "events_per_day": count,
+                            "first_seconds": runs[0][0] + runs[0][1],
+                            "median_seconds": statistics.median(p + b for p, b, _ in steady),
+                            "median_python_seconds": statistics.median(p for p, _, _ in steady),
+                            "median_browser_seconds": statistics.median(b for _, b, _ in steady),
+                            "failures": sum(1 for _, _, ok in runs if not ok),
+                        }
+                        results.append(result)
+                        print(json.dumps(result), file=sys.stderr)
+                finally:
+                    service.shutdown()
+    finally:
+        calendar.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time calendar renders of busy weeks with each render engine")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--views", nargs="+", default=VIEWS)
+    parser.add_argument("--events-per-day", nargs="+", type=int, default=[5, 10, 20])
+    parser.add_argument("--repeat", type=int, default=3, help="Renders per combination, the first starts the browser")
+    parser.add_argument("--width", type=int, default=480)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--timezone", default="Europe/London")
+    parser.add_argument("--timeout", type=int, default=20000, help="Milliseconds a page gets to become ready")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    results = {
+        "metadata": {"python": platform.python_version(), "machine": platform.machine()},
+        "results": run(args.engines, args.views, args.events_per_day, args.repeat, (args.width, args.height),
+                       args.timezone, args.timeout),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Pixel-diff harness comparing the calendar plugin's native and static renderers with the Chromium one.
+
+Renders every view with every engine from the same event dicts and reports the
+share of pixels that differ, the mean difference and how long each engine took.
+The images and a diff against the Chromium one (differing pixels in red over
+the native or static image) are saved per view. Run from the src directory:
+
+    python -m benchmarks.calendar_render_diff --output cache/render_diff
+
+Events default to a fixed synthetic set around the reference date; --events takes
+a JSON list of event dicts as Calendar.fetch_ics_events returns them instead.
+Exits with status 1 when a view differs by more than --max-diff.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+import pytz
+from PIL import Image, ImageChops
+
+VIEWS = ["timeGridDay", "timeGridWeek", "dayGridMonth", "listWeek", "listMonth"]
+ENGINES = ["chromium", "native", "static"]
+REFERENCE_DATE = datetime(2025, 6, 18, 14, 20)
+DEFAULT_SETTINGS = {
+    "displayTitle": "true",
+    "displayEventTime": "true",
+    "displayWeekends": "true",
+    "displayNowIndicator": "true",
+    "nowIndicatorColor": "#ff0000",
+    "weekStartDay": "1",
+    "startTimeInterval": "7",
+    "endTimeInterval": "21",
+    "textColor": "#000000",
+}
+
+
+def synthetic_events(reference, tz):
+    """A fixed mix of timed, overlapping, all-day and multi-day events around reference."""
+    def event(title, start, end=None, all_day=False, color="#2e7d32", text="#ffffff"):
+        parsed = {"title": title, "start": start.isoformat(), "backgroundColor": color, "textColor": text,
+                  "allDay": all_day}
+        if end is not None:
+            parsed["end"] = end.isoformat()
+        return parsed
+
+    day = tz.localize(datetime(reference.year, reference.month, reference.day))
+    today = day.date()
+    events = [
+        event("Standup", day + timedelta(hours=9), day + timedelta(hours=9, minutes=30)),
+        event("Design review", day + timedelta(hours=10), day + timedelta(hours=12), color="#c62828"),
+        event("Lunch with Sam", day + timedelta(hours=11), day + timedelta(hours=13), color="#1565c0"),
+        event("Dentist", day + timedelta(hours=16, minutes=30), None, color="#ffeb3b", text="#000000"),
+        event("Conference", today - timedelta(days=1), today + timedelta(days=2), True, "#6a1b9a"),
+        event("Birthday", today + timedelta(days=3), None, True, "#ef6c00"),
+        event("Night shift", day + timedelta(days=1, hours=20), day + timedelta(days=2, hours=4)),
+    ]
+    for i in range(-12, 20, 3):
+        start = day + timedelta(days=i, hours=8 + i % 5)
+        events.append(event(f"Meeting {i + 12}", start, start + timedelta(hours=1), color="#00695c"))
+    return events
+
+
+def compare(reference, candidate, threshold):
+    """Returns (share of pixels differing by more than threshold, mean difference, diff image)."""
+    reference = reference.convert("RGB")
+    candidate = candidate.convert("RGB").resize(reference.size)
+    difference = ImageChops.difference(reference, candidate).convert("L")
+    histogram = difference.histogram()
+    pixels = reference.width * reference.height
+    differing = sum(histogram[threshold + 1:])
+    mean = sum(value * count for value, count in enumerate(histogram)) / pixels
+
+    mask = difference.point(lambda value: 255 if value > threshold else 0)
+    overlay = Image.blend(candidate, Image.new("RGB", candidate.size, (255, 255, 255)), 0.7)
+    overlay.paste((255, 0, 0), mask=mask)
+    return differing / pixels, mean, overlay
+
+
+def run(views, events, settings, dimensions, timezone, time_format, output, threshold):
+    from plugins.calendar.calendar import Calendar
+    from utils.render_service import shutdown_render_service
+
+    calendar = Calendar({"id": "calendar"})
+    tz = pytz.timezone(timezone)
+    current_dt = tz.localize(REFERENCE_DATE)
+    results = []
+    try:
+        for view in views:
+            settings = dict(settings, viewMode=view)
+            render_view = view
+            if view == "timeGridWeek" and settings.get("displayPreviousDays") != "true":
+                render_view = "timeGrid"
+            images, timings = {}, {}
+            for engine in ENGINES:
+                started = time.perf_counter()
+                images[engine] = calendar.render_calendar(engine, dimensions, render_view, events, current_dt,
+                                                          timezone, time_format, settings)
+                timings[engine] = time.perf_counter() - started
+
+            result = {"view": view, "seconds": timings}
+            if output:
+                os.makedirs(output, exist_ok=True)
+                for engine, image in images.items():
+                    if image is not None:
+                        image.save(os.path.join(output, f"{view}-{engine}.png"))
+            if images["chromium"] is None:
+                result["error"] = "Chromium render failed"
+            else:
+                share, mean, overlay = compare(images["chromium"], images["native"], threshold)
+                result.update({"differing": share, "mean_difference": mean})
+                if output:
+                    overlay.save(os.path.join(output, f"{view}-diff.png"))
+                if images["static"] is not None:
+                    # same layout painted by the browser, so mostly font rasterisation differences
+                    share, mean, overlay = compare(images["chromium"], images["static"], threshold)
+                    result.update({"static_differing": share, "static_mean_difference": mean})
+                    if output:
+                        overlay.save(os.path.join(output, f"{view}-static-diff.png"))
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr)
+    finally:
+        calendar.cleanup()
+        shutdown_render_service()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the native calendar renderer with the Chromium one")
+    parser.add_argument("--views", nargs="+", default=VIEWS)
+    parser.add_argument("--events", help="JSON file of event dicts, instead of the synthetic events")
+    parser.add_argument("--settings", help="JSON file of plugin settings, merged over the defaults")
+    parser.add_argument("--width", type=int, default=480)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--timezone", default="Europe/London")
+    parser.add_argument("--time-format", choices=["12h", "24h"], default="12h")
+    parser.add_argument("--threshold", type=int, default=48, help="Grey level difference a pixel may have")
+    parser.add_argument("--max-diff", type=float, default=0.1, help="Share of differing pixels allowed per view")
+    parser.add_argument("--output", help="Directory for the rendered and diff images")
+    args = parser.parse_args()
+
+    settings = dict(DEFAULT_SETTINGS)
+    if args.settings:
+        with open(args.settings) as f:
+            settings.update(json.load(f))
+    if args.events:
+        with open(args.events) as f:
+            events = json.load(f)
+    else:
+        events = synthetic_events(REFERENCE_DATE, pytz.timezone(args.timezone))
+
+    results = run(args.views, events, settings, (args.width, args.height), args.timezone, args.time_format,
+                  args.output, args.threshold)
+    print(json.dumps(results, indent=2))
+    failed = [r["view"] for r in results if "error" in r or r["differing"] > args.max_diff]
+    if failed:
+        print(f"Views differing by more than {args.max_diff:.0%}: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
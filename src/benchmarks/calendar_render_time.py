@@ -0,0 +1,100 @@
+"""
+Benchmark of Chromium calendar renders with local versus CDN assets, with and without network access.
+
+Renders the calendar template with FullCalendar, its locale and the Jersey fonts
+loaded from the local copies (see plugins.calendar.assets) and from the CDNs, in a
+browser that can reach the network and in one whose DNS resolution is blocked.
+Each combination gets its own render service; the first render (browser start) is
+reported apart from the steady state ones. Run from the src directory:
+
+    python -m benchmarks.calendar_render_time --repeat 5 --output results.json
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import pytz
+
+# makes every host name fail to resolve, as when the device has no network
+OFFLINE_FLAGS = ["--host-resolver-rules=MAP * ~NOTFOUND , EXCLUDE localhost"]
+VIEWS = ["timeGridDay", "timeGridWeek", "dayGridMonth", "listWeek"]
+
+
+def measure(calendar, service, view, events, settings, dimensions, timezone, local_assets, timeout_ms):
+    """Renders view once with service, returning (seconds, whether it produced an image)."""
+    from benchmarks.calendar_render_diff import REFERENCE_DATE
+
+    current_dt = pytz.timezone(timezone).localize(REFERENCE_DATE)
+    render_view = "timeGrid" if view == "timeGridWeek" else view
+    params = calendar.get_template_params(render_view, events, current_dt, timezone, "12h", settings, local_assets)
+    html, _ = calendar.render_html(dimensions, "calendar.html", "calendar.css", params)
+    started = time.perf_counter()
+    image = service.render_html(html, dimensions, timeout_ms)
+    return time.perf_counter() - started, image is not None
+
+
+def run(views, repeat, language, dimensions, timezone, timeout_ms):
+    from plugins.calendar.calendar import Calendar
+    from utils.render_service import RenderService
+    from benchmarks.calendar_render_diff import DEFAULT_SETTINGS, REFERENCE_DATE, synthetic_events
+
+    calendar = Calendar({"id": "calendar"})
+    events = synthetic_events(REFERENCE_DATE, pytz.timezone(timezone))
+    settings = dict(DEFAULT_SETTINGS, language=language)
+    results = []
+    try:
+        for assets in ("local", "cdn"):
+            for network in ("online", "offline"):
+                service = RenderService(extra_flags=OFFLINE_FLAGS if network == "offline" else ())
+                try:
+                    for view in views:
+                        runs = [measure(calendar, service, view, events, settings, dimensions, timezone,
+                                        assets == "local", timeout_ms) for _ in range(repeat)]
+                        steady = [seconds for seconds, _ in runs[1:]] or [runs[0][0]]
+                        result = {
+                            "assets": assets,
+                            "network": network,
+                            "view": view,
+                            "first_seconds": runs[0][0],
+                            "median_seconds": statistics.median(steady),
+                            "max_seconds": max(steady),
+                            "failures": sum(1 for _, ok in runs if not ok),
+                        }
+                        results.append(result)
+                        print(json.dumps(result), file=sys.stderr)
+                        service.shutdown()  # every view starts from a cold browser, as after an idle shutdown
+                finally:
+                    service.shutdown()
+    finally:
+        calendar.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time calendar renders with local and CDN assets, online and offline")
+    parser.add_argument("--views", nargs="+", default=VIEWS)
+    parser.add_argument("--repeat", type=int, default=3, help="Renders per combination, the first starts the browser")
+    parser.add_argument("--language", default="de", help="Calendar language, so a locale file is loaded")
+    parser.add_argument("--width", type=int, default=480)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--timezone", default="Europe/London")
+    parser.add_argument("--timeout", type=int, default=20000, help="Milliseconds a page gets to become ready")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    results = {
+        "metadata": {"python": platform.python_version(), "machine": platform.machine()},
+        "results": run(args.views, args.repeat, args.language, (args.width, args.height), args.timezone,
+                       args.timeout),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
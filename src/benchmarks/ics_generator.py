@@ -0,0 +1,141 @@
+import random
+from datetime import datetime, timedelta
+
+# Full VTIMEZONE definitions, so the parser resolves TZIDs from the feed itself
+VTIMEZONES = {
+    "Europe/London": [
+        "BEGIN:VTIMEZONE", "TZID:Europe/London",
+        "BEGIN:DAYLIGHT", "TZOFFSETFROM:+0000", "TZOFFSETTO:+0100", "TZNAME:BST",
+        "DTSTART:19700329T010000", "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU", "END:DAYLIGHT",
+        "BEGIN:STANDARD", "TZOFFSETFROM:+0100", "TZOFFSETTO:+0000", "TZNAME:GMT",
+        "DTSTART:19701025T020000", "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU", "END:STANDARD",
+        "END:VTIMEZONE",
+    ],
+    "America/New_York": [
+        "BEGIN:VTIMEZONE", "TZID:America/New_York",
+        "BEGIN:DAYLIGHT", "TZOFFSETFROM:-0500", "TZOFFSETTO:-0400", "TZNAME:EDT",
+        "DTSTART:19700308T020000", "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=2SU", "END:DAYLIGHT",
+        "BEGIN:STANDARD", "TZOFFSETFROM:-0400", "TZOFFSETTO:-0500", "TZNAME:EST",
+        "DTSTART:19701101T020000", "RRULE:FREQ=YEARLY;BYMONTH=11;BYDAY=1SU", "END:STANDARD",
+        "END:VTIMEZONE",
+    ],
+    "W. Europe Standard Time": [
+        "BEGIN:VTIMEZONE", "TZID:W. Europe Standard Time",
+        "BEGIN:STANDARD", "DTSTART:16010101T030000", "TZOFFSETFROM:+0200", "TZOFFSETTO:+0100",
+        "RRULE:FREQ=YEARLY;INTERVAL=1;BYDAY=-1SU;BYMONTH=10", "END:STANDARD",
+        "BEGIN:DAYLIGHT", "DTSTART:16010101T020000", "TZOFFSETFROM:+0100", "TZOFFSETTO:+0200",
+        "RRULE:FREQ=YEARLY;INTERVAL=1;BYDAY=-1SU;BYMONTH=3", "END:DAYLIGHT",
+        "END:VTIMEZONE",
+    ],
+}
+
+TZIDS = list(VTIMEZONES)
+WORDS = ["planning", "review", "standup", "sync", "lunch", "workshop", "retro", "interview", "1:1", "demo",
+         "budget", "roadmap", "offsite", "training", "release", "support", "design", "hiring", "quarterly", "team"]
+RRULES = [
+    "FREQ=DAILY;COUNT={count}",
+    "FREQ=WEEKLY;BYDAY=MO,WE,FR",
+    "FREQ=WEEKLY;INTERVAL=2;UNTIL={until}",
+    "FREQ=MONTHLY;BYMONTHDAY={day}",
+    "FREQ=YEARLY",
+    "FREQ=WEEKLY;COUNT={count}",
+]
+
+
+def _fold(line):
+    """Fold a content line at 75 octets, as RFC 5545 requires."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return [line]
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1   # don't split a multi-byte character
+        parts.append(("" if not parts else " ") + data[:cut].decode("utf-8"))
+        data = data[cut:]
+    return parts
+
+
+def _fmt(value):
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _event_lines(rng, uid, reference, span_days):
+    """Returns the lines of one VEVENT and, for recurring events, the override blocks that go with it."""
+    start = reference + timedelta(days=rng.randint(-span_days, span_days),
+                                  hours=rng.randint(7, 19), minutes=rng.choice((0, 15, 30, 45)))
+    duration = timedelta(minutes=rng.choice((15, 30, 45, 60, 90, 120)))
+    summary = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} #{uid}"
+    description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+
+    lines = ["BEGIN:VEVENT", f"UID:{uid}@bench.tempo", "DTSTAMP:20250101T000000Z",
+             "SEQUENCE:0", f"LAST-MODIFIED:2025010{uid % 9 + 1}T120000Z"]
+    lines += _fold(f"SUMMARY:{summary}")
+    lines += _fold(f"DESCRIPTION:{description}")
+
+    kind = rng.random()
+    tzid = rng.choice(TZIDS)
+    if kind < 0.15:
+        # all-day
+        day = start.date()
+        lines += [f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+                  f"DTEND;VALUE=DATE:{day + timedelta(days=rng.choice((1, 1, 1, 2, 3))):%Y%m%d}"]
+    elif kind < 0.25:
+        # UTC
+        lines += [f"DTSTART:{_fmt(start)}Z", f"DTEND:{_fmt(start + duration)}Z"]
+    else:
+        lines += [f"DTSTART;TZID={tzid}:{_fmt(start)}", f"DTEND;TZID={tzid}:{_fmt(start + duration)}"]
+
+    overrides = []
+    if kind >= 0.25 and rng.random() < 0.15:
+        rule = rng.choice(RRULES).format(count=rng.randint(5, 60), day=start.day,
+                                         until=_fmt(start + timedelta(days=rng.randint(30, 400))) + "Z")
+        lines.append(f"RRULE:{rule}")
+        if rng.random() < 0.3:
+            lines.append(f"EXDATE;TZID={tzid}:{_fmt(start + timedelta(days=7))}")
+        if rng.random() < 0.3:
+            # move the second week's occurrence by a couple of hours
+            original = start + timedelta(days=7 if "WEEKLY" in rule else 1)
+            moved = original + timedelta(hours=2)
+            overrides.append(["BEGIN:VEVENT", f"UID:{uid}@bench.tempo", "DTSTAMP:20250101T000000Z",
+                              f"RECURRENCE-ID;TZID={tzid}:{_fmt(original)}", "SEQUENCE:1",
+                              f"SUMMARY:{summary} (moved)",
+                              f"DTSTART;TZID={tzid}:{_fmt(moved)}", f"DTEND;TZID={tzid}:{_fmt(moved + duration)}",
+                              "END:VEVENT"])
+
+    if rng.random() < 0.1:
+        lines += ["BEGIN:VALARM", "ACTION:DISPLAY", "DESCRIPTION:Reminder", "TRIGGER:-PT15M", "END:VALARM"]
+    lines.append("END:VEVENT")
+    return lines, overrides
+
+
+def generate_ics(path, num_events, reference=datetime(2025, 6, 15), span_days=730, seed=0):
+    """
+    Write a deterministic synthetic feed of num_events VEVENTs to path.
+
+    The same arguments always produce the same bytes. Events spread over span_days
+    either side of reference and mix timed, UTC and all-day events, recurring series
+    with EXDATEs and RECURRENCE-ID overrides (written later in the file, as exports
+    often do), VALARMs, three VTIMEZONEs and folded long lines.
+    """
+    rng = random.Random(seed)
+    pending_overrides = []
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        header = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Tempo//ICS benchmark//EN", "CALSCALE:GREGORIAN"]
+        for vtimezone in VTIMEZONES.values():
+            header += vtimezone
+        f.write("\r\n".join(header) + "\r\n")
+
+        for uid in range(num_events):
+            lines, overrides = _event_lines(rng, uid, reference, span_days)
+            pending_overrides += overrides
+            if pending_overrides and rng.random() < 0.05:
+                lines += pending_overrides.pop(0)
+            f.write("\r\n".join(lines) + "\r\n")
+
+        for override in pending_overrides:
+            f.write("\r\n".join(override) + "\r\n")
+        f.write("END:VCALENDAR\r\n")
+    return path
@@ -0,0 +1,225 @@
+"""
+Benchmark for stream_ical.load_ics_in_date_range on synthetic feeds.
+
+Run from the src directory:
+
+    python -m benchmarks.ics_parser --sizes 1000 10000 100000 --output results.json
+
+For every feed size and every calendar view, the sequential and parallel paths are
+measured in a fresh interpreter, so caches and the parse rate learned by one run
+don't leak into the next. Results are written as JSON for comparing releases.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+import psutil
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+VIEWS = ["timeGridDay", "timeGridWeek", "dayGridMonth", "listMonth"]
+MODES = ["sequential", "parallel"]
+REFERENCE_DATE = datetime(2025, 6, 15, 9, 30)
+RSS_SAMPLE_SECONDS = 0.02
+
+
+def view_ranges(views, reference=REFERENCE_DATE):
+    """Returns {view: (start, end)} as the calendar plugin computes them for the reference date."""
+    from plugins.calendar.calendar import Calendar
+    calendar = Calendar({"id": "calendar"})
+    return {view: calendar.get_view_range(view, reference, {}) for view in views}
+
+
+def _worker_pid(_):
+    return os.getpid()
+
+
+def measure(feed, start, end, mode, workers):
+    """Parses feed once in this process and returns the measurement."""
+    from concurrent.futures import ProcessPoolExecutor
+    from plugins.calendar.stream_ical import load_ics_in_date_range
+    from plugins.calendar.memory_monitor import MemoryMonitor
+    from plugins.calendar.worker_pool import _warm_up
+
+    executor = None
+    pool_startup = 0.0
+    if mode == "parallel":
+        # the plugin keeps a warm pool, so start the workers before the clock starts
+        started = time.perf_counter()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_warm_up)
+        list(executor.map(_worker_pid, range(workers * 2)))
+        pool_startup = time.perf_counter() - started
+
+    with MemoryMonitor(interval=RSS_SAMPLE_SECONDS) as monitor:
+        started = time.perf_counter()
+        events = list(load_ics_in_date_range(feed, start, end, return_type="record", default_tz="UTC",
+                                             parallel=mode == "parallel", num_workers=workers, executor=executor))
+        wall = time.perf_counter() - started
+
+    if executor is not None:
+        executor.shutdown()
+    return {
+        "wall_seconds": round(wall, 4),
+        "pool_startup_seconds": round(pool_startup, 4),
+        "events_found": len(events),
+        "peak_rss_mb": round(monitor.peak_rss / (1024 * 1024), 1),
+    }
+
+
+def check_budget():
+    """
+    Checks that the render service's browser doesn't count against the parse memory
+    budget: with it running, a budget just above the RSS of this process alone must
+    not be exceeded. Returns the result, with "ok" False when the browser was counted.
+    """
+    from plugins.calendar.memory_monitor import MemoryMonitor, renderer_pids
+    from utils.render_service import get_render_service, shutdown_render_service
+
+    try:
+        if get_render_service().render_html("<html><body></body></html>", (64, 64)) is None:
+            return {"ok": False, "error": "the render service could not start Chromium"}
+        browser_rss = 0
+        for pid in renderer_pids():
+            try:
+                browser_rss += psutil.Process(pid).memory_info().rss
+            except psutil.Error:
+                pass
+        own_rss = psutil.Process().memory_info().rss
+        monitor = MemoryMonitor(budget_bytes=own_rss + browser_rss // 2)
+        return {
+            "ok": not monitor.over_budget(),
+            "browser_rss_mb": round(browser_rss / (1024 * 1024), 1),
+            "monitored_rss_mb": round(monitor.peak_rss / (1024 * 1024), 1),
+            "budget_mb": round(monitor.budget_bytes / (1024 * 1024), 1),
+        }
+    finally:
+        shutdown_render_service()
+
+
+def run_measurement(feed, start, end, mode, workers):
+    """Runs measure() in a fresh interpreter and returns its result."""
+    command = [sys.executable, "-m", "benchmarks.ics_parser", "measure", feed,
+               "--start", start.isoformat(), "--end", end.isoformat(), "--mode", mode, "--workers", str(workers)]
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(command, cwd=src_dir, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_suite(sizes, views, modes, workers, repeat, feed_dir, seed):
+    from benchmarks.ics_generator import generate_ics
+
+    os.makedirs(feed_dir, exist_ok=True)
+    ranges = view_ranges(views)
+    results = []
+    for size in sizes:
+        feed = os.path.join(feed_dir, f"bench_{size}_{seed}.ics")
+        if not os.path.exists(feed):
+            print(f"Generating {feed}", file=sys.stderr)
+            generate_ics(feed, size, reference=REFERENCE_DATE, seed=seed)
+        file_bytes = os.path.getsize(feed)
+
+        for view in views:
+            start, end = ranges[view]
+            for mode in modes:
+                for run in range(repeat):
+                    result = run_measurement(feed, start, end, mode, workers)
+                    result.update({
+                        "events": size,
+                        "file_bytes": file_bytes,
+                        "view": view,
+                        "start": start.isoformat(),
+                        "end": end.isoformat(),
+                        "mode": mode,
+                        "workers": workers if mode == "parallel" else 1,
+                        "run": run,
+                        "events_per_second": round(size / result["wall_seconds"], 1),
+                    })
+                    print(f"{size:>7} events | {view:<13} | {mode:<10} | {result['wall_seconds']:8.3f}s "
+                          f"| {result['peak_rss_mb']:7.1f} MB | {result['events_found']} found", file=sys.stderr)
+                    results.append(result)
+    return results
+
+
+def metadata(seed):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "memory_mb": psutil.virtual_memory().total // (1024 * 1024),
+        "reference_date": REFERENCE_DATE.isoformat(),
+        "seed": seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the calendar .ics parser on synthetic feeds")
+    subparsers = parser.add_subparsers(dest="command")
+
+    suite = subparsers.add_parser("run", help="Run the benchmark suite (default)")
+    suite.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Feed sizes in events")
+    suite.add_argument("--views", nargs="+", default=VIEWS, choices=VIEWS)
+    suite.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    suite.add_argument("--workers", type=int, default=4, help="Workers for the parallel path")
+    suite.add_argument("--repeat", type=int, default=1, help="Runs per combination")
+    suite.add_argument("--seed", type=int, default=0, help="Generator seed")
+    suite.add_argument("--feed-dir", default=os.path.join("cache", "benchmarks"), help="Where generated feeds are kept")
+    suite.add_argument("--output", help="Write the JSON results here instead of stdout")
+
+    generate = subparsers.add_parser("generate", help="Only write a synthetic feed")
+    generate.add_argument("path")
+    generate.add_argument("events", type=int)
+    generate.add_argument("--seed", type=int, default=0)
+
+    single = subparsers.add_parser("measure", help="Measure a single parse (used by the suite)")
+    single.add_argument("feed")
+    single.add_argument("--start", required=True)
+    single.add_argument("--end", required=True)
+    single.add_argument("--mode", choices=MODES, default="sequential")
+    single.add_argument("--workers", type=int, default=4)
+
+    subparsers.add_parser("check-budget", help="Check that the render service's browser is left out of the "
+                                               "parse memory budget (needs Chromium)")
+
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in ("run", "generate", "measure", "check-budget", "-h", "--help"):
+        argv = ["run"] + argv
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        from benchmarks.ics_generator import generate_ics
+        generate_ics(args.path, args.events, reference=REFERENCE_DATE, seed=args.seed)
+    elif args.command == "measure":
+        result = measure(args.feed, datetime.fromisoformat(args.start), datetime.fromisoformat(args.end),
+                         args.mode, args.workers)
+        print(json.dumps(result))
+    elif args.command == "check-budget":
+        result = check_budget()
+        print(json.dumps(result))
+        if not result["ok"]:
+            sys.exit(1)
+    else:
+        report = {
+            "metadata": metadata(args.seed),
+            "results": run_suite(args.sizes, args.views, args.modes, args.workers, args.repeat, args.feed_dir, args.seed),
+        }
+        output = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(output + "\n")
+        else:
+            print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,23 @@ class Config:
     # Directory path for storing plugin instance images
     plugin_image_dir = os.path.join(BASE_DIR, "static", "images", "plugins")
 
+    # Directory path for storing parsed calendar feeds between refreshes
+    feed_cache_dir = os.path.join(BASE_DIR, "cache", "feeds")
+
+    # Directory path for storing the HTTP validators of each calendar feed, and its last downloaded copy when
+    # there is no RAM backed spool directory
+    feed_download_dir = os.path.join(BASE_DIR, "cache", "downloads")
+
+    # Directory path for storing synchronized CalDAV collections and their sync tokens
+    caldav_store_dir = os.path.join(BASE_DIR, "cache", "caldav")
+
+    # Directory path for storing rendered plugin images, reused while the rendered page is unchanged
+    render_cache_dir = os.path.join(BASE_DIR, "cache", "renders")
+
+    # RAM backed (tmpfs) directory for spooling feed downloads, keeps them off the SD card. Only the bodies go
+    # here, the validators stay in feed_download_dir so they survive a reboot
+    feed_spool_dir = os.path.join("/dev/shm", "tempo", "downloads") if os.path.isdir("/dev/shm") else None
+
     def __init__(self):
         self.config = self.read_config()
         self.plugins_list = self.read_plugins_list()
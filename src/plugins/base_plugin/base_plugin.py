@@ -2,9 +2,12 @@ import logging
 import os
 from utils.app_utils import resolve_path, get_fonts
 from utils.image_utils import take_screenshot_html
+from utils.render_cache import RenderCache
+from config import Config
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 from pathlib import Path
 import asyncio
+import time
 import base64
 
 logger = logging.getLogger(__name__)
@@ -13,6 +16,9 @@ PLUGINS_DIR = resolve_path("plugins")
 BASE_PLUGIN_DIR =  os.path.join(PLUGINS_DIR, "base_plugin")
 BASE_PLUGIN_RENDER_DIR = os.path.join(BASE_PLUGIN_DIR, "render")
 
+# rendered images of every plugin, so an unchanged page isn't screenshotted again
+RENDER_CACHE = RenderCache(Config.render_cache_dir)
+
 FRAME_STYLES = [
     {
         "name": "None",
@@ -49,6 +55,10 @@ class BasePlugin:
     def generate_image(self, settings, device_config):
         raise NotImplementedError("generate_image must be implemented by subclasses")
 
+    def cleanup(self):
+        """Releases long-lived resources (processes, connections) held by the plugin."""
+        pass
+
     def get_plugin_id(self):
         return self.config.get("id")
 
@@ -69,6 +79,20 @@ class BasePlugin:
         return template_params
 
     def render_image(self, dimensions, html_file, css_file=None, template_params={}):
+        started = time.perf_counter()
+        rendered_html, css_files = self.render_html(dimensions, html_file, css_file, template_params)
+        logger.info(f"Rendered {html_file} in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+        cache_key = RENDER_CACHE.key(rendered_html, dimensions, css_files)
+        image = RENDER_CACHE.get(cache_key)
+        if image is None:
+            image = take_screenshot_html(rendered_html, dimensions)
+            if image is not None:
+                RENDER_CACHE.put(cache_key, image)
+        return image
+
+    def render_html(self, dimensions, html_file, css_file=None, template_params={}):
+        """Renders the plugin's html template, returning the page and the style sheets it links."""
         # load the base plugin and current plugin css files
         css_files = [os.path.join(BASE_PLUGIN_RENDER_DIR, "plugin.css")]
         if css_file:
@@ -82,6 +106,4 @@ class BasePlugin:
 
         # load and render the given html template
         template = self.env.get_template(html_file)
-        rendered_html = template.render(template_params)
-
-        return take_screenshot_html(rendered_html, dimensions)
+        return template.render(template_params), css_files
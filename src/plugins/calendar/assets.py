@@ -0,0 +1,195 @@
+"""
+Local copies of the FullCalendar bundle, its locales and the Jersey fonts the calendar template uses.
+
+The template loads them from disk so a render makes no network requests. Fetch or
+refresh them (e.g. after bumping FULLCALENDAR_VERSION) from the src directory with:
+
+    python -m plugins.calendar.assets
+
+Every download is checked against the sha256 recorded in CHECKSUMS_FILE and
+rejected when it doesn't match or has no checksum. After a version bump, review a
+fresh download and record its checksums with --record-checksums, then commit them.
+"""
+import os
+import sys
+import hashlib
+import logging
+import tempfile
+import argparse
+from utils import http_client
+from utils.app_utils import resolve_path
+from plugins.calendar.constants import LOCALE_MAP
+
+logger = logging.getLogger(__name__)
+
+FULLCALENDAR_VERSION = "6.1.17"
+CDN_URL = "https://cdn.jsdelivr.net/npm"
+FONTS_URL = "https://raw.githubusercontent.com/google/fonts/main/ofl"
+GOOGLE_FONTS_URL = "https://fonts.googleapis.com/css2?family=Jersey+15&family=Jersey+20&family=Jersey+25&display=swap"
+
+VENDOR_DIR = resolve_path(os.path.join("static", "vendor", "fullcalendar", FULLCALENDAR_VERSION))
+FONT_DIR = resolve_path(os.path.join("static", "fonts", "Jersey"))
+# English is built into the bundle, every other language has its own locale file
+BUILT_IN_LOCALE = "en"
+
+JERSEY_FONTS = ["Jersey15-Regular.ttf", "Jersey20-Regular.ttf", "Jersey25-Regular.ttf"]
+
+# sha256 of every asset in `sha256sum` format, paths relative to the src directory. The fonts come from a
+# branch of google/fonts, so these are what pins them
+CHECKSUMS_FILE = resolve_path(os.path.join("plugins", "calendar", "assets.sha256"))
+
+
+def fullcalendar_url():
+    return f"{CDN_URL}/fullcalendar@{FULLCALENDAR_VERSION}/index.global.min.js"
+
+
+def locale_url(locale):
+    return f"{CDN_URL}/@fullcalendar/core@{FULLCALENDAR_VERSION}/locales/{locale}.global.min.js"
+
+
+def fullcalendar_path():
+    return os.path.join(VENDOR_DIR, "index.global.min.js")
+
+
+def locale_path(locale):
+    return os.path.join(VENDOR_DIR, "locales", f"{locale}.global.min.js")
+
+
+def all_assets():
+    """Returns (local path, source URL) for every asset the template can load."""
+    assets = [(fullcalendar_path(), fullcalendar_url())]
+    assets += [(locale_path(locale), locale_url(locale)) for locale in LOCALE_MAP if locale != BUILT_IN_LOCALE]
+    assets += [(os.path.join(FONT_DIR, name), f"{FONTS_URL}/{name.split('-')[0].lower()}/{name}")
+               for name in JERSEY_FONTS]
+    return assets
+
+
+def template_scripts(language, local=True):
+    """
+    Returns the FullCalendar and locale scripts for a render in `language`: local file
+    paths, or the CDN URL of an asset that hasn't been fetched yet (of every asset without local).
+    """
+    scripts = [(fullcalendar_path(), fullcalendar_url())]
+    if language and language != BUILT_IN_LOCALE and language in LOCALE_MAP:
+        scripts.append((locale_path(language), locale_url(language)))
+
+    sources = []
+    for path, url in scripts:
+        if not local:
+            sources.append(url)
+        elif os.path.isfile(path):
+            sources.append(path)
+        else:
+            logger.warning(f"{path} is missing, loading it from {url}. Run 'python -m plugins.calendar.assets'")
+            sources.append(url)
+    return sources
+
+
+def font_stylesheet(local=True):
+    """Returns the Google Fonts stylesheet URL while the Jersey fonts haven't been fetched (or without local)."""
+    if not local:
+        return GOOGLE_FONTS_URL
+    missing = [name for name in JERSEY_FONTS if not os.path.isfile(os.path.join(FONT_DIR, name))]
+    if not missing:
+        return None
+    logger.warning(f"{', '.join(missing)} missing from {FONT_DIR}, loading the Jersey fonts from Google Fonts. "
+                   f"Run 'python -m plugins.calendar.assets'")
+    return GOOGLE_FONTS_URL
+
+
+def _relative(path):
+    return os.path.relpath(path, resolve_path(""))
+
+
+def _sha256(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def load_checksums():
+    """Returns {path relative to src: sha256} from CHECKSUMS_FILE."""
+    checksums = {}
+    try:
+        with open(CHECKSUMS_FILE) as f:
+            for line in f:
+                if line.strip() and not line.startswith("#"):
+                    digest, path = line.split(maxsplit=1)
+                    checksums[path.strip()] = digest
+    except FileNotFoundError:
+        pass
+    return checksums
+
+
+def save_checksums(checksums):
+    with open(CHECKSUMS_FILE, "w") as f:
+        f.write("# sha256 of the calendar assets, see plugins/calendar/assets.py\n")
+        for path in sorted(checksums):
+            f.write(f"{checksums[path]}  {path}\n")
+
+
+def _verified(path, checksums):
+    """Returns whether the local copy at path matches its recorded checksum."""
+    try:
+        with open(path, "rb") as f:
+            return checksums.get(_relative(path)) == _sha256(f.read())
+    except OSError:
+        return False
+
+
+def fetch_assets(force=False, timeout=30, record=False):
+    """
+    Downloads the missing assets and those that don't match their checksum (all of
+    them with force), returning the paths that failed. With record, the checksums of
+    the downloads are written to CHECKSUMS_FILE instead of being checked.
+    """
+    checksums = load_checksums()
+    if not checksums and not record:
+        logger.error(f"{CHECKSUMS_FILE} has no checksums, so no asset can be verified. Record them with "
+                     f"'python -m plugins.calendar.assets --record-checksums' on a trusted network and commit it")
+        return [path for path, _ in all_assets()]
+    failed = []
+    for path, url in all_assets():
+        if not force and not record and _verified(path, checksums):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            response = http_client.get(url, timeout=timeout)
+            response.raise_for_status()
+            if not response.content:
+                raise ValueError("empty response")
+            digest = _sha256(response.content)
+            if record:
+                checksums[_relative(path)] = digest
+            elif _relative(path) not in checksums:
+                raise ValueError(f"no checksum recorded in {CHECKSUMS_FILE}")
+            elif checksums[_relative(path)] != digest:
+                raise ValueError(f"checksum mismatch, got sha256 {digest}")
+            # write atomically so an interrupted download never leaves a truncated asset behind
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(response.content)
+            os.replace(tmp_path, path)
+            logger.info(f"Fetched {url} to {path}")
+        except Exception as e:
+            logger.error(f"Failed to fetch {url}: {e}")
+            failed.append(path)
+    if record:
+        save_checksums(checksums)
+        logger.info(f"Recorded the checksums in {CHECKSUMS_FILE}, review the downloads before committing it")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch the calendar template's FullCalendar, locale and font files")
+    parser.add_argument("--force", action="store_true", help="Download every asset again")
+    parser.add_argument("--record-checksums", action="store_true",
+                        help="Download every asset and record its checksum instead of checking it")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    failed = fetch_assets(force=args.force, record=args.record_checksums)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+import threading
+from urllib.parse import urlparse, unquote
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+from utils import http_client
+
+logger = logging.getLogger(__name__)
+
+DAV = "{DAV:}"
+CALDAV = "{urn:ietf:params:xml:ns:caldav}"
+
+# Resources requested per calendar-multiget REPORT
+MULTIGET_BATCH = 100
+# sync-collection rounds per sync, guards against a server that keeps truncating
+MAX_SYNC_ROUNDS = 50
+
+SYNC_COLLECTION = """<?xml version="1.0" encoding="utf-8"?>
+<d:sync-collection xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">
+  <d:sync-token>{token}</d:sync-token>
+  <d:sync-level>1</d:sync-level>
+  <d:prop><d:getetag/><c:calendar-data/></d:prop>
+</d:sync-collection>"""
+
+CALENDAR_MULTIGET = """<?xml version="1.0" encoding="utf-8"?>
+<c:calendar-multiget xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">
+  <d:prop><d:getetag/><c:calendar-data/></d:prop>
+  {hrefs}
+</c:calendar-multiget>"""
+
+XML_HEADERS = {"Content-Type": "application/xml; charset=utf-8"}
+
+
+class InvalidSyncToken(Exception):
+    """The server no longer accepts the stored sync token, a full sync is needed."""
+
+
+def _url_digest(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _status_code(status):
+    """Return the code of a DAV:status line such as 'HTTP/1.1 404 Not Found', or None."""
+    parts = (status or "").split()
+    return int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+
+
+def _parse_multistatus(content, collection_path):
+    """
+    Parse a sync-collection or calendar-multiget multistatus body.
+
+    Returns (updated, deleted, missing, token, truncated): updated maps href to
+    (etag, calendar data), deleted and missing list the hrefs that were removed or
+    came without calendar data, token is the new sync token (None for a multiget)
+    and truncated tells whether the server holds back further changes.
+    """
+    root = ElementTree.fromstring(content)
+    updated, deleted, missing = {}, [], []
+    truncated = False
+    for response in root.iter(f"{DAV}response"):
+        href = (response.findtext(f"{DAV}href") or "").strip()
+        if not href:
+            continue
+        status = _status_code(response.findtext(f"{DAV}status"))
+        if unquote(urlparse(href).path).rstrip("/") == collection_path:
+            # the collection itself only shows up to report a truncated result
+            truncated = truncated or status == 507
+            continue
+        if status == 404:
+            deleted.append(href)
+            continue
+
+        for propstat in response.iter(f"{DAV}propstat"):
+            if _status_code(propstat.findtext(f"{DAV}status")) != 200:
+                continue
+            etag = propstat.findtext(f"{DAV}prop/{DAV}getetag")
+            data = propstat.findtext(f"{DAV}prop/{CALDAV}calendar-data")
+            if data and data.strip():
+                updated[href] = (etag, data)
+            else:
+                missing.append(href)
+            break
+
+    token = root.findtext(f"{DAV}sync-token")
+    return updated, deleted, [href for href in missing if href not in updated], token, truncated
+
+
+def _components(data):
+    """Yield (name, lines) for each component directly inside the VCALENDAR of a resource."""
+    current = None
+    name = None
+    depth = 0
+    for line in data.splitlines():
+        if current is None:
+            if line.startswith("BEGIN:") and line != "BEGIN:VCALENDAR":
+                name = line[6:].strip()
+                current = [line]
+                depth = 0
+            continue
+        current.append(line)
+        if line.startswith("BEGIN:"):
+            depth += 1
+        elif line.startswith("END:"):
+            if depth == 0:
+                yield name, current
+                current = None
+            else:
+                depth -= 1
+
+
+def _merge_resources(resources):
+    """Combine the calendar objects of a collection into one VCALENDAR, sharing their VTIMEZONEs."""
+    timezones = {}
+    events = []
+    for href in sorted(resources):
+        for name, lines in _components(resources[href][1]):
+            if name == "VTIMEZONE":
+                tzid = next((line.partition(":")[2] for line in lines if line.startswith("TZID")), None)
+                timezones.setdefault(tzid, lines)
+            elif name == "VEVENT":
+                events.append(lines)
+
+    out = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Tempo//CalDAV sync//EN"]
+    for lines in timezones.values():
+        out.extend(lines)
+    for lines in events:
+        out.extend(lines)
+    out.append("END:VCALENDAR")
+    return "\r\n".join(out) + "\r\n"
+
+
+class CalDAVSync:
+    """Keeps a local copy of CalDAV collections up to date with sync-collection REPORTs.
+
+    The calendar objects of each collection are stored on disk together with the sync
+    token the server returned for them (RFC 6578). Each sync sends that token, so only
+    the resources changed or deleted since the previous sync are downloaded. Servers
+    that leave calendar data out of the sync report are asked for it with a
+    calendar-multiget. The stored objects are merged into a single .ics file that is
+    parsed like any downloaded feed.
+
+    Attributes:
+        store_dir (str): Directory holding the per-collection stores and merged .ics files.
+        changes (int): Total resources updated or deleted by syncs.
+        full_syncs (int): Syncs that had to start without a (valid) token.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.changes = 0
+        self.full_syncs = 0
+        self.lock = threading.Lock()
+
+    def _paths(self, url):
+        """Returns the (store, merged .ics) file paths for a collection URL."""
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        return (os.path.join(self.store_dir, f"{name}.pickle"),
+                os.path.join(self.store_dir, f"{name}.ics"))
+
+    def _load_store(self, url):
+        store_path, _ = self._paths(url)
+        try:
+            with open(store_path, "rb") as f:
+                store = pickle.load(f)
+        except FileNotFoundError:
+            return {"url_digest": _url_digest(url), "token": None, "resources": {}}
+        except Exception as e:
+            logger.warning(f"Discarding unreadable CalDAV store {store_path}: {e}")
+            return {"url_digest": _url_digest(url), "token": None, "resources": {}}
+        # guard against hash collisions between collection URLs, by digest so the store holds no credentials
+        if store.get("url_digest") != _url_digest(url):
+            return {"url_digest": _url_digest(url), "token": None, "resources": {}}
+        return store
+
+    def _write(self, path, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def local_copy(self, url):
+        """Returns the path of the merged .ics of the last sync of `url`, or None when it was never synced."""
+        _, ics_path = self._paths(url)
+        return ics_path if os.path.exists(ics_path) else None
+
+    def sync(self, url, timeout=None):
+        """Synchronizes the collection at `url` and returns the path of its merged .ics file."""
+        os.makedirs(self.store_dir, exist_ok=True)
+        store_path, ics_path = self._paths(url)
+        store = self._load_store(url)
+
+        try:
+            changed = self._sync_changes(url, store, timeout)
+        except InvalidSyncToken:
+            logger.info(f"Sync token of {url} is no longer valid, synchronizing it in full")
+            store = {"url_digest": _url_digest(url), "token": None, "resources": {}}
+            self._sync_changes(url, store, timeout)
+            changed = True  # resources deleted while the token was invalid are only gone from the new store
+
+        if changed or not os.path.exists(ics_path):
+            merged = _merge_resources(store["resources"]).encode("utf-8")
+            self._write(ics_path, lambda f: f.write(merged))
+        self._write(store_path, lambda f: pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL))
+        return ics_path
+
+    def _sync_changes(self, url, store, timeout):
+        """Applies the changes since store's token to store, returning whether any resource changed."""
+        collection_path = unquote(urlparse(url).path).rstrip("/")
+        full_sync = store["token"] is None
+        updated_count = deleted_count = fetched_count = 0
+
+        for _ in range(MAX_SYNC_ROUNDS):
+            body = SYNC_COLLECTION.format(token=escape(store["token"] or ""))
+            response = http_client.request("REPORT", url, timeout=timeout, data=body.encode("utf-8"),
+                                           headers={**XML_HEADERS, "Depth": "0"})
+            if response.status_code in (403, 409) and b"valid-sync-token" in response.content and store["token"]:
+                raise InvalidSyncToken(url)
+            response.raise_for_status()
+            if response.status_code != 207:
+                raise ValueError(f"{url} is not a CalDAV collection supporting sync-collection "
+                                 f"(status {response.status_code})")
+
+            updated, deleted, missing, token, truncated = _parse_multistatus(response.content, collection_path)
+            for href in deleted:
+                if store["resources"].pop(href, None) is not None:
+                    deleted_count += 1
+            for start in range(0, len(missing), MULTIGET_BATCH):
+                fetched = self._multiget(url, missing[start:start + MULTIGET_BATCH], collection_path, timeout)
+                fetched_count += len(fetched)
+                updated.update(fetched)
+            for href, resource in updated.items():
+                if store["resources"].get(href) != resource:
+                    store["resources"][href] = resource
+                    updated_count += 1
+
+            store["token"] = token
+            if not truncated or not token:
+                break
+
+        with self.lock:
+            self.changes += updated_count + deleted_count
+            self.full_syncs += full_sync
+        logger.info(f"CalDAV sync of {url} | {'full' if full_sync else 'incremental'} | updated: {updated_count} "
+                    f"| deleted: {deleted_count} | multiget: {fetched_count} | resources: {len(store['resources'])}")
+        return bool(updated_count or deleted_count)
+
+    def _multiget(self, url, hrefs, collection_path, timeout):
+        """Fetches the calendar data of hrefs with a calendar-multiget REPORT, returning {href: (etag, data)}."""
+        body = CALENDAR_MULTIGET.format(hrefs="".join(f"<d:href>{escape(href)}</d:href>" for href in hrefs))
+        response = http_client.request("REPORT", url, timeout=timeout, data=body.encode("utf-8"),
+                                       headers={**XML_HEADERS, "Depth": "1"})
+        response.raise_for_status()
+        updated, _, _, _, _ = _parse_multistatus(response.content, collection_path)
+        return updated
@@ -1,31 +1,68 @@
 import os
 from utils.app_utils import resolve_path, get_font
+from utils.http_client import redact_url
 from plugins.base_plugin.base_plugin import BasePlugin
-from plugins.calendar.constants import LOCALE_MAP, FONT_SIZES
-from plugins.calendar.stream_ical import load_ics_in_date_range
+from plugins.calendar.constants import (LOCALE_MAP, FONT_SIZES, FEED_FETCH_WORKERS, FEED_TIMEOUT_SECONDS,
+                                        FEED_RETRIES, FEED_RETRY_BACKOFF_SECONDS, FEED_DEADLINE_SECONDS,
+                                        CALENDAR_SOURCES, FEED_POLL_DEFAULT_SECONDS, FEED_POLL_MIN_SECONDS,
+                                        FEED_POLL_MAX_SECONDS, FEED_POLL_JITTER, RENDER_ENGINES,
+                                        DEFAULT_WEEK_START_DAY)
+from plugins.calendar.stream_ical import (load_ics_in_date_range, load_ics_stream, load_cached_events, has_feed_index,
+                                         PARSE_POLICY)
+from plugins.calendar.parse_policy import PARSE_MODES
+from plugins.calendar.memory_monitor import MemoryMonitor
+from plugins.calendar.event_filter import EventFilter
+from plugins.calendar.feed_cache import FeedCache
+from plugins.calendar.feed_index import FeedIndex
+from plugins.calendar.feed_fetcher import FeedFetcher
+from plugins.calendar.caldav_sync import CalDAVSync
+from plugins.calendar.feed_schedule import FeedSchedule, http_freshness, feed_ttl
+from plugins.calendar.worker_pool import ICSWorkerPool
+from plugins.calendar.native_renderer import NativeCalendarRenderer
+from plugins.calendar.assets import template_scripts, font_stylesheet
+from config import Config
 from PIL import Image, ImageColor, ImageDraw, ImageFont
-import tempfile
-import urllib.request
-import shutil
+from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 import recurring_ical_events
 import logging
 import requests
+import time
 from datetime import datetime, timedelta
 import pytz
 
 logger = logging.getLogger(__name__)
 
 class Calendar(BasePlugin):
+    def __init__(self, config, **dependencies):
+        super().__init__(config, **dependencies)
+        self.feed_cache = FeedCache(Config.feed_cache_dir)
+        self.feed_index = FeedIndex(os.path.join(Config.feed_cache_dir, "index"))
+        self.feed_fetcher = FeedFetcher(Config.feed_download_dir, Config.feed_spool_dir)
+        self.caldav_sync = CalDAVSync(Config.caldav_store_dir)
+        # one schedule per feed URL, shared by every calendar instance
+        self.feed_schedule = FeedSchedule(os.path.join(Config.feed_cache_dir, "schedule.json"),
+                                          FEED_POLL_DEFAULT_SECONDS, FEED_POLL_MIN_SECONDS, FEED_POLL_MAX_SECONDS,
+                                          FEED_POLL_JITTER)
+        self.worker_pool = ICSWorkerPool()
+
+    def cleanup(self):
+        self.worker_pool.shutdown()
+
     def generate_settings_template(self):
         template_params = super().generate_settings_template()
         template_params['style_settings'] = True
         template_params['locale_map'] = LOCALE_MAP
+        template_params['feed_schedule'] = self.feed_schedule.snapshot()
+        template_params['default_week_start_day'] = DEFAULT_WEEK_START_DAY
         return template_params
 
     def generate_image(self, settings, device_config):
         calendar_urls = settings.get('calendarURLs[]')
         calendar_colors = settings.get('calendarColors[]')
+        calendar_sources = settings.get('calendarSources[]') or []
         view = settings.get("viewMode")
+        render_engine = settings.get("renderEngine") or "chromium"
 
         if not view:
             raise RuntimeError("View is required")
@@ -37,6 +74,11 @@ class Calendar(BasePlugin):
         for url in calendar_urls:
             if not url.strip():
                 raise RuntimeError("Invalid calendar URL")
+        for source in calendar_sources:
+            if source not in CALENDAR_SOURCES:
+                raise RuntimeError("Invalid calendar source")
+        if render_engine not in RENDER_ENGINES:
+            raise RuntimeError("Invalid render engine")
 
         dimensions = device_config.get_resolution()
         if device_config.get_config("orientation") == "vertical":
@@ -48,54 +90,85 @@ class Calendar(BasePlugin):
 
         current_dt = datetime.now(tz)
         start, end = self.get_view_range(view, current_dt, settings)
-        events = self.fetch_ics_events(calendar_urls, calendar_colors, tz, start, end)
+        events = self.fetch_ics_events(calendar_urls, calendar_colors, tz, start, end, settings, calendar_sources)
         if not events:
             logger.warn("No events found for ics url")
 
         if view == 'timeGridWeek' and settings.get("displayPreviousDays") != "true":
             view = 'timeGrid'
 
-        template_params = {
+        image = self.render_calendar(render_engine, dimensions, view, events, current_dt, timezone, time_format,
+                                     settings)
+
+        if not image:
+            raise RuntimeError("Failed to take screenshot, please check logs.")
+        return image
+
+    def render_calendar(self, render_engine, dimensions, view, events, current_dt, timezone, time_format, settings):
+        """
+        Draws the view with the native renderer, or screenshots it in Chromium: as the
+        FullCalendar template, or laid out by the native renderer (static).
+        """
+        if render_engine in ("native", "static"):
+            font_scale = FONT_SIZES.get(settings.get("fontSize", "normal"))
+            renderer = NativeCalendarRenderer(dimensions, settings, time_format, font_scale)
+            if render_engine == "native":
+                return renderer.render(view, events, current_dt, pytz.timezone(timezone))
+            # laid out in Python, so Chromium only paints pre-positioned shapes
+            svg = renderer.render_svg(view, events, current_dt, pytz.timezone(timezone))
+            return self.render_image(dimensions, "calendar_static.html", template_params={"svg": svg})
+
+        template_params = self.get_template_params(view, events, current_dt, timezone, time_format, settings)
+        return self.render_image(dimensions, "calendar.html", "calendar.css", template_params)
+
+    def get_template_params(self, view, events, current_dt, timezone, time_format, settings, local_assets=True):
+        """Returns the calendar.html parameters, loading FullCalendar and the fonts from the CDNs without local_assets."""
+        return {
             "view": view,
             "events": events,
             "current_dt": current_dt.replace(minute=0, second=0, microsecond=0).isoformat(),
             "timezone": timezone,
             "plugin_settings": settings,
+            "week_start_day": int(settings.get("weekStartDay") or DEFAULT_WEEK_START_DAY),
             "time_format": time_format,
-            "font_scale": FONT_SIZES.get(settings.get("fontSize", "normal"))
+            "font_scale": FONT_SIZES.get(settings.get("fontSize", "normal")),
+            "scripts": template_scripts(settings.get("language"), local_assets),
+            "font_stylesheet": font_stylesheet(local_assets)
         }
+    
+    def fetch_ics_events(self, calendar_urls, colors, tz, start_range, end_range, settings=None, sources=()):
+        settings = settings if settings is not None else {}
+        # instances saved before CalDAV support have no sources, their URLs are all .ics feeds
+        sources = list(sources) + ["ics"] * (len(calendar_urls) - len(sources))
+        feeds = list(zip(calendar_urls, colors, sources))
+        feed_events = self.fetch_calendars(feeds, tz, start_range, end_range, settings)
+        # once every feed is parsed incrementally the workers would only sit on their memory
+        self.worker_pool.shutdown_if_unused()
 
-        image = self.render_image(dimensions, "calendar.html", "calendar.css", template_params)
+        memory_budget = self.get_memory_budget(settings)
+        if memory_budget is not None and self.worker_pool.executor is not None:
+            if MemoryMonitor(memory_budget).over_budget():
+                # idle workers hold on to memory the budget doesn't allow for
+                logger.info("Over the memory budget, stopping the ICS worker pool")
+                self.worker_pool.shutdown(wait=False)
 
-        if not image:
-            raise RuntimeError("Failed to take screenshot, please check logs.")
-        return image
-    
-    def fetch_ics_events(self, calendar_urls, colors, tz, start_range, end_range):
-        parsed_events = []
-        # De-duplicate events - Google sometimes duplicates specific and reoccuring events
-        seen_events = set()
-
-        for calendar_url, color in zip(calendar_urls, colors):
-            events = self.fetch_calendar(calendar_url, start_range, end_range)
-            contrast_color = self.get_contrast_color(color)
-            for event in events:
-                start, end, all_day = self.parse_data_points(event, tz)
-                event_key = str(event.get("summary")) + "_" + str(event.get("dtstart"))
-                if event_key not in seen_events:
-                    parsed_event = {
-                        "title": str(event.get("summary")),
-                        "start": start,
-                        "backgroundColor": color,
-                        "textColor": contrast_color,
-                        "allDay": all_day
-                    }
-                    if end:
-                      parsed_event['end'] = end
-
-                    parsed_events.append(parsed_event)
-                    seen_events.add(event_key)
-        return parsed_events
+        return [event for events in feed_events for event in events]
+
+    def to_template_events(self, events, color, tz):
+        """Converts parsed events into the dicts the template renders, one at a time."""
+        contrast_color = self.get_contrast_color(color)
+        for event in events:
+            start, end, all_day = self.parse_data_points(event, tz)
+            parsed_event = {
+                "title": str(event.summary),
+                "start": start,
+                "backgroundColor": color,
+                "textColor": contrast_color,
+                "allDay": all_day
+            }
+            if end:
+              parsed_event['end'] = end
+            yield parsed_event
     
     def get_view_range(self, view, current_dt, settings):
         start = datetime(current_dt.year, current_dt.month, current_dt.day)
@@ -103,7 +176,7 @@ class Calendar(BasePlugin):
             end = start + timedelta(days=1)
         elif view == "timeGridWeek":
             if settings.get("displayPreviousDays") == "true":
-                week_start_day = int(settings.get("weekStartDay", 1))
+                week_start_day = int(settings.get("weekStartDay") or DEFAULT_WEEK_START_DAY)
                 python_week_start = (week_start_day - 1) % 7
                 offset = (current_dt.weekday() - python_week_start) % 7
                 start = current_dt - timedelta(days=offset)
@@ -117,40 +190,222 @@ class Calendar(BasePlugin):
         return start, end
         
     def parse_data_points(self, event, tz):
-        all_day = False
-        dtstart = event.decoded("dtstart")
-        if isinstance(dtstart, datetime):
-            start = dtstart.astimezone(tz).isoformat()
+        if isinstance(event.dtstart, datetime):
+            start = event.dtstart.astimezone(tz).isoformat()
         else:
-            start = dtstart.isoformat()
-            all_day = True
+            start = event.dtstart.isoformat()
 
         end = None
-        if "dtend" in event:
-            dtend = event.decoded("dtend")
-            if isinstance(dtend, datetime):
-                end = dtend.astimezone(tz).isoformat()
+        if event.dtend is not None:
+            if isinstance(event.dtend, datetime):
+                end = event.dtend.astimezone(tz).isoformat()
+            else:
+                end = event.dtend.isoformat()
+        return start, end, event.all_day
+
+    def fetch_calendars(self, feeds, tz, start_range, end_range, settings=None):
+        """
+        Downloads and parses the (url, color, source) feeds concurrently, returning their events in the order of feeds.
+
+        Each feed is parsed as soon as its own download finishes. Feeds that have not finished
+        by FEED_DEADLINE_SECONDS are skipped so that a single slow server cannot hold up the render.
+        """
+        settings = settings if settings is not None else {}
+        executor = ThreadPoolExecutor(max_workers=max(1, min(FEED_FETCH_WORKERS, len(feeds))))
+        futures = [executor.submit(self.fetch_calendar, url, color, tz, start_range, end_range, settings, source)
+                   for url, color, source in feeds]
+        _, not_done = wait(futures, timeout=FEED_DEADLINE_SECONDS)
+        # don't block on stragglers, they finish (or fail) in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        results = []
+        for (calendar_url, _, _), future in zip(feeds, futures):
+            if future in not_done:
+                logger.error(f"Timed out after {FEED_DEADLINE_SECONDS}s fetching {calendar_url}, skipping it")
+                results.append([])
             else:
-                end = dtend.isoformat()
-        elif "duration" in event:
-            duration = event.decoded("duration")
-            end = (dtstart + duration).isoformat()
-        return start, end, all_day
+                results.append(future.result())
+        return results
+
+    def fetch_calendar(self, calendar_url, color, tz, start_range, end_range, settings=None, source="ics"):
+        """
+        Fetches one feed when it is due and parses it, returning its events converted for the template.
+
+        Feeds that are not due on the feed schedule, or whose fetch fails, are parsed
+        from the local copy of their last successful fetch.
+        """
+        settings = settings if settings is not None else {}
+        memory_budget = self.get_memory_budget(settings)
+        trace_allocations = self.get_trace_allocations(settings)
+        event_filter = self.get_event_filter(settings)
+        if source == "caldav":
+            local_copy = self.caldav_sync.local_copy(calendar_url)
+        else:
+            local_copy = self.feed_fetcher.local_copy(calendar_url)
 
-    def fetch_calendar(self, calendar_url, start_range, end_range):
         try:
-            with (urllib.request.urlopen(calendar_url) as response,
-                  tempfile.NamedTemporaryFile(delete=True, delete_on_close=False,  suffix=".ics") as tmp_file):
-                logger.info(f"Downloading .ics file at {calendar_url}")
-                shutil.copyfileobj(response, tmp_file)
-                tmp_file.flush()
-                temp_path = tmp_file.name
-                logger.info(f"Saved .ics file to {temp_path}")
-                l = list(load_ics_in_date_range(temp_path, return_type="event", start=start_range, end=end_range))
-                logger.info(f"Found {len(l)} events in .ics file from {calendar_url}")
-                return l
+            if local_copy and not self.feed_schedule.is_due(calendar_url):
+                next_due = datetime.fromtimestamp(self.feed_schedule.get(calendar_url)["next_due"])
+                logger.info(f"{calendar_url} is not due until {next_due:%H:%M:%S}, using its local copy")
+                return self.load_local_copy(local_copy, calendar_url, color, tz, start_range, end_range, settings,
+                                            memory_budget, event_filter, trace_allocations)
+            try:
+                if source == "caldav":
+                    return self.sync_calendar(calendar_url, color, tz, start_range, end_range, settings,
+                                              memory_budget, event_filter, trace_allocations)
+                return self.download_calendar(calendar_url, color, tz, start_range, end_range, settings,
+                                              memory_budget, event_filter, trace_allocations)
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                self.feed_schedule.record_failure(calendar_url, e)
+                if not local_copy:
+                    raise
+                logger.warning(f"Fetching {calendar_url} failed ({e}), using the local copy of its last fetch")
+                return self.load_local_copy(local_copy, calendar_url, color, tz, start_range, end_range, settings,
+                                            memory_budget, event_filter, trace_allocations)
+        except BrokenProcessPool as e:
+            # a worker died (e.g. OOM killed), start a fresh pool on the next refresh
+            self.worker_pool.shutdown(wait=False)
+            raise RuntimeError(f"Failed to fetch iCalendar url: {redact_url(e)}")
         except Exception as e:
-            raise RuntimeError(f"Failed to fetch iCalendar url: {str(e)}")
+            raise RuntimeError(f"Failed to fetch iCalendar url: {redact_url(e)}")
+
+    def download_calendar(self, calendar_url, color, tz, start_range, end_range, settings, memory_budget=None,
+                          event_filter=None, trace_allocations=False):
+        """Downloads (or revalidates) an .ics feed and parses it, streaming when the plan allows."""
+        download = self.feed_fetcher.open(calendar_url, timeout=FEED_TIMEOUT_SECONDS,
+                                          retries=FEED_RETRIES, backoff=FEED_RETRY_BACKOFF_SECONDS)
+        with download:
+            plan = self.get_parse_plan(download.size_hint, calendar_url, settings, memory_budget, event_filter)
+            if download.not_modified and not download.has_copy:
+                l = self.load_uncopied_calendar(download, color, tz, start_range, end_range, plan, memory_budget,
+                                                event_filter, trace_allocations)
+            elif download.not_modified or plan.parallel:
+                download.save()
+                l = self.load_calendar(download.path, calendar_url, color, tz, start_range, end_range, plan,
+                                       memory_budget, event_filter, trace_allocations)
+            else:
+                l = self.stream_calendar(download, color, tz, start_range, end_range, plan, memory_budget,
+                                         event_filter, trace_allocations)
+        self.feed_schedule.record_success(calendar_url, [http_freshness(download.headers), feed_ttl(download.path)])
+        logger.info(f"Found {len(l)} events in .ics file from {calendar_url}")
+        return l
+
+    def load_uncopied_calendar(self, download, color, tz, start_range, end_range, plan, memory_budget=None,
+                               event_filter=None, trace_allocations=False):
+        """
+        Returns the events of a feed that wasn't modified but whose spooled copy was lost
+        with a reboot: from the feed cache by content digest, or else downloaded again.
+        """
+        events = None
+        if download.digest:
+            events = load_cached_events(self.feed_cache, download.url, download.digest, return_type="record",
+                                        start=start_range, end=end_range, event_filter=event_filter)
+        if events is not None:
+            return list(self.to_template_events(events, color, tz))
+        logger.info(f"No local copy or cached events for {download.url}, downloading it again")
+        feed_path = self.feed_fetcher.fetch(download.url, timeout=FEED_TIMEOUT_SECONDS, retries=FEED_RETRIES,
+                                            backoff=FEED_RETRY_BACKOFF_SECONDS, conditional=False)
+        return self.load_calendar(feed_path, download.url, color, tz, start_range, end_range, plan, memory_budget,
+                                  event_filter, trace_allocations)
+
+    def sync_calendar(self, calendar_url, color, tz, start_range, end_range, settings, memory_budget=None,
+                      event_filter=None, trace_allocations=False):
+        """Brings the local copy of a CalDAV collection up to date and parses it."""
+        feed_path = self.caldav_sync.sync(calendar_url, timeout=FEED_TIMEOUT_SECONDS)
+        self.feed_schedule.record_success(calendar_url, [feed_ttl(feed_path)])
+        plan = self.get_parse_plan(os.path.getsize(feed_path), calendar_url, settings, memory_budget,
+                                   event_filter)
+        l = self.load_calendar(feed_path, calendar_url, color, tz, start_range, end_range, plan, memory_budget,
+                               event_filter, trace_allocations)
+        logger.info(f"Found {len(l)} events in CalDAV collection {calendar_url}")
+        return l
+
+    def load_local_copy(self, feed_path, calendar_url, color, tz, start_range, end_range, settings,
+                        memory_budget=None, event_filter=None, trace_allocations=False):
+        """Parses the local copy of a feed left by its last successful fetch."""
+        plan = self.get_parse_plan(os.path.getsize(feed_path), calendar_url, settings, memory_budget,
+                                   event_filter)
+        l = self.load_calendar(feed_path, calendar_url, color, tz, start_range, end_range, plan, memory_budget,
+                               event_filter, trace_allocations)
+        logger.info(f"Found {len(l)} events in the local copy of {calendar_url}")
+        return l
+
+    def get_memory_budget(self, settings):
+        """Returns the RSS budget in bytes from the memoryBudget setting (MB), or None when unset."""
+        try:
+            budget_mb = int(settings.get("memoryBudget") or 0)
+        except ValueError:
+            raise RuntimeError("Invalid memory budget")
+        return budget_mb * 1024 * 1024 if budget_mb > 0 else None
+
+    def get_trace_allocations(self, settings):
+        """Returns whether the traceAllocations setting asks for Python allocations to be traced while parsing."""
+        return settings.get("traceAllocations") == "true"
+
+    def get_event_filter(self, settings):
+        """Returns the EventFilter for the filterInclude / filterExclude settings, or None when both are empty."""
+        try:
+            return EventFilter.from_text(settings.get("filterInclude") or "", settings.get("filterExclude") or "")
+        except ValueError as e:
+            raise RuntimeError(str(e))
+
+    def get_parse_plan(self, size, calendar_url, settings, memory_budget=None, event_filter=None):
+        """
+        Chooses sequential or parallel parsing, honoring the parse mode and worker count
+        from the settings. Feeds parsed before are parsed incrementally, sequentially,
+        unless the policy expects too many of their events to have changed.
+        """
+        mode = settings.get("parseMode") or "auto"
+        if mode not in PARSE_MODES:
+            raise RuntimeError("Invalid parse mode")
+        try:
+            max_workers = int(settings.get("parseWorkers") or self.worker_pool.max_workers)
+        except ValueError:
+            raise RuntimeError("Invalid number of parse workers")
+        # the pool can't run more workers than it was started with
+        max_workers = max(1, min(max_workers, self.worker_pool.max_workers))
+        indexed = has_feed_index(self.feed_index, calendar_url, "record", event_filter=event_filter)
+        return PARSE_POLICY.choose(size, max_workers, pool_warm=self.worker_pool.executor is not None,
+                                   mode=mode, name=calendar_url, memory_budget=memory_budget, indexed=indexed)
+
+    def stream_calendar(self, download, color, tz, start_range, end_range, plan, memory_budget=None,
+                        event_filter=None, trace_allocations=False):
+        """Parses the feed while its body downloads, falling back to a full download if the stream breaks."""
+        try:
+            events = load_ics_stream(download.iter_chunks(), return_type="record", start=start_range, end=end_range,
+                                     cache=self.feed_cache, cache_key=download.url,
+                                     recurrence_spill_dir=os.path.join(Config.feed_cache_dir, "recurrences"),
+                                     index=self.feed_index, memory_budget=memory_budget,
+                                     trace_allocations=trace_allocations, event_filter=event_filter)
+            l = list(self.to_template_events(events, color, tz))
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            logger.warning(f"Streaming {download.url} failed ({e}), downloading it again")
+            feed_path = self.feed_fetcher.fetch(download.url, timeout=FEED_TIMEOUT_SECONDS,
+                                                retries=FEED_RETRIES, backoff=FEED_RETRY_BACKOFF_SECONDS)
+            return self.load_calendar(feed_path, download.url, color, tz, start_range, end_range, plan, memory_budget,
+                                      event_filter, trace_allocations)
+
+        total = time.monotonic() - download.started
+        parse = total - download.network_wait_seconds
+        overlap = max(0.0, download.download_seconds + parse - total)
+        logger.info(f"Streamed {download.url} | total: {total:.2f}s | download: {download.download_seconds:.2f}s "
+                    f"| parse: {parse:.2f}s | overlapped: {overlap:.2f}s")
+        return l
+
+    def load_calendar(self, feed_path, calendar_url, color, tz, start_range, end_range, plan, memory_budget=None,
+                      event_filter=None, trace_allocations=False):
+        """Parses the local copy of a feed, in parallel on the worker pool when the plan says so."""
+        events = load_ics_in_date_range(feed_path, return_type="record", start=start_range, end=end_range,
+                                        cache=self.feed_cache, cache_key=calendar_url,
+                                        parallel=plan.parallel, num_workers=plan.num_workers,
+                                        num_chunks=plan.num_chunks,
+                                        executor=self.worker_pool.get_executor() if plan.parallel else None,
+                                        recurrence_spill_dir=os.path.join(Config.feed_cache_dir, "recurrences"),
+                                        index=self.feed_index, memory_budget=memory_budget,
+                                        trace_allocations=trace_allocations, event_filter=event_filter)
+        return list(self.to_template_events(events, color, tz))
 
     def get_contrast_color(self, color):
         """
@@ -1,3 +1,26 @@
+# Concurrent feed downloads: pool size, per-attempt socket timeout, retries and overall deadline
+FEED_FETCH_WORKERS = 4
+FEED_TIMEOUT_SECONDS = 20
+FEED_RETRIES = 2
+FEED_RETRY_BACKOFF_SECONDS = 1
+FEED_DEADLINE_SECONDS = 120
+
+# Feed polling: interval without freshness hints, bounds on any interval (and the backoff), and its random spread
+FEED_POLL_DEFAULT_SECONDS = 15 * 60
+FEED_POLL_MIN_SECONDS = 5 * 60
+FEED_POLL_MAX_SECONDS = 24 * 60 * 60
+FEED_POLL_JITTER = 0.1
+
+# Calendar sources: a full iCal (.ics) export, or a CalDAV collection synchronized incrementally
+CALENDAR_SOURCES = ("ics", "caldav")
+
+# Render engines: FullCalendar screenshotted in headless Chromium, the views drawn directly with PIL,
+# or laid out in Python and screenshotted in Chromium as a page without JavaScript
+RENDER_ENGINES = ("chromium", "native", "static")
+
+# First day of the week and month views when weekStartDay isn't set, as FullCalendar's firstDay (0 is Sunday)
+DEFAULT_WEEK_START_DAY = 1
+
 FONT_SIZES = {
     "x-small": 0.7,
     "smaller": 0.8,
@@ -0,0 +1,103 @@
+import re
+
+# Properties the filter terms are evaluated against
+FILTER_PROPERTIES = ("SUMMARY", "CATEGORIES", "TRANSP", "STATUS")
+# Properties an unprefixed term is matched against
+DEFAULT_PROPERTIES = ("SUMMARY", "CATEGORIES")
+
+_ESCAPES = re.compile(r"\\([\\;,nN])")
+_LIST_SEPARATOR = re.compile(r"(?<!\\),")
+
+
+def _unescape(value):
+    """Undo RFC 5545 TEXT escaping in a raw property value."""
+    return _ESCAPES.sub(lambda m: " " if m.group(1) in "nN" else m.group(1), value)
+
+
+def _split_list(values):
+    """Split raw list values (e.g. CATEGORIES:Work,Holiday) on their unescaped commas."""
+    return [item for value in values for item in _LIST_SEPARATOR.split(value)]
+
+
+def _parse_term(term):
+    """
+    Parse a filter term into (properties, compiled pattern).
+
+    A term is a keyword, matched case-insensitively anywhere in the value, or a
+    /regular expression/. It may be prefixed with one of FILTER_PROPERTIES to match
+    only that property (e.g. "STATUS:CANCELLED", "CATEGORIES:/^holiday/"), otherwise
+    it is matched against SUMMARY and CATEGORIES.
+    """
+    properties = DEFAULT_PROPERTIES
+    name, sep, rest = term.partition(":")
+    if sep and name.strip().upper() in FILTER_PROPERTIES:
+        properties = (name.strip().upper(),)
+        term = rest.strip()
+
+    if len(term) > 1 and term.startswith("/") and term.endswith("/"):
+        try:
+            pattern = re.compile(term[1:-1], re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Invalid filter expression {term}: {e}")
+    else:
+        pattern = re.compile(re.escape(term), re.IGNORECASE)
+    return properties, pattern
+
+
+class EventFilter:
+    """Include / exclude filter evaluated on the raw property values of a VEVENT.
+
+    An event is dropped when any exclude term matches it, or when there are include
+    terms and none of them matches. Evaluating the raw lines lets the scanner drop
+    events before they are parsed or expanded. Filters are picklable, so they can be
+    handed to the parse workers.
+
+    Attributes:
+        include (list): Parsed include terms, as (properties, pattern).
+        exclude (list): Parsed exclude terms, as (properties, pattern).
+        key (str): Identity of the filter, part of the cache and index variants.
+    """
+
+    def __init__(self, include=(), exclude=()):
+        include = [term.strip() for term in include if term.strip()]
+        exclude = [term.strip() for term in exclude if term.strip()]
+        self.include = [_parse_term(term) for term in include]
+        self.exclude = [_parse_term(term) for term in exclude]
+        self.key = repr((include, exclude))
+
+    @classmethod
+    def from_text(cls, include="", exclude=""):
+        """Build a filter from one term per line, or None when there are no terms."""
+        event_filter = cls(include.splitlines(), exclude.splitlines())
+        return event_filter if event_filter.include or event_filter.exclude else None
+
+    @staticmethod
+    def _matches(terms, properties):
+        for names, pattern in terms:
+            for name in names:
+                if any(pattern.search(value) for value in properties.get(name, ())):
+                    return True
+        return False
+
+    def allows(self, properties):
+        """
+        Return whether an event passes the filter, given {property name: [raw values]}
+        for the FILTER_PROPERTIES it has.
+        """
+        properties = {name: [_unescape(value) for value in (_split_list(values) if name == "CATEGORIES" else values)]
+                      for name, values in properties.items()}
+        if self.exclude and self._matches(self.exclude, properties):
+            return False
+        return not self.include or self._matches(self.include, properties)
+
+    def allows_component(self, component):
+        """Return whether a parsed event (or expanded occurrence) passes the filter."""
+        properties = {}
+        for name in FILTER_PROPERTIES:
+            values = component.get(name)
+            if values is None:
+                continue
+            if not isinstance(values, list):
+                values = [values]
+            properties[name] = [value.to_ical().decode("utf-8", "replace") for value in values]
+        return self.allows(properties)
@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+
+
+def _to_utc(value):
+    """Normalize aware datetimes to UTC so they pickle without their tz database entry."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc)
+    return value
+
+
+class EventRecord:
+    """Compact, picklable view of a calendar event.
+
+    Holds only the fields the calendar plugin renders, so worker processes can send
+    results back to the parent (and the feed cache can store them) without pickling
+    full icalendar.Event objects.
+
+    Attributes:
+        uid (str): Event UID, or None.
+        summary (str): Event title, or None.
+        dtstart (datetime | date): Start, aware datetimes are normalized to UTC.
+        dtend (datetime | date): End (DTEND, or DTSTART + DURATION), or None.
+        all_day (bool): True when DTSTART is a DATE rather than a DATE-TIME.
+        tzid (str): TZID the start was given in, or None.
+    """
+    __slots__ = ("uid", "summary", "dtstart", "dtend", "all_day", "tzid")
+
+    def __init__(self, uid, summary, dtstart, dtend=None, all_day=False, tzid=None):
+        self.uid = uid
+        self.summary = summary
+        self.dtstart = dtstart
+        self.dtend = dtend
+        self.all_day = all_day
+        self.tzid = tzid
+
+    @classmethod
+    def from_event(cls, event):
+        """Build a record from an icalendar.Event (or an expanded occurrence)."""
+        dtstart = event.decoded("dtstart")
+        if "dtend" in event:
+            dtend = event.decoded("dtend")
+        elif "duration" in event:
+            dtend = dtstart + event.decoded("duration")
+        else:
+            dtend = None
+
+        uid = event.get("uid")
+        summary = event.get("summary")
+        return cls(
+            uid=str(uid) if uid is not None else None,
+            summary=str(summary) if summary is not None else None,
+            dtstart=_to_utc(dtstart),
+            dtend=_to_utc(dtend),
+            all_day=not isinstance(dtstart, datetime),
+            tzid=event["dtstart"].params.get("TZID"),
+        )
+
+    def __reduce__(self):
+        # pickle as a flat tuple instead of a slots state dict
+        return (EventRecord, (self.uid, self.summary, self.dtstart, self.dtend, self.all_day, self.tzid))
+
+    def __eq__(self, other):
+        if not isinstance(other, EventRecord):
+            return NotImplemented
+        return self.__reduce__()[1] == other.__reduce__()[1]
+
+    def __repr__(self):
+        return f"EventRecord(summary={self.summary!r}, dtstart={self.dtstart!r}, dtend={self.dtend!r})"
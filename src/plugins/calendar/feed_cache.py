@@ -0,0 +1,118 @@
+import os
+import glob
+import pickle
+import hashlib
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CACHE_BYTES = 10 * 1024 * 1024
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """Compute the SHA-256 hex digest of a file's contents."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class FeedCache:
+    """On-disk cache of parsed calendar feeds, keyed on feed URL plus content digest.
+
+    Each entry stores the events parsed from one version of a feed for one date range
+    and parse configuration. Entries are pickle files so they survive service restarts.
+    When a feed's content changes the entries for its previous digest are dropped, and
+    the cache directory is kept under `max_bytes` by evicting the least recently used
+    entries.
+
+    Attributes:
+        cache_dir (str): Directory the cache entries are written to.
+        max_bytes (int): Upper bound for the total size of all cache entries.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _hash(value):
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+    def _entry_path(self, url, digest, variant):
+        """Entry file names are '<url hash>_<content digest>_<variant hash>.pickle'."""
+        return os.path.join(self.cache_dir, f"{self._hash(url)}_{digest[:32]}_{self._hash(variant)}.pickle")
+
+    def get(self, url, digest, variant):
+        """Returns the cached events for the feed at `url` with content `digest`, or None on a miss."""
+        path = self._entry_path(url, digest, variant)
+        try:
+            with open(path, "rb") as f:
+                events = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable feed cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        # bump the modification time so eviction is least-recently-used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return events
+
+    def put(self, url, digest, variant, events):
+        """Stores the parsed events for the feed at `url` with content `digest`."""
+        with self.lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._entry_path(url, digest, variant)
+
+            # drop entries belonging to earlier versions of this feed
+            current_prefix = f"{self._hash(url)}_{digest[:32]}_"
+            for stale in glob.glob(os.path.join(self.cache_dir, f"{self._hash(url)}_*.pickle")):
+                if not os.path.basename(stale).startswith(current_prefix):
+                    self._remove(stale)
+
+            # write atomically so a crash never leaves a truncated entry behind
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(events, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except Exception:
+                self._remove(tmp_path)
+                raise
+
+            self._evict()
+
+    def _evict(self):
+        """Removes the least recently used entries until the cache fits within max_bytes."""
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.pickle")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logger.info(f"Evicting feed cache entry {path}")
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
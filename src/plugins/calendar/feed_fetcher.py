@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+import requests
+from utils import http_client
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _url_digest(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+class FeedFetcher:
+    """Downloads calendar feeds using conditional HTTP requests.
+
+    The last downloaded copy of each feed is kept together with the validators
+    (`ETag` / `Last-Modified`) the server sent for it and the digest of its content.
+    Later fetches send `If-None-Match` / `If-Modified-Since`, and a `304 Not Modified`
+    response reuses the local copy instead of downloading the body again. The copies
+    can be spooled to a RAM backed directory while the validators stay on persistent
+    storage, so a feed that is unchanged after a reboot is still answered with a 304
+    (and its parsed events from the FeedCache, by digest).
+
+    Attributes:
+        download_dir (str): Directory holding the validators of each feed.
+        spool_dir (str): Directory holding the feed copies, download_dir by default.
+        hits (int): Number of fetches answered with 304 Not Modified.
+        misses (int): Number of fetches that downloaded the full feed.
+        bytes_saved (int): Total feed bytes not downloaded thanks to 304 responses.
+    """
+
+    def __init__(self, download_dir, spool_dir=None):
+        self.download_dir = download_dir
+        self.spool_dir = spool_dir or download_dir
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.lock = threading.Lock()
+
+    def _paths(self, url):
+        """Returns the (feed copy, validators) file paths for a feed URL."""
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        return (os.path.join(self.spool_dir, f"{name}.ics"),
+                os.path.join(self.download_dir, f"{name}.json"))
+
+    def _load_validators(self, url):
+        _, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                validators = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # guard against hash collisions between feed URLs, by digest so the file holds no credentials
+        return validators if validators.get("url_digest") == _url_digest(url) else {}
+
+    def local_copy(self, url):
+        """Returns the path of the last downloaded copy of the feed at `url`, or None when there is none."""
+        feed_path, _ = self._paths(url)
+        return feed_path if os.path.exists(feed_path) and self._load_validators(url) else None
+
+    def fetch(self, url, timeout=None, retries=0, backoff=1.0, conditional=True):
+        """Fetches the feed at `url` and returns the path of the up to date local copy.
+
+        Connection errors, timeouts and 5xx responses are retried up to `retries` times,
+        waiting `backoff` seconds before the first retry and doubling the wait each time.
+        Without `conditional` the body is downloaded even if the stored validators match.
+        """
+        def _fetch():
+            with self._open(url, timeout, conditional) as download:
+                download.save()
+            return download.path
+        return self._with_retries(_fetch, url, retries, backoff)
+
+    def open(self, url, timeout=None, retries=0, backoff=1.0):
+        """Sends the conditional request for `url` and returns a FeedDownload for its response.
+
+        Only establishing the response is retried; errors while the body is being
+        streamed are raised to the caller, which can fall back to `fetch`. A 304 may
+        arrive for a feed whose spooled copy is gone (FeedDownload.has_copy); its
+        parsed events can still be cached under FeedDownload.digest.
+        """
+        return self._with_retries(lambda: self._open(url, timeout), url, retries, backoff)
+
+    def _with_retries(self, func, url, retries, backoff):
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code < 500 or attempt >= retries:
+                    raise
+                error = e
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt >= retries:
+                    raise
+                error = e
+            delay = backoff * (2 ** attempt)
+            attempt += 1
+            logger.warning(f"Failed to fetch {url} ({error}), retrying in {delay}s ({attempt}/{retries})")
+            time.sleep(delay)
+
+    def _open(self, url, timeout, conditional=True):
+        os.makedirs(self.download_dir, exist_ok=True)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        feed_path, meta_path = self._paths(url)
+        validators = self._load_validators(url)
+        # a 304 is only of use with the copy, or with the digest its parsed events are cached under
+        if not conditional or not (os.path.exists(feed_path) or validators.get("digest")):
+            validators = {}
+
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        started = time.monotonic()
+        response = http_client.get(url, timeout=timeout, headers=headers, stream=True)
+        if response.status_code == 304 and validators:
+            _release(response)
+            with self.lock:
+                self.hits += 1
+                self.bytes_saved += validators.get("size", 0)
+            if os.path.exists(feed_path):
+                logger.info(f"Feed not modified, reusing local copy of {url}")
+            else:
+                logger.info(f"Feed not modified, but the local copy of {url} is gone")
+            self._log_stats()
+            return FeedDownload(self, url, None, feed_path, meta_path, validators.get("size", 0), started,
+                                response.headers, validators.get("digest"))
+
+        try:
+            response.raise_for_status()
+        except Exception:
+            _release(response)
+            raise
+        size_hint = int(response.headers.get("Content-Length") or validators.get("size") or 0)
+        return FeedDownload(self, url, response, feed_path, meta_path, size_hint, started, response.headers)
+
+    def _downloaded(self):
+        with self.lock:
+            self.misses += 1
+        self._log_stats()
+
+    def _log_stats(self):
+        stats = http_client.get_stats()
+        logger.info(f"Feed fetch stats | not_modified: {self.hits} | downloaded: {self.misses} | bytes_saved: {self.bytes_saved} "
+                    f"| connections_opened: {stats['connections_opened']} | connections_reused: {stats['connections_reused']}")
+
+
+def _release(response):
+    """
+    Returns the connection of a streamed response whose body isn't wanted to the pool.
+    Closing it unread would close the socket, so the (empty or short) body is read first.
+    """
+    try:
+        response.content
+    except requests.RequestException:
+        pass
+    response.close()
+
+
+class FeedDownload:
+    """The response to a feed request, whose body can be consumed while it is saved.
+
+    `iter_chunks` yields the body as it arrives and writes it to the feed's local copy
+    at the same time, so a caller can parse the feed while it downloads. The copy and
+    its validators replace the previous ones only once the whole body was received.
+
+    Attributes:
+        url (str): The feed URL.
+        path (str): Path of the feed's local copy, up to date once the body was consumed.
+        not_modified (bool): True when the server answered 304 and the local copy is current.
+        size_hint (int): Expected body size in bytes (Content-Length or the previous copy's size), 0 if unknown.
+        started (float): time.monotonic() when the request was sent.
+        headers (dict): Headers of the response (of the 304 when not modified).
+        download_seconds (float): Time from sending the request until the last body byte arrived.
+        network_wait_seconds (float): Time spent inside iter_chunks waiting for the network.
+        digest (str): SHA-256 hex digest of the content, once downloaded (stored one when not modified).
+    """
+
+    def __init__(self, fetcher, url, response, feed_path, meta_path, size_hint, started, headers=None, digest=None):
+        self.fetcher = fetcher
+        self.url = url
+        self.response = response
+        self.path = feed_path
+        self.meta_path = meta_path
+        self.not_modified = response is None
+        self.size_hint = size_hint
+        self.started = started
+        self.headers = headers if headers is not None else {}
+        self.download_seconds = 0.0
+        self.network_wait_seconds = 0.0
+        self.digest = digest
+
+    @property
+    def has_copy(self):
+        """Whether the local copy exists, a spooled one is lost with a reboot."""
+        return os.path.exists(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+
+    def save(self):
+        """Downloads the whole body to the local copy without handing it to a caller."""
+        for _ in self.iter_chunks():
+            pass
+
+    def iter_chunks(self):
+        """Yields the response body in chunks while writing it to the local copy."""
+        if self.not_modified:
+            return
+
+        logger.info(f"Downloading .ics file at {self.url}")
+        spool_dir = os.path.dirname(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=spool_dir, suffix=".tmp")
+        sha = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                # iter_content transparently decodes gzip/deflate transfer encoding
+                chunks = self.response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+                while True:
+                    waited = time.monotonic()
+                    chunk = next(chunks, None)
+                    self.network_wait_seconds += time.monotonic() - waited
+                    if chunk is None:
+                        break
+                    tmp_file.write(chunk)
+                    sha.update(chunk)
+                    yield chunk
+            self.download_seconds = time.monotonic() - self.started
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        validators = {
+            "url_digest": _url_digest(self.url),
+            "etag": self.response.headers.get("ETag"),
+            "last_modified": self.response.headers.get("Last-Modified"),
+            "size": os.path.getsize(self.path),
+            "digest": sha.hexdigest(),
+        }
+        self.digest = validators["digest"]
+        with open(self.meta_path, "w") as f:
+            json.dump(validators, f)
+        self.fetcher._downloaded()
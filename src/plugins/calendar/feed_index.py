@@ -0,0 +1,82 @@
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def empty_index():
+    """Returns an index with no blocks or series, as used for a feed's first run."""
+    return {"blocks": {}, "series": {}}
+
+
+class FeedIndex:
+    """On-disk index of the VEVENT blocks seen in each feed on its previous parse.
+
+    The index of a feed maps the digest of every raw VEVENT block to its UID and, for
+    standalone events that were parsed, the parsed result. It also holds the results
+    of each recurring series expanded for the last view window. Incremental parsing
+    reuses those results for unchanged blocks and only parses what was added or changed.
+
+    Attributes:
+        index_dir (str): Directory the per-feed index files are written to.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _hash(value):
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+    def _index_path(self, feed_key, variant):
+        """Index file names are '<feed hash>_<variant hash>.pickle'."""
+        return os.path.join(self.index_dir, f"{self._hash(feed_key)}_{self._hash(variant)}.pickle")
+
+    def load(self, feed_key, variant):
+        """Returns the index stored for the feed, or an empty index when there is none."""
+        path = self._index_path(feed_key, variant)
+        try:
+            with open(path, "rb") as f:
+                stored_key, stored_variant, index = pickle.load(f)
+        except FileNotFoundError:
+            return empty_index()
+        except Exception as e:
+            logger.warning(f"Discarding unreadable feed index {path}: {e}")
+            self._remove(path)
+            return empty_index()
+        # guard against hash collisions between feeds, the feed key (a URL) is stored as a digest so the
+        # file holds no credentials
+        if (stored_key, stored_variant) != (hashlib.sha256(feed_key.encode("utf-8")).hexdigest(), variant):
+            return empty_index()
+        return index
+
+    def exists(self, feed_key, variant):
+        """Returns whether an index is stored for the feed, without loading it."""
+        return os.path.isfile(self._index_path(feed_key, variant))
+
+    def save(self, feed_key, variant, index):
+        """Replaces the index stored for the feed."""
+        with self.lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            # write atomically so a crash never leaves a truncated index behind
+            fd, tmp_path = tempfile.mkstemp(dir=self.index_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump((hashlib.sha256(feed_key.encode("utf-8")).hexdigest(), variant, index), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self._index_path(feed_key, variant))
+            except Exception:
+                self._remove(tmp_path)
+                raise
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import random
+import logging
+import tempfile
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from icalendar.prop import vDuration
+from utils.http_client import redact_url
+
+logger = logging.getLogger(__name__)
+
+# Feed properties giving the publisher's suggested polling interval (RFC 7986 and the older Microsoft one)
+FEED_TTL_PROPERTIES = ("REFRESH-INTERVAL", "X-PUBLISHED-TTL")
+# Header lines read looking for FEED_TTL_PROPERTIES before giving up
+FEED_HEADER_MAX_LINES = 200
+
+
+def http_freshness(headers):
+    """
+    Return (seconds, hint) for how long a response stays fresh according to its
+    Cache-Control or Expires header, or None when it has neither.
+    """
+    cache_control = (headers.get("Cache-Control") or "").lower()
+    directives = {}
+    for directive in cache_control.split(","):
+        name, _, value = directive.strip().partition("=")
+        directives[name] = value.strip('"')
+    if "no-store" in directives or "no-cache" in directives:
+        return 0, "Cache-Control"
+    if directives.get("max-age", "").isdigit():
+        return int(directives["max-age"]), "Cache-Control"
+
+    if headers.get("Expires"):
+        try:
+            expires = parsedate_to_datetime(headers["Expires"])
+            date = parsedate_to_datetime(headers["Date"]) if headers.get("Date") else datetime.now(timezone.utc)
+            return max(0, int((expires - date).total_seconds())), "Expires"
+        except (TypeError, ValueError):
+            return 0, "Expires"  # an invalid Expires means already expired
+    return None
+
+
+def feed_ttl(path):
+    """
+    Return (seconds, hint) for the REFRESH-INTERVAL (preferred) or X-PUBLISHED-TTL
+    in the calendar header of the .ics at path, or None when it has neither.
+    """
+    found = {}
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for count, line in enumerate(f):
+                if count >= FEED_HEADER_MAX_LINES or line.startswith(("BEGIN:VEVENT", "BEGIN:VTIMEZONE")):
+                    break
+                name, _, value = line.strip().partition(":")
+                name = name.partition(";")[0].upper()
+                if name in FEED_TTL_PROPERTIES:
+                    try:
+                        found[name] = int(vDuration.from_ical(value).total_seconds())
+                    except ValueError:
+                        logger.warning(f"Ignoring invalid {name} '{value}' in {path}")
+    except OSError:
+        pass
+    for name in FEED_TTL_PROPERTIES:
+        if name in found:
+            return found[name], name
+    return None
+
+
+class FeedSchedule:
+    """Polling schedule of each feed URL, shared by every calendar instance.
+
+    After a fetch, a feed is next due once the longest of its freshness hints has
+    passed: the HTTP Cache-Control / Expires headers and the REFRESH-INTERVAL /
+    X-PUBLISHED-TTL the feed declares, clamped to [min_interval, max_interval] and
+    spread by +/- jitter so feeds fetched together drift apart. After a failure
+    the feed is retried with exponential backoff. Renders before a feed is due use
+    its local copy. The schedule is persisted so it survives restarts. Feeds are
+    keyed on their URL without credentials, which never reach the file or the
+    settings page.
+
+    Attributes:
+        path (str): JSON file the schedule is stored in.
+        default_interval (int): Seconds between fetches of a feed without freshness hints.
+        min_interval (int): Shortest interval between fetches, whatever the hints say.
+        max_interval (int): Longest interval between fetches, also the cap on the backoff.
+        jitter (float): Fraction of the interval added or removed at random.
+    """
+
+    def __init__(self, path, default_interval, min_interval, max_interval, jitter):
+        self.path = path
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.feeds = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                feeds = json.load(f)
+            # schedules written before credentials were stripped may still hold them
+            for entry in feeds.values():
+                if entry.get("last_error"):
+                    entry["last_error"] = redact_url(entry["last_error"])
+            return {redact_url(url): entry for url, entry in feeds.items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable feed schedule {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.feeds, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _jittered(self, seconds):
+        return seconds * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def is_due(self, url, now=None):
+        """Returns whether the feed should be fetched again (always true for a feed never fetched)."""
+        url = redact_url(url)
+        with self.lock:
+            entry = self.feeds.get(url)
+        return entry is None or (now or time.time()) >= entry["next_due"]
+
+    def get(self, url):
+        """Returns a copy of the schedule entry for url, or None."""
+        url = redact_url(url)
+        with self.lock:
+            entry = self.feeds.get(url)
+            return dict(entry) if entry else None
+
+    def snapshot(self):
+        """Returns a copy of every schedule entry, keyed by feed URL (without credentials)."""
+        with self.lock:
+            return {url: dict(entry) for url, entry in self.feeds.items()}
+
+    def record_success(self, url, hints=()):
+        """
+        Schedules the next fetch of url after a successful one. hints are the
+        (seconds, hint name) freshness hints found for the feed, None entries are ignored.
+        """
+        url = redact_url(url)
+        hints = [hint for hint in hints if hint is not None]
+        if hints:
+            interval, source = max(hints)
+        else:
+            interval, source = self.default_interval, "default"
+        interval = min(max(interval, self.min_interval), self.max_interval)
+
+        now = time.time()
+        with self.lock:
+            self.feeds[url] = {
+                "last_fetched": now,
+                "last_attempt": now,
+                "next_due": now + self._jittered(interval),
+                "interval": interval,
+                "source": source,
+                "failures": 0,
+                "last_error": None,
+            }
+            self._save()
+        logger.info(f"Next fetch of {url} in {interval}s ({source})")
+
+    def record_failure(self, url, error):
+        """Schedules a retry of url with exponential backoff after a failed fetch."""
+        url = redact_url(url)
+        now = time.time()
+        with self.lock:
+            entry = self.feeds.setdefault(url, {"last_fetched": None, "interval": self.default_interval,
+                                                "source": "default", "failures": 0})
+            entry["failures"] += 1
+            backoff = min(self.min_interval * 2 ** (entry["failures"] - 1), self.max_interval)
+            entry["last_attempt"] = now
+            entry["next_due"] = now + self._jittered(backoff)
+            entry["last_error"] = redact_url(error)
+            failures = entry["failures"]
+            self._save()
+        logger.warning(f"Fetching {url} failed {failures} time(s) in a row, retrying in {backoff}s")
@@ -0,0 +1,120 @@
+import logging
+import threading
+import tracemalloc
+import psutil
+from utils.render_service import render_service_pid
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+SAMPLE_INTERVAL_SECONDS = 0.1
+
+# tracemalloc is process wide, so the monitors tracing allocations share it: the first one to enter starts it
+# (unless it was already running) and the last one to exit stops it
+_tracing_lock = threading.Lock()
+_tracing_monitors = 0
+_started_tracing = False
+
+
+def renderer_pids():
+    """PIDs of the render service's browser and its processes, which stay up between parses."""
+    pid = render_service_pid()
+    if pid is None:
+        return set()
+    try:
+        return {pid} | {child.pid for child in psutil.Process(pid).children(recursive=True)}
+    except psutil.Error:
+        return {pid}
+
+
+class MemoryMonitor:
+    """Tracks peak memory while a feed is parsed, against an optional RSS budget.
+
+    Resident memory of this process plus its children (the parse workers) is sampled
+    on a background thread. The long-lived Chromium of the render service is a child
+    too, but isn't part of a parse and is left out. With `trace_allocations`, Python allocations are traced
+    with tracemalloc as well; tracing is process wide, so the traced peak of feeds parsed
+    concurrently is their combined peak.
+
+    Attributes:
+        budget_bytes (int): RSS budget, or None for no budget.
+        peak_rss (int): Highest RSS sampled, in bytes.
+        peak_traced (int): Peak of traced Python allocations, in bytes (0 when not tracing).
+    """
+
+    def __init__(self, budget_bytes=None, interval=SAMPLE_INTERVAL_SECONDS, trace_allocations=False):
+        self.budget_bytes = budget_bytes
+        self.interval = interval
+        self.trace_allocations = trace_allocations
+        self.peak_rss = 0
+        self.peak_traced = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def rss(self):
+        """Samples the current RSS of this process and its children, updating the peak."""
+        process = psutil.Process()
+        total = process.memory_info().rss
+        excluded = renderer_pids()
+        for child in process.children(recursive=True):
+            if child.pid in excluded:
+                continue
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak_rss = max(self.peak_rss, total)
+        return total
+
+    def headroom(self):
+        """Returns the bytes left in the budget (may be negative), or None without a budget."""
+        if self.budget_bytes is None:
+            return None
+        return self.budget_bytes - self.rss()
+
+    def over_budget(self):
+        headroom = self.headroom()
+        return headroom is not None and headroom < 0
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.rss()
+
+    def __enter__(self):
+        global _tracing_monitors, _started_tracing
+        if self.trace_allocations:
+            with _tracing_lock:
+                if _tracing_monitors == 0:
+                    if not tracemalloc.is_tracing():
+                        tracemalloc.start()
+                        _started_tracing = True
+                    # only while no other monitor is tracing, resetting would cut their peak short
+                    tracemalloc.reset_peak()
+                _tracing_monitors += 1
+        self.rss()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        self.rss()
+        if self.trace_allocations:
+            self._stop_tracing()
+
+    def _stop_tracing(self):
+        global _tracing_monitors, _started_tracing
+        with _tracing_lock:
+            self.peak_traced = tracemalloc.get_traced_memory()[1]
+            _tracing_monitors -= 1
+            if _tracing_monitors == 0 and _started_tracing:
+                tracemalloc.stop()
+                _started_tracing = False
+
+    def log(self, name):
+        budget = f"{self.budget_bytes / MB:.0f} MB" if self.budget_bytes else "none"
+        traced = f" | peak traced: {self.peak_traced / MB:.1f} MB" if self.peak_traced else ""
+        logger.info(f"Memory for {name} | peak rss: {self.peak_rss / MB:.1f} MB | budget: {budget}{traced}")
+        if self.budget_bytes and self.peak_rss > self.budget_bytes:
+            logger.warning(f"Parsing {name} exceeded the memory budget of {budget}")
@@ -0,0 +1,569 @@
+import logging
+import calendar as pycalendar
+from datetime import datetime, date, time, timedelta
+from PIL import Image, ImageColor, ImageDraw
+from utils.app_utils import get_font
+from utils.image_utils import resize_image
+from plugins.calendar.svg_canvas import SvgCanvas
+from plugins.calendar.constants import DEFAULT_WEEK_START_DAY
+
+logger = logging.getLogger(__name__)
+
+# Font drawn with, from FONT_FAMILIES, and its sizes at font scale 1. Jost runs wider than the
+# Jersey faces the browser template uses, so it is set a little smaller than calendar.css
+FONT_FAMILY = "Jost"
+FONT_SIZE = 17
+TITLE_FONT_SIZE = 22
+SMALL_FONT_SIZE = 14
+
+# Spacing from plugin.html and calendar.css: body margin, body padding-top and the list day header margins
+DEFAULT_MARGIN = 5
+TOP_PADDING = 30
+LIST_HEADER_MARGIN_TOP = 30
+LIST_HEADER_MARGIN_BOTTOM = 10
+LIST_HEADER_MARGIN_SIDE = 10
+
+# FullCalendar colors as calendar.css sets them
+GRID_COLOR = "#ffffff"
+LIST_DIVIDER_COLOR = "#888888"
+DEFAULT_TEXT_COLOR = "#000000"
+DEFAULT_NOW_INDICATOR_COLOR = "#ff0000"
+OTHER_MONTH_OPACITY = 0.3
+
+# Length of a timed event without an end, as FullCalendar assumes
+DEFAULT_EVENT_DURATION = timedelta(hours=1)
+
+
+class _Event:
+    """An event of the template event dicts, with its dates parsed in the display timezone."""
+    __slots__ = ("title", "start", "end", "all_day", "background", "text")
+
+    def __init__(self, event, tz):
+        self.title = event.get("title") or ""
+        self.all_day = bool(event.get("allDay"))
+        self.background = event.get("backgroundColor") or "#3788d8"
+        self.text = event.get("textColor") or "#ffffff"
+        self.start = _parse_date(event["start"], tz, self.all_day)
+        end = _parse_date(event["end"], tz, self.all_day) if event.get("end") else None
+        if self.all_day:
+            self.end = end if end and end > self.start else self.start + timedelta(days=1)
+        else:
+            self.end = end if end and end >= self.start else self.start + DEFAULT_EVENT_DURATION
+
+    def first_day(self):
+        return self.start if self.all_day else self.start.date()
+
+    def last_day(self):
+        """The last day the event is shown on (its end is exclusive)."""
+        if self.all_day:
+            return self.end - timedelta(days=1)
+        if self.end > self.start and self.end.time() == time(0):
+            return (self.end - timedelta(microseconds=1)).date()
+        return self.end.date()
+
+    def on(self, day):
+        return self.first_day() <= day <= self.last_day()
+
+
+def _parse_date(value, tz, all_day):
+    """Parses an ISO date or datetime to a date (all-day) or a naive datetime in tz."""
+    if "T" not in value:
+        day = date.fromisoformat(value)
+        return day if all_day else datetime.combine(day, time(0))
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(tz).replace(tzinfo=None)
+    return dt.date() if all_day else dt
+
+
+def _pack_overlapping(segments):
+    """
+    Places (start, end, event) segments of one day column side by side where they overlap.
+    Returns (segment, column, columns) for each, columns being the width of its overlap group.
+    """
+    placed = []
+    group, group_columns, group_end = [], [], None
+    for segment in sorted(segments, key=lambda s: (s[0], -s[1])):
+        if group_end is not None and segment[0] >= group_end:
+            placed += [(s, c, len(group_columns)) for s, c in group]
+            group, group_columns, group_end = [], [], None
+        column = next((i for i, end in enumerate(group_columns) if end <= segment[0]), len(group_columns))
+        if column == len(group_columns):
+            group_columns.append(segment[1])
+        else:
+            group_columns[column] = segment[1]
+        group.append((segment, column))
+        group_end = segment[1] if group_end is None else max(group_end, segment[1])
+    placed += [(s, c, len(group_columns)) for s, c in group]
+    return placed
+
+
+def _assign_lanes(spans):
+    """Stacks (first column, last column, item) spans into lanes, returning (span, lane) pairs."""
+    lanes = []
+    placed = []
+    for span in spans:
+        lane = next((i for i, used in enumerate(lanes) if all(c not in used for c in range(span[0], span[1] + 1))),
+                    len(lanes))
+        if lane == len(lanes):
+            lanes.append(set())
+        lanes[lane].update(range(span[0], span[1] + 1))
+        placed.append((span, lane))
+    return placed
+
+
+class NativeCalendarRenderer:
+    """Draws the calendar views with PIL instead of screenshotting FullCalendar in Chromium.
+
+    Takes the same event dicts the calendar template does and lays out the
+    timeGridDay / timeGridWeek, dayGridMonth and list views the way the FullCalendar
+    template styles them, using a font from FONT_FAMILIES. The layout (overlap columns,
+    all-day and month row packing, "+N more" overflow, truncation) is computed here and
+    drawn either with PIL or, for the static engine, as an SVG that Chromium paints
+    without JavaScript. Labels are English, the language setting only applies to the
+    FullCalendar engine.
+
+    Attributes:
+        dimensions (tuple): (width, height) of the image.
+        settings (dict): Plugin instance settings.
+        hour12 (bool): Whether times are formatted on the 12 hour clock.
+        font_scale (float): Multiplier applied to every font size.
+    """
+
+    def __init__(self, dimensions, settings, time_format="12h", font_scale=1):
+        self.dimensions = (int(dimensions[0]), int(dimensions[1]))
+        self.settings = settings
+        self.hour12 = time_format == "12h"
+        self.font_scale = font_scale or 1
+        self.font = self._font(FONT_SIZE)
+        self.bold_font = self._font(FONT_SIZE, "bold")
+        self.small_font = self._font(SMALL_FONT_SIZE)
+        self.title_font = self._font(TITLE_FONT_SIZE, "bold")
+        self.line_height = self._line_height(self.font)
+        self.small_line_height = self._line_height(self.small_font)
+        self.text_color = self._color(settings.get("textColor"), DEFAULT_TEXT_COLOR)
+        self.week_start = (int(settings.get("weekStartDay") or DEFAULT_WEEK_START_DAY) - 1) % 7
+        self.show_weekends = settings.get("displayWeekends") == "true"
+        self.show_event_time = settings.get("displayEventTime") == "true"
+
+    def _font(self, size, weight="normal"):
+        return get_font(FONT_FAMILY, round(size * self.font_scale), weight)
+
+    def _line_height(self, font):
+        ascent, descent = font.getmetrics()
+        return int((ascent + descent) * 1.15)
+
+    def _color(self, value, default):
+        try:
+            return ImageColor.getrgb(value) if value else ImageColor.getrgb(default)
+        except ValueError:
+            logger.warning(f"Invalid color '{value}', using {default}")
+            return ImageColor.getrgb(default)
+
+    def render(self, view, events, current_dt, tz):
+        """
+        Returns the image of `view` ('timeGrid' is the 7 days from today) showing
+        the template event dicts `events`, at current_dt in timezone tz.
+        """
+        image = self._background()
+        self.draw(ImageDraw.Draw(image), view, events, current_dt, tz)
+        return image
+
+    def render_svg(self, view, events, current_dt, tz):
+        """
+        Returns the same drawing as render as an SVG of pre-positioned shapes, so
+        Chromium can paint the laid out calendar without running any JavaScript.
+        """
+        canvas = SvgCanvas(self.dimensions)
+        option = self.settings.get("backgroundOption")
+        canvas.rectangle((0, 0, self.dimensions[0] - 1, self.dimensions[1] - 1),
+                         fill=self._color(self.settings.get("backgroundColor") if option == "color" else None,
+                                          "#ffffff"))
+        if option == "image" and self.settings.get("backgroundImageFile"):
+            canvas.image(self.settings["backgroundImageFile"])
+        self.draw(canvas, view, events, current_dt, tz)
+        return canvas.to_svg()
+
+    def draw(self, draw, view, events, current_dt, tz):
+        """Lays out and draws the view on draw, an ImageDraw or an SvgCanvas."""
+        parsed = []
+        for event in events:
+            try:
+                parsed.append(_Event(event, tz))
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Skipping event '{event.get('title')}' with invalid dates: {e}")
+
+        now = current_dt.astimezone(tz).replace(tzinfo=None) if current_dt.tzinfo else current_dt
+        now = now.replace(minute=0, second=0, microsecond=0)
+        left, top, right, bottom = self._content_box(draw)
+
+        days, title = self._view_days(view, now.date())
+        if self.settings.get("displayTitle") == "true":
+            title_height = self._line_height(self.title_font)
+            draw.text(((left + right) / 2, top + title_height / 2), title, font=self.title_font,
+                      fill=self.text_color, anchor="mm")
+            top += title_height
+
+        shown = [day for day in days if self.show_weekends or day.weekday() < 5] or days
+        box = (left, top, right, bottom)
+        if view.startswith("timeGrid"):
+            self._draw_time_grid(draw, box, shown, parsed, now)
+        elif view == "dayGridMonth":
+            self._draw_day_grid(draw, box, shown, parsed, now)
+        else:
+            self._draw_list(draw, box, shown, parsed)
+
+    # ---- page ---------------------------------------------------------------
+
+    def _background(self):
+        image = Image.new("RGB", self.dimensions, (255, 255, 255))
+        option = self.settings.get("backgroundOption")
+        if option == "color":
+            image.paste(self._color(self.settings.get("backgroundColor"), "#ffffff"), (0, 0, *self.dimensions))
+        elif option == "image" and self.settings.get("backgroundImageFile"):
+            try:
+                with Image.open(self.settings["backgroundImageFile"]) as background:
+                    image.paste(resize_image(background.convert("RGB"), self.dimensions))
+            except OSError as e:
+                logger.warning(f"Failed to load background image: {e}")
+        return image
+
+    def _margin(self, side):
+        return int(self.settings.get(f"{side}Margin") or self.settings.get("margin") or DEFAULT_MARGIN)
+
+    def _content_box(self, draw):
+        """Draws the frame and returns the (left, top, right, bottom) box the calendar fills."""
+        width, height = self.dimensions
+        left, top = self._margin("left"), self._margin("top")
+        right, bottom = width - self._margin("right"), height - self._margin("bottom")
+        frame = self.settings.get("selectedFrame")
+        border = max(1, round(width * 0.007))
+        color = self.text_color
+
+        if frame == "Rectangle":
+            for i in range(border):
+                draw.rectangle((left + i, top + i, right - 1 - i, bottom - 1 - i), outline=color)
+            left, top, right, bottom = left + border, top + border, right - border, bottom - border
+        elif frame == "Top and Bottom":
+            draw.rectangle((left, top, right - 1, top + border - 1), fill=color)
+            draw.rectangle((left, bottom - border, right - 1, bottom - 1), fill=color)
+            top, bottom = top + border, bottom - border
+        elif frame == "Corner":
+            arm = round(width * 0.1)
+            thin = max(1, round(width * 0.005))
+            draw.rectangle((left, top, left + arm - 1, top + border - 1), fill=color)
+            draw.rectangle((left, top, left + border - 1, top + arm - 1), fill=color)
+            draw.rectangle((right - arm, bottom - thin, right - 1, bottom - 1), fill=color)
+            draw.rectangle((right - thin, bottom - arm, right - 1, bottom - 1), fill=color)
+        return left, top + TOP_PADDING, right, bottom
+
+    # ---- formatting -----------------------------------------------------------
+
+    def format_time(self, value):
+        if self.hour12:
+            hour = value.hour % 12 or 12
+            suffix = "am" if value.hour < 12 else "pm"
+            return f"{hour}{suffix}" if value.minute == 0 else f"{hour}:{value.minute:02d}{suffix}"
+        return f"{value.hour:02d}:{value.minute:02d}"
+
+    def _fit(self, draw, text, font, width):
+        """Returns the longest prefix of text that fits in width pixels."""
+        if draw.textlength(text, font=font) <= width:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if draw.textlength(text[:middle], font=font) <= width:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low]
+
+    def _wrap(self, draw, text, font, width, max_lines):
+        lines = []
+        for word in text.split():
+            candidate = f"{lines[-1]} {word}" if lines else word
+            if lines and draw.textlength(candidate, font=font) <= width:
+                lines[-1] = candidate
+            else:
+                lines.append(self._fit(draw, word, font, width))
+            if len(lines) > max_lines:
+                return lines[:max_lines]
+        return lines
+
+    def _view_days(self, view, today):
+        """Returns the days covered by the view and its title, as FullCalendar formats it in English."""
+        if view == "timeGridDay" or view == "listDay":
+            days = [today]
+        elif view == "timeGrid":
+            days = [today + timedelta(days=i) for i in range(7)]
+        elif view in ("timeGridWeek", "listWeek"):
+            start = today - timedelta(days=(today.weekday() - self.week_start) % 7)
+            days = [start + timedelta(days=i) for i in range(7)]
+        elif view == "dayGridMonth" or view == "listMonth":
+            first = today.replace(day=1)
+            last = first.replace(day=pycalendar.monthrange(first.year, first.month)[1])
+            if view == "listMonth":
+                days = [first + timedelta(days=i) for i in range(last.day)]
+            else:
+                start = first - timedelta(days=(first.weekday() - self.week_start) % 7)
+                weeks = ((last - start).days // 7) + 1
+                days = [start + timedelta(days=i) for i in range(weeks * 7)]
+            return days, f"{first:%B} {first.year}"
+        else:
+            first = date(today.year, 1, 1)
+            days = [first + timedelta(days=i) for i in range((date(today.year + 1, 1, 1) - first).days)]
+            return days, str(today.year)
+
+        first, last = days[0], days[-1]
+        if first == last:
+            title = f"{first:%B} {first.day}, {first.year}"
+        elif first.year != last.year:
+            title = f"{first:%b} {first.day}, {first.year} – {last:%b} {last.day}, {last.year}"
+        elif first.month != last.month:
+            title = f"{first:%b} {first.day} – {last:%b} {last.day}, {last.year}"
+        else:
+            title = f"{first:%b} {first.day} – {last.day}, {last.year}"
+        return days, title
+
+    # ---- views --------------------------------------------------------------
+
+    def _draw_bar(self, draw, rect, event, text):
+        x0, y0, x1, y1 = rect
+        outline = self._color(self.settings.get("textColor"), event.background)
+        draw.rounded_rectangle(rect, radius=3, fill=event.background, outline=outline)
+        label = self._fit(draw, text, self.small_font, x1 - x0 - 6)
+        draw.text((x0 + 3, (y0 + y1) / 2), label, font=self.small_font, fill=event.text, anchor="lm")
+
+    def _draw_time_grid(self, draw, box, days, events, now):
+        left, top, right, bottom = box
+        start_hour = int(self.settings.get("startTimeInterval") or 0)
+        end_hour = int(self.settings.get("endTimeInterval") or 24)
+        if not 0 <= start_hour < end_hour <= 24:
+            start_hour, end_hour = 0, 24
+        hours = range(start_hour, end_hour)
+        labels = [self.format_time(time(hour)) for hour in hours]
+        axis = max(draw.textlength(text, font=self.small_font) for text in labels + ["all-day"]) + 8
+        column_width = (right - left - axis) / len(days)
+
+        # day headers
+        for i, day in enumerate(days):
+            header = f"{day:%A}" if len(days) == 1 else f"{day:%a} {day.month}/{day.day}"
+            if draw.textlength(header, font=self.font) > column_width - 4:
+                header = f"{day:%a}"
+            x = left + axis + column_width * (i + 0.5)
+            header = self._fit(draw, header, self.font, column_width - 4)
+            draw.text((x, top + self.line_height / 2), header, font=self.font, fill=self.text_color, anchor="mm")
+        y = top + self.line_height
+
+        # all-day row
+        spans = []
+        for event in sorted((e for e in events if e.all_day), key=lambda e: (e.start, e.start - e.end)):
+            columns = [i for i, day in enumerate(days) if event.on(day)]
+            if columns:
+                spans.append((columns[0], columns[-1], event))
+        placed = _assign_lanes(spans)
+        lane_height = self.small_line_height + 2
+        lanes = max([lane + 1 for _, lane in placed] + [1])
+        all_day_height = lanes * lane_height + 4
+        draw.text((left + axis - 4, y + all_day_height / 2), "all-day", font=self.small_font,
+                  fill=self.text_color, anchor="rm")
+        for (first, last, event), lane in placed:
+            x0 = left + axis + column_width * first + 2
+            x1 = left + axis + column_width * (last + 1) - 2
+            y0 = y + 2 + lane * lane_height
+            self._draw_bar(draw, (x0, y0, x1, y0 + lane_height - 2), event, event.title)
+        y += all_day_height
+        draw.line((left, y, right, y), fill=GRID_COLOR)
+
+        # hour slots
+        slot_height = (bottom - y) / len(hours)
+        for i, label in enumerate(labels):
+            slot_top = y + i * slot_height
+            draw.line((left, slot_top, right, slot_top), fill=GRID_COLOR)
+            draw.text((left + axis - 4, slot_top + slot_height / 2), label, font=self.small_font,
+                      fill=self.text_color, anchor="rm")
+
+        range_start, range_end = start_hour * 60, end_hour * 60
+        minute_height = slot_height / 60
+        for i, day in enumerate(days):
+            midnight = datetime.combine(day, time(0))
+            segments = []
+            for event in events:
+                if event.all_day or not event.on(day):
+                    continue
+                start = max((event.start - midnight).total_seconds() / 60, range_start)
+                end = min((event.end - midnight).total_seconds() / 60, range_end)
+                if start < range_end and (end > start or (end == start and start >= range_start)):
+                    segments.append((start, max(end, start + 15), event))
+
+            column_left = left + axis + column_width * i
+            for (start, end, event), column, columns in _pack_overlapping(segments):
+                width = (column_width - 4) / columns
+                x0 = column_left + 2 + width * column
+                y0 = y + (start - range_start) * minute_height
+                y1 = y + (end - range_start) * minute_height - 1
+                self._draw_event_box(draw, (x0, y0, x0 + width - 1, y1), event)
+
+            if (self.settings.get("displayNowIndicator") == "true" and day == now.date()
+                    and range_start <= now.hour * 60 + now.minute < range_end):
+                color = self._color(self.settings.get("nowIndicatorColor"), DEFAULT_NOW_INDICATOR_COLOR)
+                now_y = y + (now.hour * 60 + now.minute - range_start) * minute_height
+                draw.rectangle((column_left, now_y - 1, column_left + column_width, now_y + 1), fill=color)
+                draw.polygon([(left + axis - 6, now_y - 5), (left + axis, now_y), (left + axis - 6, now_y + 5)],
+                             fill=color)
+
+    def _draw_event_box(self, draw, rect, event):
+        x0, y0, x1, y1 = rect
+        outline = self._color(self.settings.get("textColor"), event.background)
+        draw.rounded_rectangle(rect, radius=3, fill=event.background, outline=outline)
+        width = x1 - x0 - 6
+        y = y0 + 2
+        if self.show_event_time:
+            text = f"{self.format_time(event.start)} - {self.format_time(event.end)}"
+            if y1 - y0 < self.small_line_height * 2:
+                # short events get their time and title on one line
+                text = f"{self.format_time(event.start)} {event.title}"
+            draw.text((x0 + 3, y), self._fit(draw, text, self.small_font, width), font=self.small_font,
+                      fill=event.text)
+            y += self.small_line_height
+            if y1 - y0 < self.small_line_height * 2:
+                return
+        max_lines = max(1, int((y1 - y) // self.small_line_height))
+        for line in self._wrap(draw, event.title, self.small_font, width, max_lines):
+            if y + self.small_line_height > y1 + 2 and y > y0 + 2:
+                break
+            draw.text((x0 + 3, y), line, font=self.small_font, fill=event.text)
+            y += self.small_line_height
+
+    def _draw_day_grid(self, draw, box, days, events, now):
+        left, top, right, bottom = box
+        per_week = len({day.weekday() for day in days})
+        weeks = [days[i:i + per_week] for i in range(0, len(days), per_week)]
+        column_width = (right - left) / per_week
+        month = now.month
+        other_color = tuple(round(c * OTHER_MONTH_OPACITY + 255 * (1 - OTHER_MONTH_OPACITY)) for c in self.text_color)
+
+        for i, day in enumerate(weeks[0]):
+            draw.text((left + column_width * (i + 0.5), top + self.line_height / 2), f"{day:%a}",
+                      font=self.font, fill=self.text_color, anchor="mm")
+        y = top + self.line_height
+        row_height = (bottom - y) / len(weeks)
+        lane_height = self.small_line_height + 2
+
+        for row, week in enumerate(weeks):
+            row_top = y + row_height * row
+            draw.line((left, row_top, right, row_top), fill=GRID_COLOR)
+            for i, day in enumerate(week):
+                x1 = left + column_width * (i + 1)
+                if day == now.date():
+                    draw.rectangle((x1 - column_width, row_top, x1 - 1, row_top + row_height - 1),
+                                   outline=GRID_COLOR, width=2)
+                color = self.text_color if day.month == month else other_color
+                draw.text((x1 - 4, row_top + 2), str(day.day), font=self.small_font, fill=color, anchor="ra")
+
+            spans = []
+            week_events = sorted((e for e in events if e.first_day() <= week[-1] and e.last_day() >= week[0]),
+                                 key=lambda e: (e.first_day(), e.first_day() - e.last_day(), not e.all_day,
+                                                e.start if not e.all_day else datetime.min))
+            for event in week_events:
+                columns = [i for i, day in enumerate(week) if event.on(day)]
+                if columns:
+                    spans.append((columns[0], columns[-1], event))
+            placed = _assign_lanes(spans)
+
+            events_top = row_top + self.small_line_height + 2
+            capacity = max(0, int((row_top + row_height - events_top) // lane_height))
+            visible = capacity if all(lane < capacity for _, lane in placed) else max(0, capacity - 1)
+            hidden = [0] * len(week)
+            for (first, last, event), lane in placed:
+                if lane >= visible:
+                    for column in range(first, last + 1):
+                        hidden[column] += 1
+                    continue
+                x0 = left + column_width * first + 2
+                x1 = left + column_width * (last + 1) - 2
+                y0 = events_top + lane * lane_height
+                if event.all_day or first != last:
+                    text = event.title
+                    if not event.all_day and self.show_event_time and event.first_day() == week[first]:
+                        text = f"{self.format_time(event.start)} {text}"
+                    self._draw_bar(draw, (x0, y0, x1, y0 + lane_height - 2), event, text)
+                else:
+                    # single day timed events are a dot and a line of text, like FullCalendar's list items
+                    middle = y0 + (lane_height - 2) / 2
+                    draw.ellipse((x0 + 2, middle - 4, x0 + 10, middle + 4), fill=event.background)
+                    text = event.title
+                    if self.show_event_time:
+                        text = f"{self.format_time(event.start)} {text}"
+                    draw.text((x0 + 14, middle), self._fit(draw, text, self.small_font, x1 - x0 - 14),
+                              font=self.small_font, fill=self.text_color, anchor="lm")
+            for column, count in enumerate(hidden):
+                if count and visible < capacity:
+                    x0 = left + column_width * column + 4
+                    y0 = events_top + visible * lane_height + (lane_height - 2) / 2
+                    draw.text((x0, y0), self._fit(draw, f"+{count} more", self.small_font, column_width - 6),
+                              font=self.small_font, fill=self.text_color, anchor="lm")
+
+    def _draw_list(self, draw, box, days, events):
+        left, top, right, bottom = box
+        groups = []
+        for day in days:
+            on_day = [event for event in events if event.on(day)]
+            if on_day:
+                on_day.sort(key=lambda e: (not (e.all_day or e.first_day() < day < e.last_day()),
+                                           e.start if not e.all_day else datetime.min, e.title))
+                groups.append((day, on_day))
+        if not groups:
+            draw.text(((left + right) / 2, (top + bottom) / 2), "No events to display", font=self.font,
+                      fill=self.text_color, anchor="mm")
+            return
+
+        midnight = self.format_time(time(0))
+        rows = []
+        for day, on_day in groups:
+            for event in on_day:
+                if event.all_day or event.first_day() < day < event.last_day():
+                    text = "all-day"
+                elif event.first_day() == event.last_day():
+                    text = self.format_time(event.start)
+                    if event.end > event.start:
+                        text += f" - {self.format_time(event.end)}"
+                elif day == event.first_day():
+                    text = f"{self.format_time(event.start)} - {midnight}"
+                else:
+                    text = f"{midnight} - {self.format_time(event.end)}"
+                rows.append((day, event, text))
+        time_width = 0
+        if self.show_event_time:
+            time_width = max(draw.textlength(text, font=self.font) for _, _, text in rows) + 14
+
+        y = top
+        row_height = self.line_height + 4
+        inner_left, inner_right = left + LIST_HEADER_MARGIN_SIDE, right - LIST_HEADER_MARGIN_SIDE
+        current = None
+        for day, event, text in rows:
+            if day != current:
+                current = day
+                y += LIST_HEADER_MARGIN_TOP
+                if y + self.line_height + 2 > bottom:
+                    return
+                middle = y + self.line_height / 2
+                draw.text((inner_left + 4, middle), f"{day:%A}", font=self.font, fill=self.text_color, anchor="lm")
+                draw.text((inner_right - 4, middle), f"{day:%B} {day.day}, {day.year}", font=self.font,
+                          fill=self.text_color, anchor="rm")
+                y += self.line_height
+                draw.rectangle((inner_left, y, inner_right - 1, y + 1), fill=LIST_DIVIDER_COLOR)
+                y += 2 + LIST_HEADER_MARGIN_BOTTOM
+            if y + row_height > bottom:
+                return
+            middle = y + row_height / 2
+            x = inner_left + 4
+            if self.show_event_time:
+                draw.text((x, middle), text, font=self.font, fill=self.text_color, anchor="lm")
+                x += time_width
+            draw.ellipse((x, middle - 5, x + 10, middle + 5), fill=event.background)
+            x += 20
+            draw.text((x, middle), self._fit(draw, event.title, self.font, inner_right - x), font=self.font,
+                      fill=self.text_color, anchor="lm")
+            y += row_height
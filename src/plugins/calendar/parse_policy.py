@@ -0,0 +1,139 @@
+import os
+import logging
+import threading
+import psutil
+from plugins.calendar.worker_pool import WORKER_MEMORY_BYTES
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Chunks handed out per worker; smaller chunks let the parent consume results while later chunks are parsed
+CHUNKS_PER_WORKER = 4
+# Chunks smaller than this cost more to hand to a worker than they save
+MIN_CHUNK_BYTES = 256 * 1024
+
+# Parse cost assumed until a feed has been timed, in CPU seconds per MB of .ics
+DEFAULT_SECONDS_PER_MB = 1.0
+# Weight of the newest measurement in the running parse rate
+RATE_SMOOTHING = 0.3
+# Fixed cost of a parallel parse on running workers: chunking, pickling results, merging series
+PARALLEL_OVERHEAD_SECONDS = 0.2
+# Extra cost of a parallel parse when the worker processes still have to be started
+POOL_STARTUP_SECONDS = 1.5
+# Cost of hashing the blocks of an incremental parse and reusing the unchanged ones, as a share of parsing them
+INCREMENTAL_SCAN_SHARE = 0.15
+# Share of a feed's events assumed to change between parses until an incremental parse has measured it
+DEFAULT_CHANGED_SHARE = 0.1
+
+PARSE_MODES = ("auto", "sequential", "parallel")
+
+
+class ParsePlan:
+    """How a feed is parsed: sequentially, or in num_chunks chunks over num_workers workers."""
+    __slots__ = ("parallel", "num_workers", "num_chunks", "reason")
+
+    def __init__(self, parallel, num_workers, num_chunks, reason):
+        self.parallel = parallel
+        self.num_workers = num_workers
+        self.num_chunks = num_chunks
+        self.reason = reason
+
+
+class ParsePolicy:
+    """Chooses sequential or parallel parsing per feed.
+
+    The choice weighs the estimated sequential parse time of the feed (its size times
+    the measured parse rate) against the parallel time on the workers that fit the
+    CPU count and available memory, plus the overhead of handing chunks to them.
+
+    A feed with an index of its previous parse is parsed incrementally on one worker,
+    which only parses the changed events, so its sequential time is scaled down to
+    the share of its events that changed on its last parse. Parallel parses
+    don't reuse the index and parse everything.
+
+    Attributes:
+        seconds_per_mb (float): Running estimate of the parse cost, updated by `record`.
+        changed_shares (dict): Share of the events of each feed that had changed
+            since its previous parse on its last parse, updated by `record_changes`.
+    """
+
+    def __init__(self, seconds_per_mb=DEFAULT_SECONDS_PER_MB):
+        self.seconds_per_mb = seconds_per_mb
+        self.changed_shares = {}
+        self.lock = threading.Lock()
+
+    def record(self, size_bytes, cpu_seconds):
+        """Folds the CPU time of a full (not incremental) parse into the parse rate."""
+        if size_bytes < MIN_CHUNK_BYTES or cpu_seconds <= 0:
+            return  # too small to say anything reliable about the rate
+        rate = cpu_seconds / (size_bytes / MB)
+        with self.lock:
+            self.seconds_per_mb += RATE_SMOOTHING * (rate - self.seconds_per_mb)
+
+    def record_changes(self, name, changed, unchanged):
+        """Records how many events of the feed changed since its previous parse, and how many didn't."""
+        if changed + unchanged:
+            with self.lock:
+                self.changed_shares[name] = changed / (changed + unchanged)
+
+    def choose(self, size_bytes, max_workers, pool_warm=True, mode="auto", name="feed", memory_budget=None,
+               indexed=False):
+        """Returns the ParsePlan for a feed of size_bytes, using at most max_workers workers.
+
+        mode "sequential" or "parallel" overrides the automatic choice. With a
+        memory_budget (bytes), only as many workers as fit in what the budget leaves
+        over the current RSS are used, in every mode. A feed with a FeedIndex from its
+        previous parse (indexed) is only parsed in parallel when too many of its events
+        are expected to have changed for the incremental parse to be quicker.
+        """
+        size_mb = size_bytes / MB
+        cpus = os.cpu_count() or 1
+        available = psutil.virtual_memory().available
+        by_memory = max(1, available // WORKER_MEMORY_BYTES)
+        if memory_budget is not None:
+            headroom = memory_budget - psutil.Process().memory_info().rss
+            by_budget = max(0, headroom // WORKER_MEMORY_BYTES)
+            if by_budget <= 1:
+                plan = ParsePlan(False, 1, 1, f"the {memory_budget // MB} MB memory budget leaves no room for workers")
+                logger.info(f"Parsing {name} ({size_mb:.1f} MB) sequentially: {plan.reason}")
+                return plan
+            by_memory = min(by_memory, by_budget)
+            max_workers = min(max_workers, by_budget)
+
+        if mode == "sequential":
+            plan = ParsePlan(False, 1, 1, "sequential parsing selected in settings")
+        elif mode == "parallel" and max_workers > 1:
+            plan = ParsePlan(True, max_workers, self._chunks(size_bytes, max_workers),
+                             "parallel parsing selected in settings")
+        else:
+            workers = int(min(max_workers, cpus, by_memory))
+            full_seconds = size_mb * self.seconds_per_mb
+            sequential_seconds = full_seconds
+            kind = "sequential"
+            if indexed:
+                changed = self.changed_shares.get(name, DEFAULT_CHANGED_SHARE)
+                sequential_seconds *= INCREMENTAL_SCAN_SHARE + (1 - INCREMENTAL_SCAN_SHARE) * changed
+                kind = f"incremental ({changed:.0%} changed)"
+            if workers <= 1:
+                plan = ParsePlan(False, 1, 1, f"only one worker fits ({cpus} CPUs, {available // MB} MB available)")
+            else:
+                overhead = PARALLEL_OVERHEAD_SECONDS + (0 if pool_warm else POOL_STARTUP_SECONDS)
+                parallel_seconds = full_seconds / workers + overhead
+                estimate = (f"estimated {sequential_seconds:.2f}s {kind} vs {parallel_seconds:.2f}s "
+                            f"on {workers} workers at {self.seconds_per_mb:.2f}s/MB")
+                if parallel_seconds < sequential_seconds:
+                    plan = ParsePlan(True, workers, self._chunks(size_bytes, workers), estimate)
+                else:
+                    plan = ParsePlan(False, 1, 1, estimate)
+
+        if plan.parallel:
+            logger.info(f"Parsing {name} ({size_mb:.1f} MB) in parallel, {plan.num_chunks} chunks "
+                        f"on {plan.num_workers} workers: {plan.reason}")
+        else:
+            logger.info(f"Parsing {name} ({size_mb:.1f} MB) sequentially: {plan.reason}")
+        return plan
+
+    @staticmethod
+    def _chunks(size_bytes, workers):
+        return int(max(workers, min(workers * CHUNKS_PER_WORKER, size_bytes // MIN_CHUNK_BYTES)))
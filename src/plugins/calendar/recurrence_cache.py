@@ -0,0 +1,139 @@
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_MAX_SPILL_ENTRIES = 20000
+
+
+class RecurrenceCache:
+    """LRU cache of expanded recurring series.
+
+    Entries are keyed on the identity of a series (its UID plus the RECURRENCE-ID, SEQUENCE
+    and LAST-MODIFIED or content digest of the master and each override), the timezone
+    and the view window, and hold the occurrences
+    the expansion produced. When `spill_dir` is set, entries evicted from memory are
+    written there and loaded back on a later miss, so they survive worker and service
+    restarts.
+
+    Attributes:
+        max_entries (int): Number of entries kept in memory.
+        spill_dir (str): Optional directory evicted entries are spilled to.
+        max_spill_entries (int): Number of spilled entries kept on disk.
+        hits (int): Lookups answered from memory or disk.
+        misses (int): Lookups that required a fresh expansion.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, spill_dir=None, max_spill_entries=DEFAULT_MAX_SPILL_ENTRIES):
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.max_spill_entries = max_spill_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _spill_path(self, key):
+        name = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:40]
+        return os.path.join(self.spill_dir, f"{name}.pickle")
+
+    def get(self, key):
+        """Returns the cached occurrences for key, or None on a miss."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        occurrences = self._load_spilled(key)
+        with self.lock:
+            if occurrences is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self.put(key, occurrences)
+        return occurrences
+
+    def put(self, key, occurrences):
+        """Stores the occurrences for key, evicting (and optionally spilling) the least recently used entries."""
+        evicted = []
+        with self.lock:
+            self.entries[key] = occurrences
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                evicted.append(self.entries.popitem(last=False))
+
+        if self.spill_dir:
+            for evicted_key, evicted_occurrences in evicted:
+                self._spill(evicted_key, evicted_occurrences)
+
+    def shrink(self, keep=0):
+        """Evicts (and optionally spills) all but the `keep` most recently used entries, to release memory."""
+        evicted = []
+        with self.lock:
+            while len(self.entries) > keep:
+                evicted.append(self.entries.popitem(last=False))
+
+        if self.spill_dir:
+            for evicted_key, evicted_occurrences in evicted:
+                self._spill(evicted_key, evicted_occurrences)
+        return len(evicted)
+
+    def _load_spilled(self, key):
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, "rb") as f:
+                spilled_key, occurrences = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable recurrence cache entry {path}: {e}")
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        # guard against hash collisions
+        return occurrences if spilled_key == key else None
+
+    def _spill(self, key, occurrences):
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((key, occurrences), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._spill_path(key))
+        except Exception as e:
+            logger.warning(f"Failed to spill recurrence cache entry: {e}")
+            return
+        self._trim_spill()
+
+    def _trim_spill(self):
+        """Removes the oldest spilled entries once there are more than max_spill_entries."""
+        try:
+            names = [name for name in os.listdir(self.spill_dir) if name.endswith(".pickle")]
+        except OSError:
+            return
+        if len(names) <= self.max_spill_entries:
+            return
+        paths = [os.path.join(self.spill_dir, name) for name in names]
+        paths.sort(key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0)
+        # trim a quarter at a time so the directory isn't listed on every spill
+        for path in paths[:len(paths) - (self.max_spill_entries * 3) // 4]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
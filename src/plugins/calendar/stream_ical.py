@@ -1,201 +1,753 @@
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta, time, timezone
 from zoneinfo import ZoneInfo
-from icalendar import Calendar, Event
+from icalendar import Calendar, Component
+from icalendar.cal import component_factory, types_factory
+from icalendar.parser import Contentline
+from icalendar.timezone import tzp
 import recurring_ical_events
-from dateutil.parser import parse
-import multiprocessing as mp
 from concurrent.futures import ProcessPoolExecutor
 import os
+import mmap
+import time as timer
+import hashlib
 import logging
+from plugins.calendar.feed_cache import file_digest
+from plugins.calendar.feed_index import empty_index
+from plugins.calendar.event_record import EventRecord
+from plugins.calendar.recurrence_cache import RecurrenceCache
+from plugins.calendar.parse_policy import ParsePolicy, CHUNKS_PER_WORKER
+from plugins.calendar.memory_monitor import MemoryMonitor
+from plugins.calendar.event_filter import FILTER_PROPERTIES
 
 logger = logging.getLogger(__name__)
 
+# Expanded recurring series, per process; worker processes each keep their own across refreshes
+RECURRENCE_CACHE = RecurrenceCache()
+
+# Chooses sequential or parallel parsing from the feed size and the parse rate measured so far
+PARSE_POLICY = ParsePolicy()
+
+# Recurring series expanded between checks of the memory budget
+MEMORY_CHECK_INTERVAL = 200
+
+# Widening of the prefilter window, covers any UTC offset of wall-clock DTSTART values
+PREFILTER_SLACK = timedelta(days=1)
+
+# Longest gap between consecutive occurrences per RRULE FREQ (for rules without BY* parts)
+FREQ_SPANS = {
+    "SECONDLY": timedelta(seconds=1),
+    "MINUTELY": timedelta(minutes=1),
+    "HOURLY": timedelta(hours=1),
+    "DAILY": timedelta(days=1),
+    "WEEKLY": timedelta(weeks=1),
+    "MONTHLY": timedelta(days=31),
+    "YEARLY": timedelta(days=366),
+}
+
+# Properties whose values are resolved against a TZID parameter (mirrors icalendar's parser)
+DATETIME_PROPERTIES = ("DTSTART", "DTEND", "RECURRENCE-ID", "DUE", "RDATE", "EXDATE")
+
+
+def _to_dt(dtlike, default_tz):
+    """Convert icalendar vDDDTypes .dt -> aware datetime."""
+    if hasattr(dtlike, "dt"):
+        dtlike = dtlike.dt
+    if isinstance(dtlike, datetime):
+        if dtlike.tzinfo is None:
+            return dtlike.replace(tzinfo=ZoneInfo(default_tz))
+        return dtlike
+    else:
+        # all-day DATE -> make it start-of-day in default_tz
+        return datetime.combine(dtlike, time.min, tzinfo=ZoneInfo(default_tz))
+
+
+def _event_to_dict(ev, default_tz):
+    """Reduce an icalendar.Event to a lightweight dict."""
+    dtstart = ev.get("DTSTART").dt if ev.get("DTSTART") else None
+    dtend = ev.get("DTEND").dt if ev.get("DTEND") else None
+    return {
+        "uid": (ev.get("UID") and ev.get("UID").to_ical().decode()) if ev.get("UID") else None,
+        "summary": (ev.get("SUMMARY") and ev.get("SUMMARY").to_ical().decode()) if ev.get("SUMMARY") else None,
+        "location": (ev.get("LOCATION") and ev.get("LOCATION").to_ical().decode()) if ev.get("LOCATION") else None,
+        "description": (ev.get("DESCRIPTION") and ev.get("DESCRIPTION").to_ical().decode()) if ev.get("DESCRIPTION") else None,
+        "dtstart": _to_dt(dtstart, default_tz) if dtstart else None,
+        "dtend": _to_dt(dtend, default_tz) if dtend else None,
+        "all_day": (not isinstance(dtstart, datetime)) if dtstart is not None else False,
+    }
+
+
+def _unfold_lines(lines):
+    """Yield logical content lines from raw text lines, joining RFC 5545 folded continuations."""
+    current = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if current is not None and line[:1] in (" ", "\t"):
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _build_component(content_lines):
+    """
+    Build an icalendar component straight from unfolded content lines.
+
+    This follows the same rules as icalendar's Component.from_ical, but skips the
+    serialize -> unfold -> split round trip, so a single VEVENT or VTIMEZONE can be
+    parsed without wrapping it in a calendar of its own.
+    """
+    stack = []
+    component = None
+    for line in content_lines:
+        if not line:
+            continue
+
+        try:
+            name, params, vals = Contentline(line).parts()
+        except ValueError as e:
+            current = stack[-1] if stack else None
+            if not current or not current.ignore_exceptions:
+                raise
+            current.errors.append((None, str(e)))
+            continue
+
+        uname = name.upper()
+        if uname == "BEGIN":
+            c_name = vals.upper()
+            c_class = component_factory.get(c_name, Component)
+            current = c_class()
+            if not getattr(current, "name", ""):
+                current.name = c_name
+            stack.append(current)
+        elif uname == "END":
+            if not stack:
+                raise ValueError("END encountered without an accompanying BEGIN!")
+            current = stack.pop()
+            if stack:
+                stack[-1].add_component(current)
+            else:
+                component = current
+            if vals == "VTIMEZONE" and "TZID" in current:
+                # makes custom (e.g. Outlook) TZIDs resolvable for the events that follow
+                tzp.cache_timezone_component(current)
+        else:
+            if not stack:
+                raise ValueError(f'Property "{name}" does not have a parent component.')
+            current = stack[-1]
+            factory = types_factory.for_property(name)
+            try:
+                if name == "FREEBUSY":
+                    vals = vals.split(",")
+                    if "TZID" in params:
+                        parsed = [factory(factory.from_ical(val, params["TZID"])) for val in vals]
+                    else:
+                        parsed = [factory(factory.from_ical(val)) for val in vals]
+                elif name in DATETIME_PROPERTIES and "TZID" in params:
+                    parsed = [factory(factory.from_ical(vals, params["TZID"]))]
+                else:
+                    parsed = [factory(factory.from_ical(vals))]
+            except ValueError as e:
+                if not current.ignore_exceptions:
+                    raise
+                current.errors.append((uname, str(e)))
+            else:
+                for prop in parsed:
+                    prop.params = params
+                    current.add(name, prop, encode=0)
+
+    return component
+
+
+def _event_calendar(events, vtimezones):
+    """Wrap already parsed events (and the parsed VTIMEZONEs) in a Calendar for recurrence expansion."""
+    cal = Calendar()
+    cal.add("VERSION", "2.0")
+    for vtimezone in vtimezones:
+        cal.add_component(vtimezone)
+    for event in events:
+        cal.add_component(event)
+    return cal
+
+
+def _parse_ical_datetime(value):
+    """Parse a raw DATE or DATE-TIME value (e.g. 20250301, 20250301T100000Z) into a naive datetime, or None."""
+    try:
+        if len(value) == 8:
+            return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+        if len(value) >= 15 and value[8] == "T":
+            return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]),
+                            int(value[9:11]), int(value[11:13]), int(value[13:15]))
+    except ValueError:
+        pass
+    return None
+
+
+def _may_start_in_range(dtstart_value, rrules, has_rdate, window_start, window_end):
+    """
+    Decide from the raw DTSTART / RRULE values whether an event can have an occurrence
+    starting inside the window. The window is naive UTC, widened by PREFILTER_SLACK so that
+    wall-clock values in any timezone are covered. Returns True whenever it can't be sure.
+    """
+    dtstart = _parse_ical_datetime(dtstart_value) if dtstart_value else None
+    if dtstart is None or has_rdate or len(rrules) > 1:
+        return True
+
+    # no occurrence of an event (or its recurrences) starts before DTSTART
+    if dtstart > window_end:
+        return False
+    if not rrules:
+        return dtstart >= window_start
+
+    parts = {}
+    for part in rrules[0].split(";"):
+        key, _, value = part.partition("=")
+        parts[key.upper()] = value
+
+    if "UNTIL" in parts:
+        until = _parse_ical_datetime(parts["UNTIL"])
+        if until is not None and until < window_start:
+            return False
+
+    # COUNT gives an upper bound on the last start only when every period yields exactly one occurrence
+    freq = parts.get("FREQ", "").upper()
+    span = FREQ_SPANS.get(freq)
+    if "COUNT" in parts and span and not any(key.startswith("BY") for key in parts):
+        if freq == "MONTHLY" and dtstart.day > 28:
+            return True   # months without that day are skipped
+        if freq == "YEARLY" and (dtstart.month, dtstart.day) == (2, 29):
+            return True   # only leap years have an occurrence
+        try:
+            count = int(parts["COUNT"])
+            interval = int(parts.get("INTERVAL", "1") or 1)
+        except ValueError:
+            return True
+        last_start = dtstart + span * interval * max(count - 1, 0)
+        if last_start < window_start:
+            return False
+
+    return True
+
+
+def _block_digest(block):
+    """Digest of a raw VEVENT block, ignoring DTSTAMP (which many servers set to the export time)."""
+    sha = hashlib.sha1()
+    for line in block:
+        if not line.startswith("DTSTAMP"):
+            sha.update(line.encode("utf-8", errors="replace"))
+            sha.update(b"\n")
+    return sha.hexdigest()
+
+
+class _Series:
+    """
+    Raw VEVENT blocks sharing a UID: the recurring master and its RECURRENCE-ID overrides.
+
+    Blocks are kept unparsed until the whole stream has been seen, since overrides may
+    appear anywhere in a feed. Each block is held as a single string, which takes far
+    less memory than its list of lines. The series is relevant when any of its blocks passed the
+    prefilter, as an override can move an occurrence into (or out of) the view window.
+    excluded flags the blocks an EventFilter dropped.
+    """
+    __slots__ = ("uid", "blocks", "ids", "excluded", "has_master", "master_excluded", "relevant")
+
+    def __init__(self, uid):
+        self.uid = uid
+        self.blocks = []
+        self.ids = []
+        self.excluded = []
+        self.has_master = False
+        self.master_excluded = False
+        self.relevant = False
+
+    def add(self, block, block_id, is_master, relevant, excluded=False):
+        self.blocks.append("\n".join(block))
+        self.ids.append(block_id)
+        self.excluded.append(excluded)
+        self.has_master = self.has_master or is_master
+        self.master_excluded = self.master_excluded or (is_master and excluded)
+        self.relevant = self.relevant or relevant
+
+    def merge(self, other):
+        self.blocks.extend(other.blocks)
+        self.ids.extend(other.ids)
+        self.excluded.extend(other.excluded)
+        self.has_master = self.has_master or other.has_master
+        self.master_excluded = self.master_excluded or other.master_excluded
+        self.relevant = self.relevant or other.relevant
+
+
+def _convert(ev, return_type, default_tz):
+    """Return ev in the requested return_type."""
+    if return_type == "event":
+        return ev
+    if return_type == "record":
+        return EventRecord.from_event(ev)
+    return _event_to_dict(ev, default_tz)
+
+
+def _parsed_entry(ev, return_type, default_tz):
+    """Return (aware DTSTART, converted event) for a parsed event, or (None, None) when it has no DTSTART."""
+    dtstart_prop = ev.get("DTSTART")
+    if not dtstart_prop:
+        return None, None
+    return _to_dt(dtstart_prop, default_tz), _convert(ev, return_type, default_tz)
+
+
+def _convert_event(ev, start, end, return_type, default_tz):
+    """Return ev in the requested return_type if its DTSTART falls in [start, end], else None."""
+    dtstart_prop = ev.get("DTSTART")
+    if not dtstart_prop:
+        return None
+    dtstart = _to_dt(dtstart_prop, default_tz)
+    if not start <= dtstart <= end:
+        return None
+    return _convert(ev, return_type, default_tz)
+
+
+def _init_stats(stats):
+    if stats is None:
+        stats = {}
+    for counter in ("parsed", "skipped", "filtered", "reused", "expanded", "expansions_cached", "bytes",
+                    "cpu_seconds"):
+        stats.setdefault(counter, 0)
+    return stats
+
+
+def _scan_blocks(lines, start, end, return_type, default_tz, stats, vtimezones, series, previous=None, seen=None,
+                 event_filter=None):
+    """
+    Single pass over the raw lines of an .ics stream.
+
+    VTIMEZONE blocks are parsed once as they are seen and appended to vtimezones.
+    Standalone VEVENTs that fall in [start, end] are built directly from the line buffer
+    and yielded; a prefilter on the raw DTSTART / RRULE values skips those that cannot
+    start in the range before they are parsed. Recurring masters and RECURRENCE-ID
+    overrides are not parsed here but collected, per UID, into the series dict.
+
+    For incremental parsing, every block is recorded in the seen index under its digest,
+    and standalone events whose digest is in the previous index reuse the parsed result
+    stored there instead of being parsed again.
+
+    With an EventFilter, standalone events it drops are skipped on their raw
+    SUMMARY / CATEGORIES / TRANSP / STATUS values, before being parsed; series blocks
+    it drops are flagged for _expand_series.
+    """
+    previous_blocks = previous["blocks"] if previous else {}
+    # naive UTC bounds for comparing against raw property values
+    window_start = start.astimezone(timezone.utc).replace(tzinfo=None) - PREFILTER_SLACK
+    window_end = end.astimezone(timezone.utc).replace(tzinfo=None) + PREFILTER_SLACK
+
+    tz_lines = None
+
+    ev_lines = None
+    depth = 0                  # nesting level of sub-components (e.g. VALARM) inside the VEVENT
+    dtstart_value = None
+    rrules = []
+    has_rdate = False
+    series_id = {}             # raw UID / SEQUENCE / LAST-MODIFIED / RECURRENCE-ID values of the block
+    filter_values = {}         # raw values of the FILTER_PROPERTIES of the block
+
+    for line in _unfold_lines(lines):
+        # Collect VTIMEZONE blocks and parse each of them once
+        if tz_lines is not None:
+            tz_lines.append(line)
+            if line == "END:VTIMEZONE":
+                vtimezones.append(_build_component(tz_lines))
+                tz_lines = None
+            continue  # don't let timezone lines fall through
+        if line == "BEGIN:VTIMEZONE":
+            tz_lines = [line]
+            continue
+
+        # Detect VEVENT blocks
+        if line == "BEGIN:VEVENT":
+            ev_lines = [line]
+            depth = 0
+            dtstart_value = None
+            rrules = []
+            has_rdate = False
+            series_id = {}
+            filter_values = {}
+            continue
+
+        if ev_lines is None:
+            continue
+
+        ev_lines.append(line)
+
+        if line.startswith("BEGIN:"):
+            depth += 1
+            continue
+        if line.startswith("END:") and line != "END:VEVENT":
+            depth -= 1
+            continue
+
+        if line != "END:VEVENT":
+            # remember the raw values the prefilter needs (only from the VEVENT itself)
+            if depth == 0:
+                if line.startswith("DTSTART"):
+                    dtstart_value = line.rpartition(":")[2].strip()
+                elif line.startswith("RRULE"):
+                    rrules.append(line.partition(":")[2])
+                elif line.startswith("RDATE"):
+                    has_rdate = True
+                elif line.startswith(("UID", "SEQUENCE", "LAST-MODIFIED", "RECURRENCE-ID")):
+                    name, _, value = line.partition(":")
+                    series_id[name.partition(";")[0]] = value
+                if event_filter is not None and line.startswith(FILTER_PROPERTIES):
+                    name, _, value = line.partition(":")
+                    filter_values.setdefault(name.partition(";")[0], []).append(value)
+            continue
+
+        block, ev_lines = ev_lines, None
+        is_master = bool(rrules) or has_rdate
+        digest = _block_digest(block) if seen is not None else None
+        excluded = event_filter is not None and not event_filter.allows(filter_values)
+
+        if is_master or "RECURRENCE-ID" in series_id:
+            # hold on to series blocks until their overrides have been seen
+            uid = series_id.get("UID")
+            if uid is None:
+                uid = f"<no uid {_block_digest(block)}>"   # can't be matched with anything, keep it on its own
+            block_id = (series_id.get("RECURRENCE-ID"), series_id.get("SEQUENCE"),
+                        series_id.get("LAST-MODIFIED") or digest or _block_digest(block))
+            if seen is not None:
+                seen["blocks"][digest] = (series_id.get("UID"), None)
+            if uid not in series:
+                series[uid] = _Series(uid)
+            series[uid].add(block, block_id, is_master,
+                            _may_start_in_range(dtstart_value, rrules, has_rdate, window_start, window_end), excluded)
+            continue
+
+        if excluded:
+            stats["filtered"] += 1
+            if seen is not None:
+                seen["blocks"][digest] = (series_id.get("UID"), None)
+            continue
+
+        # To save processing time on a slow Pi Zero with a large calendar,
+        # don't parse entries that can't have an occurrence starting in the range
+        if not _may_start_in_range(dtstart_value, rrules, has_rdate, window_start, window_end):
+            stats["skipped"] += 1
+            if seen is not None:
+                seen["blocks"][digest] = (series_id.get("UID"), None)
+            continue
+
+        entry = previous_blocks.get(digest, (None, None))[1] if digest else None
+        if entry is None:
+            stats["parsed"] += 1
+            entry = _parsed_entry(_build_component(block), return_type, default_tz)
+        else:
+            stats["reused"] += 1
+        if seen is not None:
+            seen["blocks"][digest] = (series_id.get("UID"), entry)
+
+        dtstart, result = entry
+        if dtstart is not None and start <= dtstart <= end:
+            yield result
+
+
+def _expand_series(series, vtimezones, start, end, return_type, default_tz, stats, previous=None, seen=None,
+                   monitor=None, event_filter=None):
+    """
+    Expand each relevant series once, master and overrides together, yielding the
+    occurrences that start in [start, end].
+
+    recurring_ical_events applies the RECURRENCE-ID overrides and EXDATEs, so every
+    occurrence comes out exactly once. Expansions are looked up in RECURRENCE_CACHE
+    first, keyed on the identity of every block in the series and the view window.
+    Overrides without a master in the feed are treated as standalone events. For
+    incremental parsing, the results of each series are recorded in the seen index,
+    and series unchanged since the previous index reuse the results stored there.
+    With a MemoryMonitor whose budget is exceeded, RECURRENCE_CACHE is emptied (to disk
+    when it has a spill directory) as the expansion goes.
+
+    Blocks flagged by the EventFilter in _scan_blocks are handled without expanding what
+    they drop: a series whose master was dropped is not expanded, its remaining overrides
+    are treated as standalone events. When only overrides were dropped, the series is
+    expanded as usual and the occurrences are filtered on their own properties.
+    """
+    window = (default_tz, start.isoformat(), end.isoformat())
+    previous_series = previous["series"] if previous else {}
+    for count, group in enumerate(series, 1):
+        if monitor is not None and count % MEMORY_CHECK_INTERVAL == 0 and monitor.over_budget():
+            released = RECURRENCE_CACHE.shrink()
+            logging.info(f"Over the memory budget, released {released} cached series expansions")
+
+        if not group.relevant:
+            stats["skipped"] += len(group.blocks)
+            continue
+        filtered = sum(group.excluded)
+        if filtered == len(group.blocks):
+            stats["filtered"] += filtered
+            continue
+
+        series_key = (group.uid, tuple(group.ids)) + window
+        results = previous_series.get(series_key)
+        if results is not None:
+            stats["reused"] += len(group.blocks)
+            if seen is not None:
+                seen["series"][series_key] = results
+            yield from results
+            continue
+        stats["parsed"] += len(group.blocks) - filtered if group.master_excluded else len(group.blocks)
+        stats["filtered"] += filtered
+
+        if not group.has_master or group.master_excluded:
+            occurrences = [_build_component(block.split("\n"))
+                           for block, excluded in zip(group.blocks, group.excluded) if not excluded]
+        else:
+            occurrences = RECURRENCE_CACHE.get(series_key)
+            if occurrences is None:
+                components = [_build_component(block.split("\n")) for block in group.blocks]
+                occurrences = recurring_ical_events.of(_event_calendar(components, vtimezones)).between(start, end)
+                RECURRENCE_CACHE.put(series_key, occurrences)
+                stats["expanded"] += 1
+            else:
+                stats["expansions_cached"] += 1
+
+        results = []
+        for ev in occurrences:
+            if ev.name != "VEVENT":
+                continue
+            if filtered and not group.master_excluded and not event_filter.allows_component(ev):
+                continue
+            result = _convert_event(ev, start, end, return_type, default_tz)
+            if result is not None:
+                results.append(result)
+        if seen is not None:
+            seen["series"][series_key] = results
+        yield from results
+
+
+def _scan_events(lines, start, end, return_type, default_tz, stats=None, previous=None, seen=None, monitor=None,
+                 event_filter=None):
+    """
+    Yield the events of an .ics stream that fall in [start, end]: standalone events
+    as they are scanned, then the occurrences of each recurring series once the whole
+    stream (and so every override) has been seen. The optional stats dict counts
+    "parsed", "skipped", "reused", "expanded" and "expansions_cached" events.
+    previous and seen are the indexes used for incremental parsing, see _scan_blocks,
+    monitor an optional MemoryMonitor, see _expand_series, and event_filter an optional
+    EventFilter whose dropped events are never parsed or expanded.
+    """
+    stats = _init_stats(stats)
+    vtimezones = []
+    series = {}
+    yield from _scan_blocks(lines, start, end, return_type, default_tz, stats, vtimezones, series, previous, seen,
+                            event_filter)
+    yield from _expand_series(series.values(), vtimezones, start, end, return_type, default_tz, stats, previous, seen,
+                              monitor, event_filter)
+
+
+def _find_line(mm, token, start=0, end=None):
+    """Return the offset of the next line in mm[start:end] that is exactly token, or -1."""
+    end = len(mm) if end is None else end
+    idx = mm.find(token, start, end)
+    while idx != -1:
+        at_line_start = idx == 0 or mm[idx - 1] == 0x0A
+        after = idx + len(token)
+        at_line_end = after >= len(mm) or mm[after] in (0x0D, 0x0A)
+        if at_line_start and at_line_end:
+            return idx
+        idx = mm.find(token, idx + 1, end)
+    return -1
+
+
+def _line_end(mm, pos):
+    """Return the offset just past the line containing pos."""
+    nl = mm.find(b"\n", pos)
+    return len(mm) if nl == -1 else nl + 1
+
 
 def _chunk_file_by_events(filepath, num_chunks=4):
-    """Split file into roughly equal chunks, breaking on VEVENT boundaries."""
+    """
+    Split file into roughly equal chunks, breaking on VEVENT boundaries.
+
+    Returns the (start, end) byte ranges of the chunks together with the byte ranges
+    of the VTIMEZONE blocks, which every worker needs to resolve TZIDs in its chunk.
+    """
     file_size = os.path.getsize(filepath)
+    if file_size == 0:
+        return [], []
     chunk_size = file_size // num_chunks
 
     chunks = []
-    with open(filepath, 'rb') as f:
-        current_pos = 0
-        f.seek(current_pos)
+    tz_ranges = []
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        tz_start = _find_line(mm, b"BEGIN:VTIMEZONE")
+        while tz_start != -1:
+            tz_end = _find_line(mm, b"END:VTIMEZONE", tz_start)
+            if tz_end == -1:
+                break
+            tz_end = _line_end(mm, tz_end)
+            tz_ranges.append((tz_start, tz_end))
+            tz_start = _find_line(mm, b"BEGIN:VTIMEZONE", tz_end)
 
+        current_pos = 0
         for i in range(num_chunks):
             start_pos = current_pos
             if i == num_chunks - 1:
                 # Last chunk gets the remainder
                 end_pos = file_size
             else:
-                # Seek to approximate chunk end
-                target_pos = start_pos + chunk_size
-                f.seek(target_pos)
-
-                # Find next BEGIN:VEVENT or END:VEVENT boundary
-                line = f.readline()
-                while line:
-                    line_str = line.decode('utf-8', errors='ignore').strip()
-                    if line_str in ('END:VEVENT','END:VCALENDAR'):
-                        break
-                    line = f.readline()
-
-                end_pos = f.tell()
+                # Break just after the first END:VEVENT at or past the approximate chunk end
+                boundary = _find_line(mm, b"END:VEVENT", min(start_pos + chunk_size, file_size))
+                end_pos = file_size if boundary == -1 else _line_end(mm, boundary)
 
             if start_pos < end_pos:
                 chunks.append((start_pos, end_pos))
             current_pos = end_pos
 
-    return chunks
+    return chunks, tz_ranges
+
+
+def _iter_lines(view, start_pos, end_pos):
+    """Yield the text lines in view[start_pos:end_pos], decoding straight from the mapped bytes."""
+    obj = view.obj
+    pos = start_pos
+    while pos < end_pos:
+        nl = obj.find(b"\n", pos, end_pos)
+        stop = end_pos if nl == -1 else nl + 1
+        yield str(view[pos:stop], "utf-8", "replace")
+        pos = stop
 
 
 def _process_chunk(args):
-    """Worker function to process a file chunk."""
-    filepath, start_pos, end_pos, start_dt, end_dt, return_type, default_tz = args
-
-    # Helper functions (duplicated for worker process)
-    def _to_dt(dtlike):
-        if hasattr(dtlike, "dt"):
-            dtlike = dtlike.dt
-        if isinstance(dtlike, datetime):
-            if dtlike.tzinfo is None:
-                return dtlike.replace(tzinfo=ZoneInfo(default_tz))
-            return dtlike
-        else:
-            return datetime.combine(dtlike, time.min, tzinfo=ZoneInfo(default_tz))
-
-    def _event_block_to_calendar_bytes(event_block, vtimezones):
-        parts = ["BEGIN:VCALENDAR", "VERSION:2.0"]
-        parts.extend(vtimezones)
-        parts.append(event_block)
-        parts.append("END:VCALENDAR")
-        cal_text = "\r\n".join(
-            line if line.endswith(("\r", "\n")) else line
-            for chunk in parts
-            for line in chunk.splitlines()
-        ) + "\r\n"
-        return cal_text.encode("utf-8")
-
-    def _event_to_dict(ev):
-        def _get(prop):
-            v = ev.get(prop)
-            return getattr(v, "to_ical", lambda: v)() if v is not None else None
-
-        dtstart = ev.get("DTSTART").dt if ev.get("DTSTART") else None
-        dtend   = ev.get("DTEND").dt if ev.get("DTEND") else None
-        return {
-            "uid": (ev.get("UID") and ev.get("UID").to_ical().decode()) if ev.get("UID") else None,
-            "summary": (ev.get("SUMMARY") and ev.get("SUMMARY").to_ical().decode()) if ev.get("SUMMARY") else None,
-            "location": (ev.get("LOCATION") and ev.get("LOCATION").to_ical().decode()) if ev.get("LOCATION") else None,
-            "description": (ev.get("DESCRIPTION") and ev.get("DESCRIPTION").to_ical().decode()) if ev.get("DESCRIPTION") else None,
-            "dtstart": _to_dt(dtstart) if dtstart else None,
-            "dtend": _to_dt(dtend) if dtend else None,
-            "all_day": (not isinstance(dtstart, datetime)) if dtstart is not None else False,
-        }
-
-    results = []
-    vtimezones = []
-    tz_collect = False
-    tz_lines = []
-
-    inside_event = False
-    occurring_in_range = False
-    reoccurring_in_range = False
-    start_year = str(start_dt.year)
-    end_year = str(end_dt.year)
-    ev_lines = []
-    all_read = ""
-
-    with open(filepath, "r", encoding="utf-8", errors="replace") as f:
-        f.seek(start_pos)
-        bytes_read = 0
-
-        for raw in f:
-            bytes_read += len(raw.encode('utf-8'))
-            if start_pos + bytes_read > end_pos:
-                break
+    """
+    Worker function to process a file chunk.
 
-            line = raw.rstrip("\r\n")
-            all_read += line + "\n"
+    Returns the standalone events of the chunk, the recurring series blocks it found
+    (their overrides may live in other chunks, so the parent groups them by UID), the
+    prefilter stats and, when incremental, the index of the chunk's blocks.
+    """
+    (filepath, start_pos, end_pos, tz_ranges, start_dt, end_dt, return_type, default_tz, incremental,
+     event_filter) = args
 
-            # Collect VTIMEZONE blocks
-            if line == "BEGIN:VTIMEZONE":
-                tz_collect = True
-                tz_lines = [line]
-                continue
-            if tz_collect:
-                tz_lines.append(line)
-                if line == "END:VTIMEZONE":
-                    vtimezones.append("\r\n".join(tz_lines))
-                    tz_collect = False
-                continue
+    def _lines(view):
+        # timezone definitions first (unless they're already part of this chunk), then the chunk itself
+        for tz_start, tz_end in tz_ranges:
+            if not start_pos <= tz_start < end_pos:
+                yield from _iter_lines(view, tz_start, tz_end)
+        yield from _iter_lines(view, start_pos, end_pos)
 
-            # Detect VEVENT blocks
-            if line == "BEGIN:VEVENT":
-                inside_event = True
-                occurring_in_range = False
-                reoccurring_in_range = False
-                ev_lines = [line]
-                continue
+    started = timer.thread_time()
+    stats = _init_stats(None)
+    series = {}
+    seen = empty_index() if incremental else None
+    with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            results = list(_scan_blocks(_lines(view), start_dt, end_dt, return_type, default_tz, stats, [], series,
+                                        seen=seen, event_filter=event_filter))
+    stats["cpu_seconds"] += timer.thread_time() - started
+    return results, list(series.values()), stats, seen
 
-            if line.startswith("DTSTART"):
-                if start_year in line or end_year in line:
-                    occurring_in_range = True
-
-            if line.startswith("RRULE:"):
-                try:
-                    start_util = line.index("UNTIL=")
-                    until_value = line[start_util + len("UNTIL="):].split(";")[0]
-                    end_date = parse(until_value)
-                    if end_date.date() < datetime.now(ZoneInfo(default_tz)).date():
-                        reoccurring_in_range = False
-                    else:
-                        reoccurring_in_range = True
-                except ValueError:
-                    reoccurring_in_range = True
 
-            if inside_event:
-                ev_lines.append(line)
-                if line == "END:VEVENT":
-                    inside_event = False
+def _process_series(args):
+    """Worker function to expand a batch of recurring series."""
+    (series, tz_blocks, start_dt, end_dt, return_type, default_tz, recurrence_spill_dir, incremental,
+     event_filter) = args
+    RECURRENCE_CACHE.spill_dir = recurrence_spill_dir
 
-                    if not occurring_in_range and not reoccurring_in_range:
-                        continue
+    started = timer.thread_time()
+    stats = _init_stats(None)
+    seen = empty_index() if incremental else None
+    vtimezones = [_build_component(list(_unfold_lines(block))) for block in tz_blocks]
+    results = list(_expand_series(series, vtimezones, start_dt, end_dt, return_type, default_tz, stats, seen=seen,
+                                  event_filter=event_filter))
+    stats["cpu_seconds"] += timer.thread_time() - started
+    return results, stats, seen
 
-                    mini_cal_bytes = _event_block_to_calendar_bytes("\r\n".join(ev_lines), vtimezones)
-                    cal = Calendar.from_ical(mini_cal_bytes)
 
-                    if reoccurring_in_range:
-                        events = recurring_ical_events.of(cal).between(start_dt, end_dt)
-                    else:
-                        events = cal.walk()
+def _read_ranges(filepath, ranges):
+    """Return the text lines of each byte range of the file."""
+    with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            return [list(_iter_lines(view, range_start, range_end)) for range_start, range_end in ranges]
+
+
+def _normalize_range(start, end, default_tz):
+    if start is None:
+        start = datetime.now(ZoneInfo(default_tz)).replace(hour=0, minute=0, second=0, microsecond=0)
+    elif not isinstance(start, datetime):
+        start = datetime.combine(start, time.min, tzinfo=ZoneInfo(default_tz))
+    elif start.tzinfo is None:
+        start = start.replace(tzinfo=ZoneInfo(default_tz))
+
+    if end is None:
+        end = start + timedelta(days=30)
+    elif not isinstance(end, datetime):
+        end = datetime.combine(end, time.max, tzinfo=ZoneInfo(default_tz))
+    elif end.tzinfo is None:
+        end = end.replace(tzinfo=ZoneInfo(default_tz))
+    return start, end
+
+
+def _cache_variant(start, end, return_type, default_tz, event_filter=None):
+    """The parse configuration a FeedCache entry was produced with."""
+    variant = f"{start.isoformat()}|{end.isoformat()}|{return_type}|{default_tz}"
+    return f"{variant}|{event_filter.key}" if event_filter is not None else variant
+
+
+def _index_variant(return_type, default_tz, event_filter=None):
+    """The parse configuration a FeedIndex was produced with."""
+    variant = f"{return_type}|{default_tz}"
+    return f"{variant}|{event_filter.key}" if event_filter is not None else variant
 
-                    ev = next((c for c in events if c.name == "VEVENT"), None)
-                    if ev is None:
-                        continue
 
-                    dtstart_prop = ev.get("DTSTART")
-                    if not dtstart_prop:
-                        continue
-                    dtstart = _to_dt(dtstart_prop)
-                    in_range = (start_dt <= dtstart <= end_dt)
+def load_cached_events(cache, cache_key, digest, start=None, end=None, return_type="dict", default_tz="UTC",
+                       event_filter=None):
+    """
+    Return the events cached for the feed content with digest, as load_ics_in_date_range
+    would for the same parameters, or None on a miss. For feeds whose copy is gone.
+    """
+    start, end = _normalize_range(start, end, default_tz)
+    cached = cache.get(cache_key, digest, _cache_variant(start, end, return_type, default_tz, event_filter))
+    if cached is not None:
+        logging.info(f"Feed unchanged, returning {len(cached)} cached events for {cache_key}")
+    return cached
+
 
-                    if in_range:
-                        if return_type == "event":
-                            results.append(ev)
-                        else:
-                            results.append(_event_to_dict(ev))
+def has_feed_index(index, feed_key, return_type="dict", default_tz="UTC", event_filter=None):
+    """Returns whether index holds a previous parse of the feed, so a parse of it would be incremental."""
+    return index is not None and index.exists(feed_key, _index_variant(return_type, default_tz, event_filter))
 
-    return results
+
+def _iter_chunk_lines(chunks, sha, stats):
+    """Yield the text lines of a stream of byte chunks, updating sha and the "bytes" stat with every byte seen."""
+    pending = b""
+    for chunk in chunks:
+        sha.update(chunk)
+        stats["bytes"] += len(chunk)
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield str(line, "utf-8", "replace") + "\n"
+    if pending:
+        yield str(pending, "utf-8", "replace")
 
 
 def load_ics_in_date_range(
     path,
     start=None,
     end=None,
-    return_type="dict",          # "dict" or "event"
+    return_type="dict",          # "dict", "event" or "record"
     default_tz="UTC",
-    parallel=True,              # Enable parallel processing
-    num_workers=4,              # Number of worker processes
+    parallel="auto",            # True, False or "auto" to let PARSE_POLICY decide
+    num_workers=4,              # Number of worker processes (at most, when "auto")
+    num_chunks=None,            # Chunks to split the file into, defaults to CHUNKS_PER_WORKER per worker
+    cache=None,                 # Optional FeedCache for parsed results
+    cache_key=None,             # Feed identity for the cache, e.g. its URL
+    executor=None,              # Optional long-lived executor for the parallel path
+    recurrence_spill_dir=None,  # Optional directory for spilling expanded series to disk
+    index=None,                 # Optional FeedIndex, enables incremental parsing
+    memory_budget=None,         # Optional RSS budget in bytes, enables the bounded-memory mode
+    trace_allocations=False,    # Also trace Python allocations with tracemalloc
+    event_filter=None,          # Optional EventFilter, applied to the raw lines before parsing
 ):
     """
     Stream a large .ics and yield only events whose DTSTART falls in [start, end].
@@ -209,191 +761,271 @@ def load_ics_in_date_range(
         Range start (inclusive). Defaults to today at 00:00 in default_tz.
     end : datetime or date
         Range end (inclusive). Defaults to start + 30 days.
-    return_type : "dict" | "event"
-        "dict" yields lightweight dicts; "event" yields icalendar.Event objects.
+    return_type : "dict" | "event" | "record"
+        "dict" yields lightweight dicts; "event" yields icalendar.Event objects;
+        "record" yields compact EventRecords, the cheapest to send back from workers.
     default_tz : str
         Fallback tz if a datetime is naive and no TZID is provided.
-    parallel : bool
-        Enable parallel processing across multiple CPU cores.
+    parallel : bool or "auto"
+        Enable parallel processing across multiple CPU cores. "auto" lets PARSE_POLICY
+        choose from the file size, CPU count, available memory and measured parse rate.
     num_workers : int
-        Number of worker processes to use for parallel processing.
+        Number of worker processes to use for parallel processing, the upper bound when "auto".
+    num_chunks : int, optional
+        Number of chunks the file is split into for parallel processing.
+    cache : FeedCache, optional
+        When given, parsed results are stored keyed on cache_key plus the file's
+        content digest, and returned straight from the cache while the file is unchanged.
+    cache_key : str, optional
+        Identity of the feed in the cache (typically its URL). Defaults to path.
+    executor : concurrent.futures.Executor, optional
+        Process pool to run the parallel chunks on. When omitted a pool is created
+        and torn down for this call.
+    recurrence_spill_dir : str, optional
+        Directory that expanded recurring series evicted from the in-memory
+        RECURRENCE_CACHE are spilled to, and reloaded from on later refreshes.
+    index : FeedIndex, optional
+        Enables incremental parsing. Each raw VEVENT block is hashed and compared with
+        the feed's index from the previous run; only added or changed blocks are
+        parsed and expanded, the stored results are reused for the rest. Once a feed
+        has an index, PARSE_POLICY only parses it in parallel, which reparses every
+        block, when too many of its events are expected to have changed.
+    memory_budget : int, optional
+        RSS budget in bytes, for devices with little memory. Parallelism backs off to
+        the workers that fit the budget, cached series expansions are released while
+        it is exceeded, and results are only streamed through, not collected for the
+        cache. The peak memory of the parse is logged.
+    trace_allocations : bool
+        Also trace Python allocations with tracemalloc and log their peak.
+    event_filter : EventFilter, optional
+        Include / exclude filter evaluated on the raw SUMMARY, CATEGORIES, TRANSP and
+        STATUS values of each VEVENT, so dropped events are never parsed or expanded.
+    """
+    start, end = _normalize_range(start, end, default_tz)
+    cache_key = cache_key or path
+
+    # ---- parsed-feed cache --------------------------------------------------
+    if cache is not None:
+        digest = file_digest(path)
+        variant = _cache_variant(start, end, return_type, default_tz, event_filter)
+        cached = cache.get(cache_key, digest, variant)
+        if cached is not None:
+            logging.info(f"Feed unchanged, returning {len(cached)} cached events for {cache_key}")
+            yield from cached
+            return
+
+    monitor = _memory_monitor(memory_budget, trace_allocations)
+    events = _load_events(path, start, end, return_type, default_tz, parallel, num_workers, num_chunks, executor,
+                          recurrence_spill_dir, index, cache_key, monitor, event_filter)
+    if monitor is not None:
+        events = _monitored(events, monitor, cache_key)
+
+    if cache is None or memory_budget is not None:
+        yield from events
+        return
+
+    collected = []
+    for event in events:
+        collected.append(event)
+        yield event
+    cache.put(cache_key, digest, variant, collected)
+
+
+def load_ics_stream(
+    chunks,
+    start=None,
+    end=None,
+    return_type="dict",          # "dict", "event" or "record"
+    default_tz="UTC",
+    cache=None,                 # Optional FeedCache for parsed results
+    cache_key=None,             # Feed identity for the cache and index, e.g. its URL
+    recurrence_spill_dir=None,  # Optional directory for spilling expanded series to disk
+    index=None,                 # Optional FeedIndex, enables incremental parsing
+    memory_budget=None,         # Optional RSS budget in bytes, enables the bounded-memory mode
+    trace_allocations=False,    # Also trace Python allocations with tracemalloc
+    event_filter=None,          # Optional EventFilter, applied to the raw lines before parsing
+):
     """
-    # ---- helpers ------------------------------------------------------------
-    def _to_dt(dtlike):
-        # Convert icalendar vDDDTypes .dt -> aware datetime
-        if hasattr(dtlike, "dt"):
-            dtlike = dtlike.dt
-        if isinstance(dtlike, datetime):
-            if dtlike.tzinfo is None:
-                return dtlike.replace(tzinfo=ZoneInfo(default_tz))
-            return dtlike
+    Parse an .ics feed from an iterable of byte chunks, such as an HTTP response body,
+    while the chunks arrive, yielding only events whose DTSTART falls in [start, end].
+
+    Events are scanned sequentially as soon as each line is complete, so parsing
+    overlaps the download. Parameters are as for load_ics_in_date_range. When cache is
+    given the results are stored under the digest of the streamed bytes, so a later
+    load_ics_in_date_range of the same content is answered from the cache.
+    """
+    start, end = _normalize_range(start, end, default_tz)
+    cache_key = cache_key or "<stream>"
+    RECURRENCE_CACHE.spill_dir = recurrence_spill_dir
+    stats = _init_stats(None)
+
+    previous = seen = None
+    if index is not None:
+        previous = index.load(cache_key, _index_variant(return_type, default_tz, event_filter))
+        seen = empty_index()
+
+    sha = hashlib.sha256()
+    monitor = _memory_monitor(memory_budget, trace_allocations)
+    collect = cache is not None and memory_budget is None
+    events = []
+    started = timer.thread_time()
+    scanned = _scan_events(_iter_chunk_lines(chunks, sha, stats), start, end, return_type, default_tz, stats,
+                           previous, seen, monitor, event_filter)
+    if monitor is not None:
+        scanned = _monitored(scanned, monitor, cache_key)
+    for event in scanned:
+        if collect:
+            events.append(event)
+        yield event
+    stats["cpu_seconds"] += timer.thread_time() - started
+
+    _log_stats(cache_key, stats)
+    if index is not None:
+        _log_index_changes(cache_key, previous, seen)
+        index.save(cache_key, _index_variant(return_type, default_tz, event_filter), seen)
+    if collect:
+        cache.put(cache_key, sha.hexdigest(), _cache_variant(start, end, return_type, default_tz, event_filter), events)
+
+
+def _memory_monitor(memory_budget, trace_allocations):
+    if memory_budget is None and not trace_allocations:
+        return None
+    return MemoryMonitor(memory_budget, trace_allocations=trace_allocations)
+
+
+def _monitored(events, monitor, name):
+    """Pass events through while monitor tracks the memory used to produce them."""
+    with monitor:
+        yield from events
+    monitor.log(name)
+
+
+def _add_stats(stats, other):
+    for counter, value in other.items():
+        stats[counter] = stats.get(counter, 0) + value
+
+
+def _add_index(index, other):
+    index["blocks"].update(other["blocks"])
+    index["series"].update(other["series"])
+
+
+def _log_stats(source, stats):
+    logging.info(f"Prefilter stats for {source} | parsed: {stats.get('parsed', 0)} | skipped: {stats.get('skipped', 0)} "
+                 f"| filtered: {stats.get('filtered', 0)} | reused: {stats.get('reused', 0)} | series expanded: {stats.get('expanded', 0)} "
+                 f"| series from cache: {stats.get('expansions_cached', 0)}")
+    # only full parses say something about the parse rate of a feed
+    if not stats.get("reused") and not stats.get("expansions_cached"):
+        PARSE_POLICY.record(stats.get("bytes", 0), stats.get("cpu_seconds", 0))
+
+
+def _log_index_changes(feed_key, previous, seen):
+    """
+    Log how many blocks were reused, added, changed and removed since the previous index,
+    and record the share that changed for PARSE_POLICY.
+    """
+    previous_blocks, seen_blocks = previous["blocks"], seen["blocks"]
+    previous_uids = {uid for uid, _ in previous_blocks.values()}
+    reused = added = changed = 0
+    for digest, (uid, _) in seen_blocks.items():
+        if digest in previous_blocks:
+            reused += 1
+        elif uid is not None and uid in previous_uids:
+            changed += 1
         else:
-            # all-day DATE -> make it start-of-day in default_tz
-            return datetime.combine(dtlike, time.min, tzinfo=ZoneInfo(default_tz))
-
-    def _normalize_range(start, end):
-        if start is None:
-            start = datetime.now(ZoneInfo(default_tz)).replace(hour=0, minute=0, second=0, microsecond=0)
-        elif not isinstance(start, datetime):
-            start = datetime.combine(start, time.min, tzinfo=ZoneInfo(default_tz))
-        elif start.tzinfo is None:
-            start = start.replace(tzinfo=ZoneInfo(default_tz))
-
-        if end is None:
-            end = start + timedelta(days=30)
-        elif not isinstance(end, datetime):
-            end = datetime.combine(end, time.max, tzinfo=ZoneInfo(default_tz))
-        elif end.tzinfo is None:
-            end = end.replace(tzinfo=ZoneInfo(default_tz))
-        return start, end
-
-    def _event_block_to_calendar_bytes(event_block, vtimezones):
-        # Build a tiny VCALENDAR containing the collected VTIMEZONEs + this VEVENT
-        parts = ["BEGIN:VCALENDAR", "VERSION:2.0"]
-        parts.extend(vtimezones)               # already BEGIN/END VTIMEZONE blocks
-        parts.append(event_block)              # the full BEGIN:VEVENT...END:VEVENT
-        parts.append("END:VCALENDAR")
-        # Normalize line endings for safety
-        cal_text = "\r\n".join(
-            line if line.endswith(("\r", "\n")) else line
-            for chunk in parts
-            for line in chunk.splitlines()
-        ) + "\r\n"
-        return cal_text.encode("utf-8")
-
-    def _event_to_dict(ev):
-        def _get(prop):
-            v = ev.get(prop)
-            return getattr(v, "to_ical", lambda: v)() if v is not None else None
-
-        dtstart = ev.get("DTSTART").dt if ev.get("DTSTART") else None
-        dtend = ev.get("DTEND").dt if ev.get("DTEND") else None
-        return {
-            "uid": (ev.get("UID") and ev.get("UID").to_ical().decode()) if ev.get("UID") else None,
-            "summary": (ev.get("SUMMARY") and ev.get("SUMMARY").to_ical().decode()) if ev.get("SUMMARY") else None,
-            "location": (ev.get("LOCATION") and ev.get("LOCATION").to_ical().decode()) if ev.get("LOCATION") else None,
-            "description": (ev.get("DESCRIPTION") and ev.get("DESCRIPTION").to_ical().decode()) if ev.get("DESCRIPTION") else None,
-            "dtstart": _to_dt(dtstart) if dtstart else None,
-            "dtend": _to_dt(dtend) if dtend else None,
-            "all_day": (not isinstance(dtstart, datetime)) if dtstart is not None else False,
-        }
-
-    start, end = _normalize_range(start, end)
+            added += 1
+    removed = sum(1 for digest in previous_blocks if digest not in seen_blocks)
+    logging.info(f"Incremental parse of {feed_key} | reused: {reused} | added: {added} | changed: {changed} | removed: {removed}")
+    if previous_blocks:
+        PARSE_POLICY.record_changes(feed_key, added + changed, reused)
+
 
+def _load_events(path, start, end, return_type, default_tz, parallel, num_workers, num_chunks, executor,
+                 recurrence_spill_dir, index=None, feed_key=None, monitor=None, event_filter=None):
+    """Parse the .ics at path, sequentially or in parallel chunks."""
     logging.info(f"Processing events in {path} for date range {start} to {end}")
+    RECURRENCE_CACHE.spill_dir = recurrence_spill_dir
+    stats = _init_stats(None)
+    stats["bytes"] = os.path.getsize(path)
+
+    previous = seen = None
+    incremental = index is not None
+    if incremental:
+        previous = index.load(feed_key, _index_variant(return_type, default_tz, event_filter))
+        seen = empty_index()
+
+    if parallel == "auto":
+        plan = PARSE_POLICY.choose(stats["bytes"], num_workers, pool_warm=executor is not None, name=feed_key or path,
+                                   memory_budget=monitor.budget_bytes if monitor is not None else None,
+                                   indexed=bool(previous and previous["blocks"]))
+        parallel, num_workers, num_chunks = plan.parallel, plan.num_workers, plan.num_chunks
 
+    started = timer.thread_time()
     if parallel and num_workers > 1:
         # Use parallel processing
         logging.info(f"Using parallel processing with {num_workers} workers")
 
         # Split file into chunks
-        chunks = _chunk_file_by_events(path, num_workers)
+        chunks, tz_ranges = _chunk_file_by_events(path, num_chunks or num_workers * CHUNKS_PER_WORKER)
         if not chunks:
             return
 
         # Prepare arguments for worker processes
         worker_args = [
-            (path, start_pos, end_pos, start, end, return_type, default_tz)
+            (path, start_pos, end_pos, tz_ranges, start, end, return_type, default_tz, incremental, event_filter)
             for start_pos, end_pos in chunks
         ]
 
-        # Process chunks in parallel
-        with ProcessPoolExecutor(max_workers=num_workers) as executor:
-            chunk_results = executor.map(_process_chunk, worker_args)
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=num_workers)
+        try:
+            # Yield standalone events chunk by chunk, in file order, as each one arrives,
+            # and group the series blocks of all chunks by UID
+            series = {}
+            for chunk_result, chunk_series, chunk_stats, chunk_seen in executor.map(_process_chunk, worker_args):
+                _add_stats(stats, chunk_stats)
+                if incremental:
+                    _add_index(seen, chunk_seen)
+                for group in chunk_series:
+                    if group.uid in series:
+                        series[group.uid].merge(group)
+                    else:
+                        series[group.uid] = group
+                for event in chunk_result:
+                    yield event
 
-        # Yield results from all chunks
-        for chunk_result in chunk_results:
-            for event in chunk_result:
-                yield event
+            # Then expand every relevant series once, spread over the workers
+            relevant = [group for group in series.values() if group.relevant]
+            stats["skipped"] += sum(len(group.blocks) for group in series.values() if not group.relevant)
+            if relevant:
+                tz_blocks = _read_ranges(path, tz_ranges)
+                # contiguous batches keep the series in the same order as the sequential path
+                batch_size = -(-len(relevant) // num_workers)
+                series_args = [
+                    (relevant[i:i + batch_size], tz_blocks, start, end, return_type, default_tz, recurrence_spill_dir,
+                     incremental, event_filter)
+                    for i in range(0, len(relevant), batch_size)
+                ]
+                for series_result, series_stats, series_seen in executor.map(_process_series, series_args):
+                    _add_stats(stats, series_stats)
+                    if incremental:
+                        _add_index(seen, series_seen)
+                    for event in series_result:
+                        yield event
+        finally:
+            if own_executor:
+                executor.shutdown()
 
     else:
-        # Use original sequential processing
-        vtimezones = []            # collect any VTIMEZONE blocks for TZID resolution
-        tz_collect = False
-        tz_lines = []
-
-        inside_event = False
-        occurring_in_range = False
-        reoccurring_in_range = False
-        start_year = str(start.year)
-        end_year = str(end.year)
-        ev_lines = []
-
+        # Sequential processing: a single streaming pass over the file
         with open(path, "r", encoding="utf-8", errors="replace") as f:
-            for raw in f:
-                line = raw.rstrip("\r\n")
-
-                # Collect VTIMEZONE blocks (once; cheap)
-                if line == "BEGIN:VTIMEZONE":
-                    tz_collect = True
-                    tz_lines = [line]
-                    continue
-                if tz_collect:
-                    tz_lines.append(line)
-                    if line == "END:VTIMEZONE":
-                        # keep the whole block as a single text chunk
-                        vtimezones.append("\r\n".join(tz_lines))
-                        tz_collect = False
-                    continue  # don't let timezone lines fall through
-
-                # Detect VEVENT blocks
-                if line == "BEGIN:VEVENT":
-                    inside_event = True
-                    occurring_in_range = False
-                    reoccurring_in_range = False
-                    ev_lines = [line]
-                    continue
-
-                # include events plausibly in our date range
-                if line.startswith("DTSTART"):
-                    if start_year in line or end_year in line:
-                        occurring_in_range = True
-
-                # Include events with reoccurrences in our date range
-                if line.startswith("RRULE:"):
-                    try:
-                        start_util = line.index("UNTIL=")
-                        until_value = line[start_util + len("UNTIL="):].split(";")[0]
-                        end_date = parse(until_value)
-                        if end_date.date() < datetime.now(ZoneInfo(default_tz)).date():
-                            reoccurring_in_range = False
-                        else:
-                            reoccurring_in_range = True
-                    except ValueError:
-                        reoccurring_in_range = True
-
-                if inside_event:
-                    ev_lines.append(line)
-                    if line == "END:VEVENT":
-                        inside_event = False
-
-                        # To save processing time on a slow Pi Zero with a large calendar,
-                        # don't process entries that aren't even from the correct year
-                        if not occurring_in_range and not reoccurring_in_range:
-                            continue
-
-                        # We have a complete VEVENT block -> make a tiny calendar and parse just this one
-                        mini_cal_bytes = _event_block_to_calendar_bytes("\r\n".join(ev_lines), vtimezones)
-                        cal = Calendar.from_ical(mini_cal_bytes)
-
-                        if reoccurring_in_range:
-                            events = recurring_ical_events.of(cal).between(start, end)
-                        else:
-                            events = cal.walk()
-                        # There should be exactly one event component in this tiny calendar
-                        ev = next((c for c in events if c.name == "VEVENT"), None)
-                        if ev is None:
-                            continue
-
-                        # Filter by DTSTART (and optionally recurrences note below)
-                        dtstart_prop = ev.get("DTSTART")
-                        if not dtstart_prop:
-                            continue
-                        dtstart = _to_dt(dtstart_prop)
-                        in_range = (start <= dtstart <= end)
-
-                        if in_range:
-                            if return_type == "event":
-                                yield ev
-                            else:
-                                yield _event_to_dict(ev)
+            yield from _scan_events(f, start, end, return_type, default_tz, stats, previous, seen, monitor,
+                                    event_filter)
+        stats["cpu_seconds"] += timer.thread_time() - started
+
+    _log_stats(path, stats)
+
+    if incremental:
+        _log_index_changes(feed_key, previous, seen)
+        index.save(feed_key, _index_variant(return_type, default_tz, event_filter), seen)
@@ -0,0 +1,105 @@
+import os
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+from PIL import Image, ImageDraw
+from utils.app_utils import get_fonts
+
+
+def _css_color(color):
+    if isinstance(color, tuple):
+        return f"rgb({color[0]},{color[1]},{color[2]})"
+    return str(color)
+
+
+class SvgCanvas:
+    """Records ImageDraw calls as SVG shapes, so a layout drawn with PIL can be painted by the browser.
+
+    Implements the ImageDraw methods the native calendar renderer uses, with the same
+    coordinates (inclusive pixel boxes) and text anchors. Text is measured with the
+    same PIL fonts, so it is truncated and positioned exactly as in the PIL image;
+    the page declares those fonts with @font-face for the browser to draw them.
+
+    Attributes:
+        dimensions (tuple): (width, height) of the drawing.
+        shapes (list): SVG elements recorded so far.
+    """
+
+    def __init__(self, dimensions):
+        self.dimensions = (int(dimensions[0]), int(dimensions[1]))
+        self.shapes = []
+        # text measurement only, nothing is drawn on it
+        self.measure = ImageDraw.Draw(Image.new("1", (1, 1)))
+        self.font_faces = {os.path.realpath(font["url"]): font for font in get_fonts()}
+
+    def textlength(self, text, font=None):
+        return self.measure.textlength(text, font=font)
+
+    def _font_attributes(self, font):
+        face = self.font_faces.get(os.path.realpath(font.path), {})
+        family = face.get("font_family", font.getname()[0])
+        return (f'font-family={quoteattr(family)} font-size="{font.size}" '
+                f'font-weight="{face.get("font_weight", "normal")}"')
+
+    def text(self, xy, text, fill=None, font=None, anchor="la"):
+        x, y = xy
+        width = self.textlength(text, font=font)
+        ascent, descent = font.getmetrics()
+        horizontal, vertical = anchor[0], anchor[1]
+        if horizontal == "m":
+            x -= width / 2
+        elif horizontal == "r":
+            x -= width
+        # PIL anchors are relative to the ascender line, SVG positions text on its baseline
+        if vertical == "m":
+            baseline = y + (ascent - descent) / 2
+        elif vertical == "s":
+            baseline = y
+        else:
+            baseline = y + ascent
+        self.shapes.append(f'<text x="{x:.1f}" y="{baseline:.1f}" {self._font_attributes(font)} '
+                           f'fill="{_css_color(fill)}">{escape(text)}</text>')
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = xy
+        self._rect(x0, y0, x1, y1, fill, outline, width)
+
+    def rounded_rectangle(self, xy, radius=0, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = xy
+        self._rect(x0, y0, x1, y1, fill, outline, width, radius)
+
+    def _rect(self, x0, y0, x1, y1, fill, outline, width, radius=0):
+        # PIL boxes include their last pixel and draw outlines inwards, SVG strokes straddle the edge
+        if fill is not None:
+            self.shapes.append(f'<rect x="{x0:.1f}" y="{y0:.1f}" width="{x1 - x0 + 1:.1f}" '
+                               f'height="{y1 - y0 + 1:.1f}" rx="{radius}" fill="{_css_color(fill)}"/>')
+        if outline is not None:
+            inset = width / 2
+            self.shapes.append(f'<rect x="{x0 + inset:.1f}" y="{y0 + inset:.1f}" '
+                               f'width="{x1 - x0 + 1 - width:.1f}" height="{y1 - y0 + 1 - width:.1f}" rx="{radius}" '
+                               f'fill="none" stroke="{_css_color(outline)}" stroke-width="{width}"/>')
+
+    def line(self, xy, fill=None, width=1):
+        x0, y0, x1, y1 = xy
+        self.shapes.append(f'<line x1="{x0:.1f}" y1="{y0 + 0.5:.1f}" x2="{x1:.1f}" y2="{y1 + 0.5:.1f}" '
+                           f'stroke="{_css_color(fill)}" stroke-width="{width}"/>')
+
+    def ellipse(self, xy, fill=None):
+        x0, y0, x1, y1 = xy
+        self.shapes.append(f'<ellipse cx="{(x0 + x1 + 1) / 2:.1f}" cy="{(y0 + y1 + 1) / 2:.1f}" '
+                           f'rx="{(x1 - x0 + 1) / 2:.1f}" ry="{(y1 - y0 + 1) / 2:.1f}" fill="{_css_color(fill)}"/>')
+
+    def polygon(self, xy, fill=None):
+        points = " ".join(f"{x:.1f},{y:.1f}" for x, y in xy)
+        self.shapes.append(f'<polygon points="{points}" fill="{_css_color(fill)}"/>')
+
+    def image(self, path):
+        """Covers the canvas with the image at path, cropped to fill it like resize_image."""
+        width, height = self.dimensions
+        self.shapes.append(f'<image href={quoteattr(Path(path).resolve().as_uri())} width="{width}" '
+                           f'height="{height}" preserveAspectRatio="xMidYMid slice"/>')
+
+    def to_svg(self):
+        width, height = self.dimensions
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+                f'viewBox="0 0 {width} {height}" shape-rendering="crispEdges">'
+                + "".join(self.shapes) + "</svg>")
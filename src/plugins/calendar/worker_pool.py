@@ -0,0 +1,69 @@
+import os
+import logging
+import threading
+import psutil
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Rough peak memory of one ICS worker process parsing its chunk of a large feed
+WORKER_MEMORY_BYTES = 96 * 1024 * 1024
+MAX_WORKERS = 4
+
+
+def _warm_up():
+    """Worker initializer: import the parsing stack once, before any chunk is handed over."""
+    import icalendar
+    import recurring_ical_events
+    import dateutil.parser
+    import plugins.calendar.stream_ical
+
+
+def default_pool_size():
+    """Size the pool from the CPU count and the memory currently available."""
+    cpus = os.cpu_count() or 1
+    available = psutil.virtual_memory().available
+    by_memory = max(1, available // WORKER_MEMORY_BYTES)
+    return int(max(1, min(cpus, by_memory, MAX_WORKERS)))
+
+
+class ICSWorkerPool:
+    """Long-lived pool of warm worker processes for parsing .ics chunks.
+
+    The process pool is started lazily on first use and reused across refreshes and
+    feeds, so workers only pay for interpreter start-up and imports once. A refresh
+    that didn't use it stops it (`shutdown_if_unused`).
+
+    Attributes:
+        max_workers (int): Number of worker processes in the pool.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or default_pool_size()
+        self.executor = None
+        self.used = False
+        self.lock = threading.Lock()
+
+    def get_executor(self):
+        """Returns the running executor, starting the worker processes if needed."""
+        with self.lock:
+            if self.executor is None:
+                logger.info(f"Starting ICS worker pool with {self.max_workers} workers")
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_up)
+            self.used = True
+            return self.executor
+
+    def shutdown_if_unused(self):
+        """Stops the worker processes when nothing was parsed on them since the previous call."""
+        with self.lock:
+            used, self.used = self.used, False
+        if not used:
+            self.shutdown(wait=False)
+
+    def shutdown(self, wait=True):
+        """Stops the worker processes. The pool is started again on next use."""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            logger.info("Shutting down ICS worker pool")
+            executor.shutdown(wait=wait, cancel_futures=True)
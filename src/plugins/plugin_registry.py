@@ -49,4 +49,12 @@ def get_plugin_instance(plugin_config):
         # Initialize the plugin with its configuration
         return plugin_class
     else:
-        raise ValueError(f"Plugin '{plugin_id}' is not registered.")
\ No newline at end of file
+        raise ValueError(f"Plugin '{plugin_id}' is not registered.")
+
+def cleanup_plugins():
+    """Releases the long-lived resources held by every loaded plugin."""
+    for plugin_id, plugin in PLUGIN_CLASSES.items():
+        try:
+            plugin.cleanup()
+        except Exception as e:
+            logging.error(f"Failed to clean up plugin '{plugin_id}': {e}")
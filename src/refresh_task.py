@@ -5,8 +5,9 @@ import logging
 import psutil
 import pytz
 from datetime import datetime, timezone
-from plugins.plugin_registry import get_plugin_instance
+from plugins.plugin_registry import get_plugin_instance, cleanup_plugins
 from utils.image_utils import compute_image_hash
+from utils.render_service import configure_render_service, idle_seconds_for_interval
 from model import RefreshInfo, PlaylistManager
 from PIL import Image
 
@@ -45,6 +46,7 @@ class RefreshTask:
         if self.thread:
             logger.info("Stopping refresh task")
             self.thread.join()
+        cleanup_plugins()
 
     def _run(self):
         """Background task that manages the periodic refresh of the display.
@@ -75,6 +77,9 @@ class RefreshTask:
             try:
                 with self.condition:
                     sleep_time = self.device_config.get_config("plugin_cycle_interval_seconds", default=60*60)
+                    # keep the browser running from one refresh to the next, unless the device sets its own timeout
+                    configure_render_service(self.device_config.get_config(
+                        "render_service_idle_seconds", default=idle_seconds_for_interval(sleep_time)))
 
                     # Skip wait on first run to check if immediate refresh is needed
                     if first_run:
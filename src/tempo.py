@@ -28,6 +28,7 @@ from blueprints.plugin import plugin_bp
 from blueprints.playlist import playlist_bp
 from jinja2 import ChoiceLoader, FileSystemLoader
 from plugins.plugin_registry import load_plugins
+from utils.render_service import shutdown_render_service
 from waitress import serve
 
 
@@ -165,4 +166,5 @@ if __name__ == '__main__':
             
         serve(app, host="0.0.0.0", port=PORT, threads=1)
     finally:
-        refresh_task.stop()
\ No newline at end of file
+        refresh_task.stop()
+        shutdown_render_service()
@@ -30,6 +30,19 @@ FONT_FAMILIES = {
     "DS-Digital": [{
         "font-weight": "normal",
         "file": os.path.join("DS-DIGI", "DS-DIGI.TTF")
+    }],
+    # fetched by plugins.calendar.assets, only registered with get_fonts once present
+    "Jersey 15": [{
+        "font-weight": "normal",
+        "file": os.path.join("Jersey", "Jersey15-Regular.ttf")
+    }],
+    "Jersey 20": [{
+        "font-weight": "normal",
+        "file": os.path.join("Jersey", "Jersey20-Regular.ttf")
+    }],
+    "Jersey 25": [{
+        "font-weight": "normal",
+        "file": os.path.join("Jersey", "Jersey25-Regular.ttf")
     }]
 }
 
@@ -81,6 +94,10 @@ def get_font(font_name, font_size=50, font_weight="normal"):
 
         if font_entry:
             font_path = resolve_path(os.path.join("static", "fonts", font_entry["file"]))
+            if not os.path.isfile(font_path):
+                # fonts fetched at install time (e.g. the calendar's Jersey fonts) may not be there yet
+                logger.warning(f"Font file missing: font_name={font_name}, path={font_path}")
+                return None
             return ImageFont.truetype(font_path, font_size)
         else:
             logger.warn(f"Requested font weight not found: font_name={font_name}, font_weight={font_weight}")
@@ -90,12 +107,16 @@ def get_font(font_name, font_size=50, font_weight="normal"):
     return None
 
 def get_fonts():
+    """Returns the @font-face entries of the font files present, so missing ones fall back to other sources."""
     fonts_list = []
     for font_family, variants in FONT_FAMILIES.items():
         for variant in variants:
+            font_path = resolve_path(os.path.join("static", "fonts", variant["file"]))
+            if not os.path.isfile(font_path):
+                continue
             fonts_list.append({
                 "font_family": font_family,
-                "url": resolve_path(os.path.join("static", "fonts", variant["file"])),
+                "url": font_path,
                 "font_weight": variant.get("font-weight", "normal"),
                 "font_style": variant.get("font-style", "normal"),
             })
@@ -0,0 +1,146 @@
+import re
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeout in seconds used when a caller doesn't pass one
+DEFAULT_TIMEOUT = (10, 30)
+# Maximum number of simultaneous keep-alive connections to a single host
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 4
+# Number of hosts whose connection pools are kept around
+DEFAULT_MAX_HOSTS = 10
+
+# The user:password@ part of a URL, also where a message quotes the URL
+USERINFO_PATTERN = re.compile(r"(?<=://)[^/?#\s@]+@")
+
+_lock = threading.Lock()
+_session = None
+_settings = {
+    "timeout": DEFAULT_TIMEOUT,
+    "max_connections_per_host": DEFAULT_MAX_CONNECTIONS_PER_HOST,
+    "max_hosts": DEFAULT_MAX_HOSTS,
+}
+_stats = {
+    "requests": 0,
+    "connections_opened": 0,
+}
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    """Connection that records every time a new socket is actually opened."""
+
+    def connect(self):
+        _count("connections_opened")
+        return super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    """HTTPS variant of _CountingHTTPConnection."""
+
+    def connect(self):
+        _count("connections_opened")
+        return super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    """Connection pool that records requests and opens counting connections."""
+    ConnectionCls = _CountingHTTPConnection
+
+    def urlopen(self, *args, **kwargs):
+        _count("requests")
+        return super().urlopen(*args, **kwargs)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    """HTTPS variant of _CountingHTTPConnectionPool."""
+    ConnectionCls = _CountingHTTPSConnection
+
+    def urlopen(self, *args, **kwargs):
+        _count("requests")
+        return super().urlopen(*args, **kwargs)
+
+
+def _create_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=_settings["max_hosts"],
+        pool_maxsize=_settings["max_connections_per_host"],
+        pool_block=True,  # wait for a free connection rather than exceeding the per host limit
+    )
+    adapter.poolmanager.pool_classes_by_scheme = {
+        "http": _CountingHTTPConnectionPool,
+        "https": _CountingHTTPSConnectionPool,
+    }
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # requests negotiates gzip/deflate by default, set it explicitly so it is never lost
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+
+def configure(timeout=None, max_connections_per_host=None, max_hosts=None):
+    """Updates the client settings. The shared session is recreated on next use."""
+    global _session
+    with _lock:
+        if timeout is not None:
+            _settings["timeout"] = timeout
+        if max_connections_per_host is not None:
+            _settings["max_connections_per_host"] = max_connections_per_host
+        if max_hosts is not None:
+            _settings["max_hosts"] = max_hosts
+        old_session, _session = _session, None
+    if old_session:
+        old_session.close()
+
+
+def get_session():
+    """Returns the process-wide pooled, keep-alive session."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _create_session()
+        return _session
+
+
+def get(url, timeout=None, **kwargs):
+    """Performs a GET request through the shared session, applying the default timeout."""
+    if timeout is None:
+        timeout = _settings["timeout"]
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+def request(method, url, timeout=None, **kwargs):
+    """Performs a request with any method (e.g. a WebDAV REPORT) through the shared session."""
+    if timeout is None:
+        timeout = _settings["timeout"]
+    return get_session().request(method, url, timeout=timeout, **kwargs)
+
+
+def get_stats():
+    """Returns counters for requests sent and connections opened versus reused."""
+    with _lock:
+        stats = dict(_stats)
+    stats["connections_reused"] = max(0, stats["requests"] - stats["connections_opened"])
+    return stats
+
+
+def redact_url(text):
+    """Strips the credentials (user:password@) from a URL, or from every URL quoted in a message."""
+    return USERINFO_PATTERN.sub("", str(text))
+
+
+class RedactingFormatter(logging.Formatter):
+    """Log formatter that strips credentials from the URLs in every message and traceback."""
+
+    def format(self, record):
+        return redact_url(super().format(record))
@@ -1,10 +1,12 @@
-import requests
+from utils import http_client
+from utils.render_service import CHROMIUM_FLAGS, RENDER_SPOOL_DIR, get_render_service, format_timings
 from PIL import Image, ImageEnhance
 from io import BytesIO
 import os
 import logging
 import hashlib
 import tempfile
+import time
 import subprocess
 import platform
 
@@ -12,7 +14,7 @@ import platform
 logger = logging.getLogger(__name__)
 
 def get_image(image_url):
-    response = requests.get(image_url)
+    response = http_client.get(image_url)
     img = None
     if 200 <= response.status_code < 300 or response.status_code == 304:
         img = Image.open(BytesIO(response.content))
@@ -87,15 +89,21 @@ def compute_image_hash(image):
 def take_screenshot_html(html_str, dimensions, timeout_ms=None):
     image = None
     try:
-        # Create a temporary HTML file
-        with tempfile.NamedTemporaryFile(suffix=".html", delete=False) as html_file:
-            html_file.write(html_str.encode("utf-8"))
-            html_file_path = html_file.name
-
-        image = take_screenshot(html_file_path, dimensions, timeout_ms)
-
-        # Remove html file
-        os.remove(html_file_path)
+        # Render with the long-lived browser, which gets the page from memory
+        image = get_render_service().render_html(html_str, dimensions, timeout_ms)
+        if image is None:
+            # Fall back to a one-shot Chromium, through a temporary HTML file kept in RAM where possible
+            started = time.perf_counter()
+            os.makedirs(RENDER_SPOOL_DIR, exist_ok=True)
+            with tempfile.NamedTemporaryFile(suffix=".html", dir=RENDER_SPOOL_DIR, delete=False) as html_file:
+                html_file.write(html_str.encode("utf-8"))
+                html_file_path = html_file.name
+            timings = {"write": time.perf_counter() - started}
+
+            image = take_screenshot(html_file_path, dimensions, timeout_ms, timings)
+
+            # Remove html file
+            os.remove(html_file_path)
 
     except Exception as e:
         logger.error(f"Failed to take screenshot: {str(e)}")
@@ -105,32 +113,21 @@ def take_screenshot_html(html_str, dimensions, timeout_ms=None):
 def is_raspberry_pi():
     return 'rpi' in platform.uname().release.lower()
 
-def take_screenshot(target, dimensions, timeout_ms=None):
+def take_screenshot(target, dimensions, timeout_ms=None, timings=None):
     image = None
+    timings = {} if timings is None else timings
     try:
-        # Create a temporary output file for the screenshot
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as img_file:
+        # Create a temporary output file for the screenshot, kept in RAM where possible
+        os.makedirs(RENDER_SPOOL_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile(suffix=".png", dir=RENDER_SPOOL_DIR, delete=False) as img_file:
             img_file_path = img_file.name
 
         command = [
             "chromium",
             target,
-            "--headless",
             f"--screenshot={img_file_path}",
             f"--window-size={dimensions[0]},{dimensions[1] + 87}",
-            "--disable-dev-shm-usage",
-            "--disable-gpu",
-            "--use-gl=swiftshader",
-            "--hide-scrollbars",
-            "--in-process-gpu",
-            "--js-flags=--jitless",
-            "--disable-zero-copy",
-            "--disable-gpu-memory-buffer-compositor-resources",
-            "--disable-extensions",
-            "--disable-plugins",
-            "--mute-audio",
-            "--no-sandbox",
-        ]
+        ] + CHROMIUM_FLAGS
 
         if is_raspberry_pi():
             command += [
@@ -143,7 +140,9 @@ def take_screenshot(target, dimensions, timeout_ms=None):
 
         logger.info(f"Running Chromium to capture screenshot with command: {command}")
         # Kill chromium if it runs longer than 10 minutes (600 seconds)
+        started = time.perf_counter()
         result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=600)
+        timings["chromium"] = time.perf_counter() - started
 
         logger.info("Chromium run complete")
 
@@ -153,14 +152,16 @@ def take_screenshot(target, dimensions, timeout_ms=None):
             logger.error(result.stderr.decode('utf-8'))
             return None
 
-        # Load the image using PIL
+        # Load the image using PIL, cropping the window chrome a one-shot headless window adds
+        started = time.perf_counter()
         with Image.open(img_file_path) as img:
-            image = img.copy()
-            width, height = image.size
-            image = image.crop((0, 0, width, height - 87))
+            width, height = img.size
+            image = img.crop((0, 0, width, height - 87))
+        timings["decode"] = time.perf_counter() - started
 
         # Remove image files
         os.remove(img_file_path)
+        logger.info(f"Took screenshot of {target} with a one-shot Chromium | {format_timings(timings)}")
 
     except subprocess.TimeoutExpired:
         logger.error("Chromium process timed out after 10 minutes and was killed")
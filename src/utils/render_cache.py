@@ -0,0 +1,152 @@
+import os
+import re
+import glob
+import hashlib
+import logging
+import tempfile
+import threading
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CACHE_BYTES = 20 * 1024 * 1024
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# href="...", src="..." and url(...) references of a rendered page, local files among them are part of the key
+REFERENCE_PATTERN = re.compile(r"""(?:href|src)\s*=\s*["']([^"']+)["']|url\(\s*["']?([^"')]+?)["']?\s*\)""")
+
+
+class RenderCache:
+    """On-disk cache of rendered plugin images, keyed on everything that goes into a render.
+
+    The key is a digest of the rendered HTML, the image dimensions and the content of
+    every local file the page references (style sheets, fonts, images), so any change
+    to the template inputs or to those files is a miss. Entries are PNG files so they
+    survive service restarts, and the cache directory is kept under `max_bytes` by
+    evicting the least recently used entries.
+
+    Attributes:
+        cache_dir (str): Directory the cached images are written to.
+        max_bytes (int): Upper bound for the total size of all cached images.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to render.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # file digests by path, reused while the file's size and modification time stay the same
+        self.file_digests = {}
+
+    def _file_digest(self, path):
+        stat = os.stat(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+        cached = self.file_digests.get(path)
+        if cached and cached[0] == version:
+            return cached[1]
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                sha.update(block)
+        self.file_digests[path] = (version, sha.hexdigest())
+        return sha.hexdigest()
+
+    def key(self, html, dimensions, files=()):
+        """Returns the cache key of rendering html at dimensions, given the local files it uses."""
+        referenced = set(files)
+        for match in REFERENCE_PATTERN.finditer(html):
+            reference = match.group(1) or match.group(2)
+            if reference.startswith("file://"):
+                reference = reference[len("file://"):]
+            if os.path.isabs(reference) and os.path.isfile(reference):
+                referenced.add(reference)
+
+        sha = hashlib.sha256()
+        sha.update(f"{int(dimensions[0])}x{int(dimensions[1])}\0".encode("utf-8"))
+        sha.update(html.encode("utf-8"))
+        for path in sorted(referenced):
+            try:
+                digest = self._file_digest(path)
+            except OSError:
+                digest = "missing"
+            sha.update(f"\0{path}\0{digest}".encode("utf-8"))
+        return sha.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key[:40]}.png")
+
+    def _record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            hits, lookups = self.hits, self.hits + self.misses
+        logger.info(f"Render cache {'hit' if hit else 'miss'} | hit rate: {hits}/{lookups} ({hits / lookups:.0%})")
+
+    def get(self, key):
+        """Returns the cached image for key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            with Image.open(path) as img:
+                image = img.copy()
+        except FileNotFoundError:
+            self._record(False)
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable render cache entry {path}: {e}")
+            self._remove(path)
+            self._record(False)
+            return None
+
+        # bump the modification time so eviction is least-recently-used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._record(True)
+        return image
+
+    def put(self, key, image):
+        """Stores the rendered image for key."""
+        with self.lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write atomically so a crash never leaves a truncated entry behind
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    image.save(f, format="PNG")
+                os.replace(tmp_path, self._entry_path(key))
+            except Exception:
+                self._remove(tmp_path)
+                raise
+
+            self._evict()
+
+    def _evict(self):
+        """Removes the least recently used entries until the cache fits within max_bytes."""
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.png")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logger.info(f"Evicting render cache entry {path}")
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,457 @@
+import os
+import json
+import time
+import base64
+import atexit
+import shutil
+import signal
+import logging
+import tempfile
+import threading
+from io import BytesIO
+from pathlib import Path
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Chromium flags shared by the render service and the one-shot screenshot fallback
+CHROMIUM_FLAGS = [
+    "--headless",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--use-gl=swiftshader",
+    "--hide-scrollbars",
+    "--in-process-gpu",
+    "--js-flags=--jitless",
+    "--disable-zero-copy",
+    "--disable-gpu-memory-buffer-compositor-resources",
+    "--disable-extensions",
+    "--disable-plugins",
+    "--mute-audio",
+    "--no-sandbox",
+]
+
+# Seconds to wait for a DevTools command, and for a page to signal that it is ready
+COMMAND_TIMEOUT_SECONDS = 30
+READY_TIMEOUT_SECONDS = 60
+# Seconds allowed for the health check sent before every render
+HEALTH_CHECK_TIMEOUT_SECONDS = 5
+# Seconds without a render after which the browser is shut down to free its memory. The refresh task
+# raises it above the plugin cycle interval (see idle_seconds_for_interval), so the browser started by
+# one refresh is still running for the next one
+IDLE_SHUTDOWN_SECONDS = 300
+# Seconds the browser is kept past the cycle interval, covering a refresh that runs late
+IDLE_SHUTDOWN_MARGIN_SECONDS = 120
+# Seconds given to the browser to exit before it is killed
+SHUTDOWN_GRACE_SECONDS = 5
+
+# RAM backed (tmpfs) directory the rendered pages are handed to the browser through, keeps them off the SD card
+RENDER_SPOOL_DIR = (os.path.join("/dev/shm", "tempo", "render") if os.path.isdir("/dev/shm")
+                    else os.path.join(tempfile.gettempdir(), "tempo-render"))
+
+# Installed in every page before its own scripts: records the first script error, or script that failed to
+# load, so the readiness check fails at once instead of waiting for its timeout. Style sheets, fonts and
+# images that fail to load only degrade the page and are left alone
+ERROR_LISTENER = """
+window.addEventListener("error", (event) => {
+    const target = event.target;
+    if (window.renderError || (target instanceof Element && target.tagName !== "SCRIPT")) {
+        return;
+    }
+    window.renderError = event.message || `${target.src} failed to load`;
+}, true);
+window.addEventListener("unhandledrejection", (event) => {
+    window.renderError = window.renderError || `Unhandled rejection: ${event.reason}`;
+});
+"""
+
+# Resolves once the page has loaded, its fonts are ready and it hasn't set window.renderReady = false, and
+# rejects as soon as ERROR_LISTENER recorded an error. Pages that render asynchronously set
+# window.renderReady = false early and true when they are done.
+READY_EXPRESSION = """
+new Promise((resolve, reject) => {
+    const check = () => {
+        if (location.href === %s && window.renderError) {
+            reject(new Error(window.renderError));
+        } else if (location.href === %s && document.readyState === "complete" && window.renderReady !== false) {
+            document.fonts.ready.then(() => requestAnimationFrame(() => resolve(true)));
+        } else {
+            setTimeout(check, 20);
+        }
+    };
+    check();
+})
+"""
+
+
+def idle_seconds_for_interval(interval_seconds):
+    """Returns the idle timeout that keeps the browser running between refreshes interval_seconds apart."""
+    return max(IDLE_SHUTDOWN_SECONDS, int(interval_seconds) + IDLE_SHUTDOWN_MARGIN_SECONDS)
+
+
+def format_timings(timings):
+    """Formats {stage: seconds} for the render logs, e.g. 'navigate: 12ms | ready: 840ms | total: 852ms'."""
+    stages = [f"{stage}: {seconds * 1000:.0f}ms" for stage, seconds in timings.items()]
+    return " | ".join(stages + [f"total: {sum(timings.values()) * 1000:.0f}ms"])
+
+
+class DevToolsError(Exception):
+    """A DevTools command failed, timed out, or the browser went away."""
+
+
+class PageError(DevToolsError):
+    """The page failed to render (a script error, or it never became ready), the browser itself is fine."""
+
+
+class RenderService:
+    """Keeps one headless Chromium running and takes screenshots with it over the DevTools protocol.
+
+    The browser is started on the first render and driven through a pipe
+    (`--remote-debugging-pipe`), so no port is opened. Each render sets the exact
+    viewport, navigates the page to the HTML file, waits for the page to signal
+    readiness and captures the viewport. A health check runs before every render
+    and a browser that fails it, or fails a render, is restarted. A page whose
+    scripts fail, or that never becomes ready, fails its render at once (PageError)
+    without a restart, as it would fail again. After
+    `idle_seconds` without a render the browser is shut down to free its memory.
+
+    Attributes:
+        executable (str): Chromium executable.
+        idle_seconds (int): Idle time before the browser is shut down.
+        extra_flags (list): Chromium flags added to CHROMIUM_FLAGS.
+        enabled (bool): Set to False to always use the one-shot screenshot path.
+        renders (int): Screenshots taken by the service.
+        restarts (int): Times the browser was (re)started.
+    """
+
+    def __init__(self, executable="chromium", idle_seconds=IDLE_SHUTDOWN_SECONDS, extra_flags=()):
+        self.executable = executable
+        self.idle_seconds = idle_seconds
+        self.extra_flags = list(extra_flags)
+        self.enabled = True
+        self.renders = 0
+        self.restarts = 0
+        self.lock = threading.Lock()
+        self.pid = None
+        self.read_fd = None
+        self.write_fd = None
+        self.user_data_dir = None
+        self.session_id = None
+        self.next_id = 0
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.reader = None
+        self.idle_timer = None
+        self.last_used = 0.0
+
+    # ---- process ----------------------------------------------------------
+
+    def _start(self):
+        executable = shutil.which(self.executable)
+        if executable is None:
+            raise DevToolsError(f"{self.executable} not found")
+
+        # the browser reads commands from fd 3 and writes responses to fd 4
+        to_browser_read, to_browser_write = os.pipe()
+        from_browser_read, from_browser_write = os.pipe()
+        self.user_data_dir = tempfile.mkdtemp(prefix="tempo-chromium-")
+        command = [executable] + CHROMIUM_FLAGS + self.extra_flags + [
+            "--remote-debugging-pipe",
+            f"--user-data-dir={self.user_data_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "about:blank",
+        ]
+        started = time.monotonic()
+        try:
+            # posix_spawn maps the pipes onto fds 3 and 4 without a preexec_fn, which isn't thread safe
+            self.pid = os.posix_spawn(executable, command, os.environ, file_actions=[
+                (os.POSIX_SPAWN_DUP2, to_browser_read, 3),
+                (os.POSIX_SPAWN_DUP2, from_browser_write, 4),
+                (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+                (os.POSIX_SPAWN_OPEN, 2, os.devnull, os.O_WRONLY, 0),
+            ], setsid=True)
+        finally:
+            os.close(to_browser_read)
+            os.close(from_browser_write)
+        self.write_fd = to_browser_write
+        self.read_fd = from_browser_read
+        self.reader = threading.Thread(target=self._read_messages, args=(from_browser_read,), daemon=True)
+        self.reader.start()
+        self.restarts += 1
+
+        target_id = self._send("Target.createTarget", {"url": "about:blank"})["targetId"]
+        self.session_id = self._send("Target.attachToTarget", {"targetId": target_id, "flatten": True})["sessionId"]
+        self._send("Page.addScriptToEvaluateOnNewDocument", {"source": ERROR_LISTENER}, self.session_id)
+        logger.info(f"Started Chromium render service (pid {self.pid}) in {time.monotonic() - started:.2f}s")
+
+    def _alive(self):
+        if self.pid is None:
+            return False
+        try:
+            pid, _ = os.waitpid(self.pid, os.WNOHANG)
+        except ChildProcessError:
+            return False
+        return pid == 0
+
+    def _stop(self):
+        """Closes the browser (killing it if it doesn't exit) and releases its pipes and profile."""
+        if self.pid is not None and self._alive():
+            try:
+                self._send("Browser.close", timeout=SHUTDOWN_GRACE_SECONDS)
+            except DevToolsError:
+                pass
+            deadline = time.monotonic() + SHUTDOWN_GRACE_SECONDS
+            while self._alive() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            if self._alive():
+                logger.warning(f"Chromium render service (pid {self.pid}) did not exit, killing it")
+                try:
+                    os.killpg(self.pid, signal.SIGKILL)
+                    os.waitpid(self.pid, 0)
+                except (ProcessLookupError, ChildProcessError):
+                    pass
+        for fd in (self.write_fd, self.read_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+        self.pid = self.read_fd = self.write_fd = self.user_data_dir = self.session_id = None
+        self._fail_pending("Chromium render service stopped")
+
+    # ---- protocol ---------------------------------------------------------
+
+    def _read_messages(self, fd):
+        buffer = b""
+        while True:
+            try:
+                data = os.read(fd, 65536)
+            except OSError:
+                data = b""
+            if not data:
+                self._fail_pending("Chromium closed the DevTools pipe")
+                return
+            buffer += data
+            *messages, buffer = buffer.split(b"\0")
+            for message in messages:
+                response = json.loads(message)
+                if "id" not in response:
+                    continue  # events aren't needed, the page signals readiness itself
+                with self.pending_lock:
+                    waiter = self.pending.pop(response["id"], None)
+                if waiter is not None:
+                    waiter[1] = response
+                    waiter[0].set()
+
+    def _fail_pending(self, reason):
+        with self.pending_lock:
+            waiters, self.pending = list(self.pending.values()), {}
+        for waiter in waiters:
+            waiter[1] = {"error": {"message": reason}}
+            waiter[0].set()
+
+    def _send(self, method, params=None, session_id=None, timeout=COMMAND_TIMEOUT_SECONDS):
+        """Sends a DevTools command and returns its result."""
+        if self.write_fd is None:
+            raise DevToolsError("Chromium render service is not running")
+        waiter = [threading.Event(), None]
+        with self.pending_lock:
+            self.next_id += 1
+            message_id = self.next_id
+            self.pending[message_id] = waiter
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        try:
+            os.write(self.write_fd, json.dumps(message).encode("utf-8") + b"\0")
+        except OSError as e:
+            raise DevToolsError(f"{method} failed: {e}")
+
+        if not waiter[0].wait(timeout):
+            with self.pending_lock:
+                self.pending.pop(message_id, None)
+            raise DevToolsError(f"{method} timed out after {timeout}s")
+        response = waiter[1]
+        if "error" in response:
+            raise DevToolsError(f"{method} failed: {response['error'].get('message')}")
+        return response.get("result", {})
+
+    # ---- rendering --------------------------------------------------------
+
+    def _healthy(self):
+        if not self._alive() or self.session_id is None:
+            return False
+        try:
+            self._send("Browser.getVersion", timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+            self._send("Runtime.evaluate", {"expression": "1"}, self.session_id, timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+            return True
+        except DevToolsError as e:
+            logger.warning(f"Chromium render service failed its health check: {e}")
+            return False
+
+    def _capture(self, path, dimensions, ready_timeout, timings):
+        width, height = int(dimensions[0]), int(dimensions[1])
+        url = Path(path).resolve().as_uri()
+        session = self.session_id
+
+        started = time.perf_counter()
+        self._send("Emulation.setDeviceMetricsOverride",
+                   {"width": width, "height": height, "deviceScaleFactor": 1, "mobile": False}, session)
+        navigation = self._send("Page.navigate", {"url": url}, session)
+        if navigation.get("errorText"):
+            raise DevToolsError(f"Failed to load {url}: {navigation['errorText']}")
+        timings["navigate"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            ready = self._send("Runtime.evaluate", {"expression": READY_EXPRESSION % (json.dumps(url), json.dumps(url)),
+                                                    "awaitPromise": True, "returnByValue": True},
+                               session, timeout=ready_timeout)
+        except DevToolsError as e:
+            if not self._alive():
+                raise
+            raise PageError(f"Page did not become ready: {e}")
+        if "exceptionDetails" in ready:
+            details = ready["exceptionDetails"]
+            raise PageError(f"Page failed to render: "
+                            f"{details.get('exception', {}).get('description') or details.get('text')}")
+        timings["ready"] = time.perf_counter() - started
+
+        # the clip is the exact viewport, there is no window chrome to crop off
+        started = time.perf_counter()
+        screenshot = self._send("Page.captureScreenshot", {
+            "format": "png",
+            "optimizeForSpeed": True,
+            "clip": {"x": 0, "y": 0, "width": width, "height": height, "scale": 1},
+        }, session)
+        timings["capture"] = time.perf_counter() - started
+        # leave the page empty so the rendered document doesn't hold memory until the next render
+        self._send("Page.navigate", {"url": "about:blank"}, session)
+
+        started = time.perf_counter()
+        image = Image.open(BytesIO(base64.b64decode(screenshot["data"])))
+        image.load()
+        timings["decode"] = time.perf_counter() - started
+        return image
+
+    def screenshot(self, path, dimensions, timeout_ms=None, timings=None):
+        """
+        Renders the HTML file at path at the given (width, height) and returns the
+        image, or None when the service can't render it (the caller should fall back
+        to a one-shot Chromium). A failed render is retried once on a restarted browser.
+        The seconds spent per stage are added to `timings` when given.
+        """
+        if not self.enabled:
+            return None
+        timings = {} if timings is None else timings
+        ready_timeout = timeout_ms / 1000 if timeout_ms else READY_TIMEOUT_SECONDS
+        with self.lock:
+            for attempt in (1, 2):
+                try:
+                    if not self._healthy():
+                        if self.pid is not None:
+                            logger.warning("Restarting Chromium render service")
+                        self._stop()
+                        started = time.perf_counter()
+                        self._start()
+                        timings["start"] = time.perf_counter() - started
+                    image = self._capture(path, dimensions, ready_timeout, timings)
+                    self.renders += 1
+                    logger.info(f"Rendered {path} with the Chromium render service | "
+                                f"{format_timings(timings)} | render {self.renders}, starts {self.restarts}")
+                    self._schedule_idle_shutdown()
+                    return image
+                except PageError as e:
+                    # a restarted browser would fail the same page again, the caller falls back right away
+                    logger.error(f"Chromium render service could not render {path}: {e}")
+                    self._schedule_idle_shutdown()
+                    return None
+                except (DevToolsError, OSError, KeyError, ValueError) as e:
+                    logger.error(f"Chromium render service failed (attempt {attempt}): {e}")
+                    self._stop()
+        return None
+
+    def render_html(self, html, dimensions, timeout_ms=None, timings=None):
+        """
+        Renders the page html like screenshot. The page is handed to the browser
+        through a file of its own in RENDER_SPOOL_DIR, which is RAM backed where
+        /dev/shm exists, removed once the render is done.
+        """
+        if not self.enabled:
+            return None
+        timings = {} if timings is None else timings
+        started = time.perf_counter()
+        os.makedirs(RENDER_SPOOL_DIR, exist_ok=True)
+        # one file per render, so concurrent renders never screenshot each other's page
+        fd, spool_path = tempfile.mkstemp(dir=RENDER_SPOOL_DIR, prefix="render-", suffix=".html")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(html)
+            timings["write"] = time.perf_counter() - started
+            return self.screenshot(spool_path, dimensions, timeout_ms, timings)
+        finally:
+            try:
+                os.remove(spool_path)
+            except OSError:
+                pass
+
+    def _schedule_idle_shutdown(self):
+        self.last_used = time.monotonic()
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+        self.idle_timer = threading.Timer(self.idle_seconds, self._idle_shutdown)
+        self.idle_timer.daemon = True
+        self.idle_timer.start()
+
+    def _idle_shutdown(self):
+        with self.lock:
+            if self.pid is not None and time.monotonic() - self.last_used >= self.idle_seconds:
+                logger.info(f"Chromium render service idle for {self.idle_seconds}s, shutting it down")
+                self._stop()
+
+    def shutdown(self):
+        """Stops the browser, e.g. when the application exits."""
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+        with self.lock:
+            self._stop()
+
+
+_service = None
+_service_lock = threading.Lock()
+_idle_seconds = IDLE_SHUTDOWN_SECONDS
+
+
+def get_render_service():
+    """Returns the process-wide render service, created on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RenderService(idle_seconds=_idle_seconds)
+            atexit.register(_service.shutdown)
+        return _service
+
+
+def configure_render_service(idle_seconds):
+    """Sets the idle timeout of the process-wide render service, applied from its next render."""
+    global _idle_seconds
+    with _service_lock:
+        _idle_seconds = int(idle_seconds)
+        if _service is not None:
+            _service.idle_seconds = _idle_seconds
+
+
+def render_service_pid():
+    """Returns the pid of the process-wide render service's browser, or None while it isn't running."""
+    service = _service
+    return service.pid if service is not None else None
+
+
+def shutdown_render_service():
+    with _service_lock:
+        service = _service
+    if service is not None:
+        service.shutdown()